@@ -0,0 +1,264 @@
+# bench_inference.py
+#
+# In-process inference benchmark for the AI image detector.
+#
+#   python benchmarks/bench_inference.py --stub --output bench.json
+#   python benchmarks/bench_inference.py --weights_folder ./models
+#
+# --stub swaps the CvT-13 network for a tiny CPU module with the same
+# input/output contract, so the harness runs offline without downloading
+# microsoft/cvt-13 or needing a checkpoint. Without --stub the latest
+# model_epoch_*.pth in --weights_folder is loaded (the HF weights must already
+# be in the local cache). Results are written as JSON so runs from different
+# commits can be diffed.
+
+import argparse
+import asyncio
+import glob
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def latency_summary(seconds):
+    millis = [s * 1000 for s in seconds]
+    return {
+        "count": len(millis),
+        "mean_ms": statistics.fmean(millis) if millis else None,
+        "p50_ms": percentile(millis, 50),
+        "p95_ms": percentile(millis, 95),
+        "p99_ms": percentile(millis, 99),
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=SERVICE_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+def build_stub_model():
+    import torch.nn as nn
+
+    class StubDetector(nn.Module):
+        # Cheap stand-in: (N, 3, 200, 200) -> (N, 2) logits
+        def __init__(self):
+            super(StubDetector, self).__init__()
+            self.features = nn.Sequential(
+                nn.Conv2d(3, 16, kernel_size=7, stride=4),
+                nn.ReLU(),
+                nn.AdaptiveAvgPool2d(1),
+                nn.Flatten(),
+            )
+            self.fc_out = nn.Linear(16, 2)
+
+        def forward(self, x):
+            return self.fc_out(self.features(x))
+
+    return StubDetector()
+
+
+def bench_single_image(images, model, device, transform, iterations):
+    from controllers.src.main import predict_single_image
+
+    timings = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        predict_single_image(images[i % len(images)], model, device, transform)
+        timings.append(time.perf_counter() - started)
+    return latency_summary(timings)
+
+
+def bench_preprocessing(images, transform, preprocessor, iterations):
+    # Legacy per-image PIL transform vs the serving preprocessor (decode + normalize)
+    from controllers.src.main import load_image_tensor
+
+    legacy, serving = [], []
+    for i in range(iterations):
+        path = images[i % len(images)]
+        started = time.perf_counter()
+        load_image_tensor(path, transform)
+        legacy.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        with preprocessor.batch([preprocessor.decode(path)]):
+            pass
+        serving.append(time.perf_counter() - started)
+    return {"get_transform": latency_summary(legacy), "preprocessor": latency_summary(serving)}
+
+
+def bench_batch_sizes(images, model, device, preprocessor, batch_sizes, repeats):
+    from controllers.src.main import predict_arrays
+
+    arrays = [preprocessor.decode(path) for path in images]
+    results = {}
+    for batch_size in batch_sizes:
+        batch = [arrays[i % len(arrays)] for i in range(batch_size)]
+        predict_arrays(batch, model, device, preprocessor)  # warm-up for this shape
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            predict_arrays(batch, model, device, preprocessor)
+            timings.append(time.perf_counter() - started)
+        summary = latency_summary(timings)
+        summary["images_per_second"] = batch_size * repeats / sum(timings)
+        results[str(batch_size)] = summary
+    return results
+
+
+async def bench_route(filenames, concurrency_levels, requests_per_level):
+    import httpx
+    from main import app
+    from middleware.authMiddleware import verify_token
+
+    # Authenticated user without a raw token: predictions run, history is skipped
+    app.dependency_overrides[verify_token] = lambda: {"uid": "benchmark"}
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # One warm-up request so the lifespan-loaded model is hot
+            await client.get(f"/images/predict/{filenames[0]}")
+
+            for concurrency in concurrency_levels:
+                semaphore = asyncio.Semaphore(concurrency)
+                timings = []
+                statuses = {}
+
+                async def one(i):
+                    async with semaphore:
+                        started = time.perf_counter()
+                        resp = await client.get(f"/images/predict/{filenames[i % len(filenames)]}")
+                        timings.append(time.perf_counter() - started)
+                        statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+
+                started = time.perf_counter()
+                await asyncio.gather(*(one(i) for i in range(requests_per_level)))
+                elapsed = time.perf_counter() - started
+
+                summary = latency_summary(timings)
+                summary["requests_per_second"] = requests_per_level / elapsed
+                summary["status_codes"] = {str(k): v for k, v in statuses.items()}
+                results[str(concurrency)] = summary
+
+            from services.batchingService import batch_scheduler
+            batching = batch_scheduler.metrics()
+
+    app.dependency_overrides.clear()
+    return results, batching
+
+
+def main(args):
+    os.chdir(SERVICE_DIR)
+    sys.path.insert(0, SERVICE_DIR)
+    if not args.with_cache:
+        # Repeated sample images would otherwise be served from the prediction cache
+        os.environ["PREDICTION_CACHE_SIZE"] = "0"
+    os.environ["MODEL_WEIGHTS_FOLDER"] = args.weights_folder
+
+    # Offline: a lazily-resolved default app keeps authMiddleware from loading a service account
+    import firebase_admin
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(options={"projectId": "benchmark"})
+
+    import torch
+    from services.modelService import model_registry
+
+    images = sorted(
+        path for path in glob.glob(os.path.join(args.images_dir, '*'))
+        if path.lower().endswith(('.png', '.jpg', '.jpeg'))
+    )
+    if not images:
+        raise SystemExit(f"No sample images found in {args.images_dir}")
+
+    started = time.perf_counter()
+    if args.stub:
+        model_registry.install(build_stub_model().to(model_registry.device), "stub")
+    else:
+        model_registry.load()
+    cold_start_seconds = time.perf_counter() - started
+
+    model, device, transform = model_registry.get(), model_registry.device, model_registry.transform
+    preprocessor = model_registry.preprocessor
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": {
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "torch_threads": torch.get_num_threads(),
+            "device": str(device),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {
+            "model": model_registry.version,
+            "stub": args.stub,
+            "prediction_cache": args.with_cache,
+            "preprocess_draft_factor": preprocessor.draft_factor,
+            "images": len(images),
+            "iterations": args.iterations,
+            "batch_sizes": args.batch_sizes,
+            "concurrency": args.concurrency,
+            "requests_per_level": args.requests,
+        },
+        "cold_start_seconds": cold_start_seconds,
+        "predict_single_image": bench_single_image(images, model, device, transform, args.iterations),
+        "preprocessing": bench_preprocessing(images, transform, preprocessor, args.iterations),
+        "batch_forward": bench_batch_sizes(images, model, device, preprocessor, args.batch_sizes, args.repeats),
+    }
+
+    if not args.skip_route:
+        filenames = [os.path.relpath(path, 'images') for path in images]
+        route, batching = asyncio.run(bench_route(filenames, args.concurrency, args.requests))
+        report["route_predict"] = route
+        report["route_batching"] = batching
+
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+        print(f"Wrote benchmark results to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark image detector inference in-process.')
+    parser.add_argument('--stub', action='store_true', help='Use a tiny stand-in model (offline, no checkpoint needed).')
+    parser.add_argument('--weights_folder', type=str, default='./models', help='Checkpoint folder when not using --stub.')
+    parser.add_argument('--images_dir', type=str, default='./images', help='Sample images to run through the model.')
+    parser.add_argument('--iterations', type=int, default=50, help='Warm predict_single_image calls.')
+    parser.add_argument('--batch_sizes', type=int, nargs='+', default=[1, 2, 4, 8, 16], help='Batch sizes for direct forward passes.')
+    parser.add_argument('--repeats', type=int, default=10, help='Forward passes per batch size.')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16], help='Concurrent requests against /images/predict.')
+    parser.add_argument('--requests', type=int, default=64, help='Requests per concurrency level.')
+    parser.add_argument('--with_cache', action='store_true', help='Keep the prediction cache enabled.')
+    parser.add_argument('--skip_route', action='store_true', help='Only benchmark the model path, not the HTTP route.')
+    parser.add_argument('--output', type=str, default=None, help='Write JSON results here instead of stdout.')
+    main(parser.parse_args())
@@ -1,64 +1,103 @@
 import os
-import requests
-from controllers.src.main import main as predict_image
+import io
+import asyncio
+import hashlib
+from controllers.src.main import predict_arrays
+from services.modelService import model_registry, ModelNotReadyError
+from services.batchingService import batch_scheduler
+from services.executorService import inference_executor, InferenceQueueFullError, RETRY_AFTER_SECONDS
+from services.cacheService import prediction_cache, hash_file
+from services.storageService import UPLOAD_FOLDER, content_hash_from_filename, normalize_extension, store_bytes, pin_image
 from fastapi import HTTPException, status
+from common.historyWriter import history_writer
 
-HISTORY_SERVICE_URL = os.getenv("HISTORY_SERVICE_URL", "http://0.0.0.0:8004")
-if not HISTORY_SERVICE_URL.endswith("/"):
-    HISTORY_SERVICE_URL = HISTORY_SERVICE_URL.rstrip("/")
+# Images per forward pass in the batch classification endpoint
+BATCH_FORWARD_SIZE = int(os.getenv("BATCH_FORWARD_SIZE", 32))
 
-url = f"{HISTORY_SERVICE_URL}/history/imageDetector"
-
-def save_to_history(uid: str, id_token: str, prediction: str, probabilities: list, image_filename: str):
-    """Save the image prediction result to the History Service."""
+def _history_record(prediction: str, probabilities: list, image_filename: str) -> dict:
     service_url = os.getenv('AI_IMAGE_DETECTOR_SERVICE_URL', 'http://192.168.196.38:8006')
     
     image_url = f"{service_url}/images/files/{image_filename}"
 
-    payload = {
-        "data": {
-            "predicted_label": prediction,
-            "probabilities": [probabilities[1] if prediction == "fake" else probabilities[0]],
-            "image_url": image_url,
-            "imageFilename": image_filename
-        }
+    return {
+        "predicted_label": prediction,
+        "probabilities": [probabilities[1] if prediction == "fake" else probabilities[0]],
+        "image_url": image_url,
+        "imageFilename": image_filename
     }
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {id_token}"
-    }
+def save_to_history(uid: str, id_token: str, prediction: str, probabilities: list, image_filename: str) -> str:
+    """
+    Queue the image prediction result for the History Service (written behind
+    the response in batches; see common/historyWriter.py). Returns the record id.
+    The stored file is pinned so eviction keeps the record's image_url working.
+    """
+    pin_image(image_filename)
+    return history_writer.enqueue("imageDetector", id_token,
+                                  _history_record(prediction, probabilities, image_filename))
+
+def _sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
 
-    resp = requests.post(url, json=payload, headers=headers, timeout=20)
-    if resp.status_code != 201:
+def _require_model():
+    try:
+        model_registry.get()
+    except ModelNotReadyError as e:
         raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail=f"Failed to save to history: {resp.status_code} {resp.text}"
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "5"}
         )
 
-def handle_image_prediction(image_filename: str, raw_id_token: str = None, decoded_token: dict = None):
+async def classify_image(source, content_hash: str):
+    """
+    Predict a single image given a path or file-like object and its content hash.
+    Cached results skip decode and inference; otherwise the decode and forward
+    pass run on the inference pool (micro-batched with concurrent requests).
+    Returns (label, probabilities) with probabilities shaped [[p_real, p_fake]].
+    """
+    cached = await prediction_cache.get(content_hash, model_registry.version)
+    if cached:
+        return cached
+
+    try:
+        with inference_executor.admit():
+            image = await inference_executor.run(model_registry.preprocessor.decode, source)
+            predicted_label, probabilities_tensor = await batch_scheduler.submit(image)
+    except InferenceQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
+    probabilities = probabilities_tensor.tolist()
+    await prediction_cache.put(content_hash, model_registry.version, predicted_label, probabilities)
+    return predicted_label, probabilities
+
+async def handle_image_prediction(image_filename: str, raw_id_token: str = None, decoded_token: dict = None):
     """
     Orchestrates:
     1. Call image prediction logic.
     2. Save to history (if token is provided).
-    3. Return result.
+    3. Return (label, probabilities) with probabilities shaped [[p_real, p_fake]].
     """
     try:
-        image_path = os.path.join("images", image_filename)
+        image_path = os.path.join(UPLOAD_FOLDER, image_filename)
         if not os.path.exists(image_path):
             raise HTTPException(
                 status_code=404,
                 detail=f"Image file not found: {image_filename}"
             )
 
-        if not os.path.exists("models"):
-            raise HTTPException(
-                status_code=500,
-                detail="Models directory not found. Please ensure models are properly installed."
-            )
+        _require_model()
 
-        predicted_label, probabilities_tensor = predict_image(image_path, './models')
-        probabilities = probabilities_tensor.squeeze().tolist()
+        # Identical bytes under any filename hit the cache and skip decode/inference
+        content_hash = content_hash_from_filename(image_filename) or prediction_cache.file_hash(image_filename)
+        if content_hash is None:
+            content_hash = await asyncio.to_thread(hash_file, image_path)
+            prediction_cache.remember_file_hash(image_filename, content_hash)
+
+        predicted_label, probabilities = await classify_image(image_path, content_hash)
 
         # Optional history save
         if decoded_token and raw_id_token:
@@ -69,13 +108,204 @@ def handle_image_prediction(image_filename: str, raw_id_token: str = None, decod
                 uid=uid,
                 id_token=raw_id_token,
                 prediction=predicted_label,
-                probabilities=probabilities,
+                probabilities=probabilities[0],
                 image_filename=image_filename
             )
-        return predicted_label, probabilities_tensor
+        return predicted_label, probabilities
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in handle_image_prediction: {str(e)}")  # Add logging
         raise HTTPException(
             status_code=500,
             detail=f"Prediction failed: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+async def persist_and_save_history(data: bytes, extension: str, uid: str, id_token: str,
+                                   prediction: str, probabilities: list):
+    """
+    Background step of the single-roundtrip flow: write the image to
+    content-addressed storage and then record it in the History Service.
+    Runs after the response has been sent, so failures are only logged.
+    """
+    try:
+        stored_filename, _, _ = await store_bytes(data, extension)
+        save_to_history(
+            uid=uid,
+            id_token=id_token,
+            prediction=prediction,
+            probabilities=probabilities,
+            image_filename=stored_filename
+        )
+    except Exception as e:
+        print(f"Error persisting analysed image: {str(e)}")
+
+async def handle_upload_and_predict(data: bytes, extension: str, background_tasks,
+                                    raw_id_token: str = None, decoded_token: dict = None,
+                                    save_history: bool = True):
+    """
+    Single-roundtrip variant of upload + predict:
+    1. Run inference directly on the in-memory upload (no disk write/read).
+    2. If history is wanted, schedule the file write and history save for
+       after the response.
+    3. Return (label, probabilities, filename); filename is None when nothing is persisted.
+    """
+    try:
+        _require_model()
+
+        content_hash = await asyncio.to_thread(_sha256_hex, data)
+        predicted_label, probabilities = await classify_image(io.BytesIO(data), content_hash)
+
+        filename = None
+        if save_history and decoded_token and raw_id_token:
+            uid = decoded_token.get("uid")
+            if not uid:
+                raise HTTPException(status_code=401, detail="Invalid token: no uid")
+            filename = f"{content_hash}.{normalize_extension(extension)}"
+            background_tasks.add_task(
+                persist_and_save_history, data, extension, uid, raw_id_token,
+                predicted_label, probabilities[0]
+            )
+        return predicted_label, probabilities, filename
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in handle_upload_and_predict: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Prediction failed: {str(e)}"
+        )
+
+async def persist_batch_and_save_history(uploads: list, uid: str, id_token: str):
+    """
+    Background step of batch classification: write every classified image to
+    content-addressed storage, then queue them for the History Service.
+    `uploads` is a list of (bytes, extension, prediction, probabilities) tuples.
+    A failure only skips the image it happened on.
+    """
+    for data, extension, prediction, probabilities in uploads:
+        try:
+            stored_filename, _, _ = await store_bytes(data, extension)
+            save_to_history(uid, id_token, prediction, probabilities, stored_filename)
+        except Exception as e:
+            print(f"Error persisting analysed image from batch: {str(e)}")
+
+async def handle_batch_prediction(uploads: list, background_tasks, raw_id_token: str = None,
+                                  decoded_token: dict = None, save_history: bool = True):
+    """
+    Classify many images in one request.
+    1. Hash every upload; duplicates and cached images skip inference.
+    2. Decode the rest in parallel on the inference pool and run them through
+       the model, in chunks of BATCH_FORWARD_SIZE (at most INFERENCE_MAX_QUEUE)
+       that each hold one inference slot per image.
+    3. Schedule storage and history writes for after the response, once
+       per distinct image (by content hash).
+
+    Args:
+        uploads (list): (original filename, extension, bytes) tuples; extension
+                        is None for files that failed type validation
+
+    Returns:
+        list: one dict per upload, in order, with either
+              predicted_label/probabilities/filename or an error
+    """
+    try:
+        _require_model()
+        version = model_registry.version
+
+        hashes = await asyncio.gather(*(
+            asyncio.to_thread(_sha256_hex, data) for _, _, data in uploads
+        ))
+
+        results = [None] * len(uploads)
+        pending = []
+        duplicates = {}  # index -> index of the first upload with the same bytes
+        first_seen = {}
+        for i, content_hash in enumerate(hashes):
+            if uploads[i][1] is None:
+                results[i] = ValueError("Invalid file type")
+                continue
+            if content_hash in first_seen:
+                duplicates[i] = first_seen[content_hash]
+                continue
+            first_seen[content_hash] = i
+
+        cached = await asyncio.gather(*(prediction_cache.get(hashes[i], version) for i in first_seen.values()))
+        for i, hit in zip(first_seen.values(), cached):
+            if hit:
+                results[i] = hit
+            else:
+                pending.append(i)
+
+        chunk_size = max(1, min(BATCH_FORWARD_SIZE, inference_executor.max_queue))
+        try:
+            for start in range(0, len(pending), chunk_size):
+                chunk = pending[start:start + chunk_size]
+                # Rejected mid-batch, the chunks already classified stay cached for the retry
+                with inference_executor.admit(len(chunk)):
+                    decoded = await asyncio.gather(*(
+                        inference_executor.run(model_registry.preprocessor.decode, io.BytesIO(uploads[i][2]))
+                        for i in chunk
+                    ), return_exceptions=True)
+
+                    ready = []
+                    for i, image in zip(chunk, decoded):
+                        if isinstance(image, Exception):
+                            results[i] = ValueError(f"Could not decode image: {str(image)}")
+                        else:
+                            ready.append((i, image))
+                    if not ready:
+                        continue
+
+                    labels, probabilities = await inference_executor.run(
+                        predict_arrays, [image for _, image in ready],
+                        model_registry.get(), model_registry.device, model_registry.preprocessor
+                    )
+                    for (i, _), label, probs in zip(ready, labels, probabilities.tolist()):
+                        results[i] = (label, [probs])
+                    await asyncio.gather(*(
+                        prediction_cache.put(hashes[i], version, *results[i]) for i, _ in ready
+                    ))
+        except InferenceQueueFullError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e),
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+            )
+
+        for i, first in duplicates.items():
+            results[i] = results[first]
+
+        response = []
+        to_persist = []
+        stored = {}  # content hash -> stored filename; repeats of an image are stored and recorded once
+        for (original_name, extension, data), content_hash, result in zip(uploads, hashes, results):
+            if isinstance(result, Exception):
+                response.append({"filename": original_name, "error": str(result)})
+                continue
+            predicted_label, probabilities = result
+            if content_hash not in stored:
+                stored[content_hash] = f"{content_hash}.{normalize_extension(extension)}"
+                to_persist.append((data, extension, predicted_label, probabilities[0]))
+            response.append({
+                "filename": original_name,
+                "predicted_label": predicted_label,
+                "probabilities": probabilities,
+                "stored_filename": stored[content_hash] if save_history else None
+            })
+
+        if save_history and to_persist and decoded_token and raw_id_token:
+            uid = decoded_token.get("uid")
+            if not uid:
+                raise HTTPException(status_code=401, detail="Invalid token: no uid")
+            background_tasks.add_task(persist_batch_and_save_history, to_persist, uid, raw_id_token)
+
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in handle_batch_prediction: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Batch prediction failed: {str(e)}"
+        )
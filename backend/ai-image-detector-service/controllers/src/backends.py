@@ -0,0 +1,53 @@
+# backends.py
+
+import os
+import torch
+
+# Artifacts written by export.py, looked up in the weights folder
+ARTIFACT_FILES = {
+    'quantized': 'model_int8.pt',
+    'torchscript': 'model_fp32.pt',
+    'onnx': 'model.onnx',
+}
+BACKENDS = ('eager',) + tuple(ARTIFACT_FILES)
+
+def artifact_path(backend, weights_folder):
+    return os.path.join(weights_folder, ARTIFACT_FILES[backend])
+
+def get_logits(outputs):
+    # Eager HF models return a ModelOutput, exported artifacts return the logits tensor
+    return outputs.logits if hasattr(outputs, 'logits') else outputs
+
+class OnnxModel:
+    # Callable with the same (N, 3, H, W) tensor -> logits contract as the torch backends
+    def __init__(self, path):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The 'onnx' backend requires onnxruntime (pip install onnxruntime).") from e
+        self.session = ort.InferenceSession(path, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def eval(self):
+        return self
+
+    def __call__(self, batch):
+        logits = self.session.run(None, {self.input_name: batch.detach().cpu().numpy()})[0]
+        return torch.from_numpy(logits)
+
+def load_artifact(backend, weights_folder):
+    """
+    Load an exported artifact for the given backend.
+    Exported backends are CPU-only, so callers should run them on the CPU device.
+    """
+    if backend not in ARTIFACT_FILES:
+        raise ValueError(f"Unknown inference backend '{backend}'. Choose one of: {', '.join(BACKENDS)}")
+    path = artifact_path(backend, weights_folder)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No {backend} artifact at {path}. Run export.py first.")
+
+    if backend == 'onnx':
+        return OnnxModel(path)
+    model = torch.jit.load(path, map_location='cpu')
+    model.eval()
+    return model
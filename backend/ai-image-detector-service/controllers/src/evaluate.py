@@ -13,6 +13,7 @@ import glob
 import os
 from model import get_model
 from custom_dataset import get_dataset
+from backends import BACKENDS, get_logits, load_artifact
 
 def load_latest_model(model, device, weights_folder):
     # Use the specified folder or the default path to find the latest model
@@ -24,11 +25,16 @@ def load_latest_model(model, device, weights_folder):
     model.load_state_dict(checkpoint['model_state_dict'])
     return model
 
-def evaluate_model(test_data_dir, device, criterion, weights_folder):
+def evaluate_model(test_data_dir, device, criterion, weights_folder, backend='eager', plot=True):
     test_data = get_dataset(test_data_dir)  # Load the dataset
     test_loader = DataLoader(test_data, batch_size=128, shuffle=False, num_workers=6, pin_memory=True)
-    model = get_model(device)
-    model = load_latest_model(model, device, weights_folder)
+    if backend == 'eager':
+        model = get_model(device)
+        model = load_latest_model(model, device, weights_folder)
+    else:
+        # Exported artifacts from export.py run on the CPU
+        device = torch.device('cpu')
+        model = load_artifact(backend, weights_folder)
     model.eval()
     test_loss = 0
     all_predicted = []
@@ -38,12 +44,12 @@ def evaluate_model(test_data_dir, device, criterion, weights_folder):
         with tqdm(total=len(test_loader), desc="Evaluation", unit="batch") as progress_bar:
             for inputs, labels in test_loader:
                 inputs, labels = inputs.to(device), labels.to(device)
-                with autocast():
-                    outputs = model(inputs)
-                    loss = criterion(outputs.logits, labels)
+                with autocast(enabled=backend == 'eager'):
+                    logits = get_logits(model(inputs))
+                    loss = criterion(logits, labels)
 
                 test_loss += loss.item()
-                _, predicted = outputs.logits.max(1)
+                _, predicted = logits.max(1)
                 all_predicted.extend(predicted.cpu().numpy())
                 all_labels.extend(labels.cpu().numpy())
 
@@ -57,6 +63,8 @@ def evaluate_model(test_data_dir, device, criterion, weights_folder):
     precision = precision_score(all_labels, all_predicted, average='macro')
     recall = recall_score(all_labels, all_predicted, average='macro')
     f1 = f1_score(all_labels, all_predicted, average='macro')
+    if not plot:
+        return avg_test_loss, accuracy, precision, recall, f1
 
     # Confusion Matrix
     cm = confusion_matrix(all_labels, all_predicted)
@@ -73,13 +81,14 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Evaluate a trained model on a dataset.')
     parser.add_argument('test_data_dir', type=str, help='Directory path for test data.')
     parser.add_argument('--weights_folder', type=str, default='./models', help='Folder path for model weights. Defaults to ./models if not provided.')
+    parser.add_argument('--backend', type=str, default='eager', choices=BACKENDS, help='Evaluate the fp32 checkpoint (eager) or an artifact produced by export.py.')
     args = parser.parse_args()
 
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
     criterion = torch.nn.CrossEntropyLoss()  
 
     # Capture the returned values from the evaluate_model function
-    avg_test_loss, accuracy, precision, recall, f1 = evaluate_model(args.test_data_dir, device, criterion, args.weights_folder)
+    avg_test_loss, accuracy, precision, recall, f1 = evaluate_model(args.test_data_dir, device, criterion, args.weights_folder, args.backend)
 
     # Print out the captured metrics
     print(f"Average Test Loss: {avg_test_loss}")
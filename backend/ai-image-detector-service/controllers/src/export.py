@@ -0,0 +1,84 @@
+# export.py
+
+import argparse
+import os
+import sys
+import torch
+from model import get_model, LogitsOnly
+from evaluate import load_latest_model, evaluate_model
+from backends import ARTIFACT_FILES, artifact_path, load_artifact
+
+def export_quantized(model, example, path):
+    # Dynamic int8 quantization of the Linear layers, then traced to TorchScript
+    quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    traced = torch.jit.trace(quantized, example, strict=False)
+    traced.save(path)
+
+def export_torchscript(model, example, path):
+    traced = torch.jit.trace(model, example, strict=False)
+    traced.save(path)
+
+def export_onnx(model, example, path):
+    torch.onnx.export(
+        model, example, path,
+        input_names=['pixel_values'],
+        output_names=['logits'],
+        dynamic_axes={'pixel_values': {0: 'batch'}, 'logits': {0: 'batch'}},
+        opset_version=17,
+    )
+
+EXPORTERS = {
+    'quantized': export_quantized,
+    'torchscript': export_torchscript,
+    'onnx': export_onnx,
+}
+
+def export_model(weights_folder, formats):
+    device = torch.device('cpu')
+    model = get_model(device)
+    model = load_latest_model(model, device, weights_folder)
+    model = LogitsOnly(model).eval()
+    example = torch.randn(2, 3, 200, 200)
+
+    with torch.no_grad():
+        reference = torch.nn.functional.softmax(model(example), dim=1)
+        for backend in formats:
+            path = artifact_path(backend, weights_folder)
+            EXPORTERS[backend](model, example, path)
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            print(f"Exported {backend} artifact to {path} ({size_mb:.1f} MB)")
+
+            # Quick numeric sanity check on the example batch
+            exported = load_artifact(backend, weights_folder)
+            probabilities = torch.nn.functional.softmax(exported(example), dim=1)
+            print(f"  max |p_fp32 - p_{backend}| on example batch: {(probabilities - reference).abs().max().item():.5f}")
+
+def check_parity(test_data_dir, weights_folder, formats, max_accuracy_drop):
+    # Compare evaluate.py metrics of each artifact against the fp32 checkpoint
+    criterion = torch.nn.CrossEntropyLoss()
+    device = torch.device('cpu')
+    results = {'eager': evaluate_model(test_data_dir, device, criterion, weights_folder, 'eager', plot=False)}
+    for backend in formats:
+        results[backend] = evaluate_model(test_data_dir, device, criterion, weights_folder, backend, plot=False)
+
+    print(f"{'backend':<12} {'loss':>8} {'accuracy':>9} {'precision':>10} {'recall':>8} {'f1':>8}")
+    for backend, (loss, accuracy, precision, recall, f1) in results.items():
+        print(f"{backend:<12} {loss:>8.4f} {accuracy:>9.4f} {precision:>10.4f} {recall:>8.4f} {f1:>8.4f}")
+
+    baseline_accuracy = results['eager'][1]
+    failed = [b for b in formats if baseline_accuracy - results[b][1] > max_accuracy_drop]
+    for backend in failed:
+        print(f"Parity check FAILED for {backend}: accuracy dropped by more than {max_accuracy_drop:.4f}")
+    return not failed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export the latest checkpoint to optimized CPU inference artifacts.')
+    parser.add_argument('--weights_folder', type=str, default='./models', help='Folder with model_epoch_*.pth checkpoints; artifacts are written here too. Defaults to ./models.')
+    parser.add_argument('--formats', type=str, nargs='+', default=['quantized'], choices=list(ARTIFACT_FILES), help='Artifacts to produce (default: quantized).')
+    parser.add_argument('--parity_dir', type=str, default=None, help='Held-out ImageFolder directory; if given, compare evaluate.py metrics of each artifact against fp32.')
+    parser.add_argument('--max_accuracy_drop', type=float, default=0.005, help='Largest acceptable accuracy drop versus fp32 for the parity check.')
+    args = parser.parse_args()
+
+    export_model(args.weights_folder, args.formats)
+    if args.parity_dir and not check_parity(args.parity_dir, args.weights_folder, args.formats, args.max_accuracy_drop):
+        sys.exit(1)
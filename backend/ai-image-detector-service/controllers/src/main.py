@@ -5,41 +5,73 @@ import torch
 from PIL import Image
 from .model import get_model 
 from .custom_dataset import get_transform 
+from .backends import BACKENDS, get_logits, load_artifact
 import glob
 import os
 
-def predict_single_image(image_path, model, device, transform):
-    # Load and transform the image
+# Map numeric labels to string labels
+LABEL_MAP = {0: "real", 1: "fake"}
+
+def load_image_tensor(image_path, transform):
+    # Load and transform the image into a (3, H, W) tensor
     image = Image.open(image_path).convert("RGB")
-    transformed_image = transform(image).unsqueeze(0).to(device)
+    return transform(image)
 
-    # Make a prediction
-    model.eval()
+def predict_batch(batch, model, device):
+    # Run a single forward pass over a (N, 3, H, W) batch
     with torch.no_grad():
-        outputs = model(transformed_image)
-        _, predicted = outputs.logits.max(1)
-        probabilities = torch.nn.functional.softmax(outputs.logits, dim=1)
+        logits = get_logits(model(batch.to(device)))
+        _, predicted = logits.max(1)
+        probabilities = torch.nn.functional.softmax(logits, dim=1)
 
-    # Map numeric labels to string labels
-    label_map = {0: "real", 1: "fake"}
-    predicted_label = label_map[predicted.item()]
+    predicted_labels = [LABEL_MAP[i] for i in predicted.tolist()]
+    return predicted_labels, probabilities
 
-    return predicted_label, probabilities
+def predict_stacked(tensors, model, device):
+    # Stack individual (3, H, W) tensors and run them as one batch
+    return predict_batch(torch.stack(tensors), model, device)
 
-def load_latest_model(model, device, weights_folder):
+def predict_arrays(arrays, model, device, preprocessor):
+    # Normalize decoded uint8 arrays (see preprocess.py) as one batch and run them
+    with preprocessor.batch(arrays) as batch:
+        return predict_batch(batch, model, device)
+
+def predict_single_image(image_path, model, device, transform):
+    transformed_image = load_image_tensor(image_path, transform).unsqueeze(0)
+
+    # Make a prediction
+    model.eval()
+    predicted_labels, probabilities = predict_batch(transformed_image, model, device)
+
+    return predicted_labels[0], probabilities
+
+def find_latest_checkpoint(weights_folder):
     # Use the specified folder or the default path to find the latest model
     list_of_files = glob.glob(os.path.join(weights_folder, 'model_epoch_*.pth'))
     if not list_of_files:
         raise FileNotFoundError(f"No model files found in {weights_folder}.")
-    latest_file = max(list_of_files, key=os.path.getctime)
+    return max(list_of_files, key=os.path.getctime)
+
+def load_latest_model(model, device, weights_folder):
+    latest_file = find_latest_checkpoint(weights_folder)
     checkpoint = torch.load(latest_file, map_location=device)
     model.load_state_dict(checkpoint['model_state_dict'])
     return model
 
-def main(image_path, weights_folder):
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+def load_model(weights_folder, device, backend='eager'):
+    # Exported artifacts (see export.py) are loaded as-is and run on the CPU
+    if backend != 'eager':
+        return load_artifact(backend, weights_folder)
+
+    # Build the network, restore the latest checkpoint and switch to inference mode
     model = get_model(device)
     model = load_latest_model(model, device, weights_folder)
+    model.eval()
+    return model
+
+def main(image_path, weights_folder, backend='eager'):
+    device = torch.device('cuda' if torch.cuda.is_available() and backend == 'eager' else 'cpu')
+    model = load_model(weights_folder, device, backend)
 
     transform = get_transform()
     predicted_label, probabilities = predict_single_image(image_path, model, device, transform)
@@ -52,6 +84,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Predict an image using a trained model.')
     parser.add_argument('image_path', type=str, help='Path to the image file for prediction.')
     parser.add_argument('--weights_folder', type=str, default='./models', help='Folder path for model weights. Defaults to ./models if not provided.')
+    parser.add_argument('--backend', type=str, default='eager', choices=BACKENDS, help='Inference backend: eager fp32 checkpoint or an artifact produced by export.py.')
 
     args = parser.parse_args()
-    main(args.image_path, args.weights_folder)
+    main(args.image_path, args.weights_folder, args.backend)
@@ -30,3 +30,12 @@ def get_model(device):
     model.to(device)
     model.classifier = CustomClassifier().to(device)
     return model
+
+class LogitsOnly(nn.Module):
+    # Wraps the HF model so exported graphs take a tensor and return plain logits
+    def __init__(self, model):
+        super(LogitsOnly, self).__init__()
+        self.model = model
+
+    def forward(self, x):
+        return self.model(x).logits
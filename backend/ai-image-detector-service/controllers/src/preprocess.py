@@ -0,0 +1,149 @@
+# preprocess.py
+#
+# Serving-side replacement for get_transform(): decode straight to a small
+# uint8 array, then resize, scale and normalize a whole batch at once into a
+# reused buffer. The arithmetic matches Resize -> ToTensor -> Normalize, so
+# by default the output is bit-identical to get_transform(). JPEG draft mode
+# (skipping most of a large photo's decode) is opt-in, since it changes what
+# the model sees; check it with this script before enabling it.
+
+import argparse
+import glob
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+import torch
+from PIL import Image
+
+IMAGE_SIZE = (200, 200)
+MEAN = [0.485, 0.456, 0.406]
+STD = [0.229, 0.224, 0.225]
+
+# If set, JPEGs are decoded at the smallest DCT scale (1/2, 1/4, 1/8) that is
+# still at least this many times the target size; 0 (default) decodes at full
+# resolution, matching training.
+DRAFT_FACTOR = int(os.getenv("PREPROCESS_DRAFT_FACTOR", 0))
+# Batch capacity of each pooled input buffer; larger batches get a one-off tensor
+BUFFER_CAPACITY = int(os.getenv("PREPROCESS_BUFFER_CAPACITY", 32))
+
+
+class Preprocessor:
+    """
+    Decode images to (H, W, 3) uint8 arrays and turn lists of them into
+    normalized (N, 3, H, W) float batches.
+
+    Input buffers are preallocated and handed out from a small pool, so steady
+    state serving does not allocate a fresh batch tensor per request. A buffer
+    is leased for the duration of a forward pass and returned afterwards; the
+    pool grows to at most the number of forward passes running at once.
+    """
+
+    def __init__(self, size: tuple = IMAGE_SIZE, mean: list = MEAN, std: list = STD,
+                 draft_factor: int = DRAFT_FACTOR, buffer_capacity: int = BUFFER_CAPACITY):
+        self.size = size
+        self.draft_factor = max(0, draft_factor)
+        self.buffer_capacity = max(1, buffer_capacity)
+        self.mean = torch.tensor(mean, dtype=torch.float32).view(1, 3, 1, 1)
+        self.std = torch.tensor(std, dtype=torch.float32).view(1, 3, 1, 1)
+        self.allocated = 0
+        self._free = []
+        self._lock = threading.Lock()
+
+    @property
+    def signature(self) -> str:
+        """Settings that change the model's input, for cache keys (filename-safe)."""
+        width, height = self.size
+        return f"{width}x{height}-draft{self.draft_factor}"
+
+    def decode(self, source) -> np.ndarray:
+        """Decode a path or file-like object to a resized (H, W, 3) uint8 array."""
+        image = Image.open(source)
+        if self.draft_factor:
+            # No-op for formats other than JPEG
+            width, height = self.size
+            image.draft('RGB', (width * self.draft_factor, height * self.draft_factor))
+        image = image.convert("RGB")
+        # Same call torchvision's Resize makes on PIL images (bilinear, antialiased)
+        image = image.resize(self.size, Image.BILINEAR)
+        return np.asarray(image)
+
+    def _acquire(self) -> torch.Tensor:
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+            self.allocated += 1
+        width, height = self.size
+        return torch.empty(self.buffer_capacity, 3, height, width, dtype=torch.float32)
+
+    def _release(self, buffer: torch.Tensor):
+        with self._lock:
+            self._free.append(buffer)
+
+    @contextmanager
+    def batch(self, arrays: list):
+        """
+        Yield a normalized (N, 3, H, W) tensor for a list of decoded arrays.
+        The tensor is a view into a pooled buffer and must not be kept after
+        the `with` block.
+        """
+        pooled = len(arrays) <= self.buffer_capacity
+        if pooled:
+            buffer = self._acquire()
+        else:
+            width, height = self.size
+            buffer = torch.empty(len(arrays), 3, height, width, dtype=torch.float32)
+
+        try:
+            out = buffer[:len(arrays)]
+            # uint8 NHWC -> float NCHW, then ToTensor's /255 and Normalize in place
+            out.copy_(torch.from_numpy(np.stack(arrays)).permute(0, 3, 1, 2))
+            out.div_(255).sub_(self.mean).div_(self.std)
+            yield out
+        finally:
+            if pooled:
+                self._release(buffer)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "draft_factor": self.draft_factor,
+                "buffer_capacity": self.buffer_capacity,
+                "buffers_allocated": self.allocated,
+                "buffers_free": len(self._free),
+            }
+
+
+def check_parity(image_paths: list, preprocessor: Preprocessor, transform) -> dict:
+    """Compare preprocessor output against `transform` (get_transform()) image by image."""
+    max_diff = 0.0
+    total_diff = 0.0
+    for path in image_paths:
+        expected = transform(Image.open(path).convert("RGB"))
+        with preprocessor.batch([preprocessor.decode(path)]) as batch:
+            diff = (batch[0] - expected).abs()
+            max_diff = max(max_diff, diff.max().item())
+            total_diff += diff.mean().item()
+    return {
+        "images": len(image_paths),
+        "max_abs_diff": max_diff,
+        "mean_abs_diff": total_diff / len(image_paths) if image_paths else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    from custom_dataset import get_transform, is_valid_file
+
+    parser = argparse.ArgumentParser(description='Check the serving preprocessor against get_transform().')
+    parser.add_argument('image_dir', type=str, help='Folder of images to compare.')
+    parser.add_argument('--draft_factor', type=int, default=DRAFT_FACTOR, help='JPEG draft factor to test (0 = full decode).')
+    parser.add_argument('--max_mean_diff', type=float, default=0.01, help='Fail if the mean absolute difference exceeds this.')
+    args = parser.parse_args()
+
+    paths = sorted(p for p in glob.glob(os.path.join(args.image_dir, '**', '*'), recursive=True)
+                   if is_valid_file(p.lower()))
+    result = check_parity(paths, Preprocessor(draft_factor=args.draft_factor), get_transform())
+    print(f"Compared {result['images']} images: max abs diff {result['max_abs_diff']:.4f}, "
+          f"mean abs diff {result['mean_abs_diff']:.5f}")
+    if result['mean_abs_diff'] > args.max_mean_diff:
+        raise SystemExit(f"Mean difference exceeds {args.max_mean_diff}")
@@ -1,13 +1,50 @@
 import os
+import sys
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+
+# Shared code in backend/common (copied to /common in the Docker image)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from routes.imageRoutes import image_routes
+from services.modelService import model_registry
+from services.batchingService import batch_scheduler
+from services.executorService import inference_executor
+from services.cacheService import prediction_cache
+from services.storageService import UPLOAD_FOLDER, MAX_UPLOAD_BYTES, MAX_BATCH_BYTES, run_eviction_loop
+from middleware.uploadLimitMiddleware import UploadLimitMiddleware
+from common.historyWriter import history_writer
+from common.httpClient import http_client
+from middleware.authMiddleware import prefetch_public_keys, token_cache
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = FastAPI(title="AI Image Detector Service")
+# Lifespan context to load the model once per process
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    inference_executor.start()
+    # Warm the Firebase key cache without delaying startup
+    prefetch_task = asyncio.create_task(prefetch_public_keys())
+    await history_writer.start(await http_client.start())
+    # Load in the background so /health can report warm-up progress
+    load_task = asyncio.create_task(model_registry.start())
+    await batch_scheduler.start()
+    eviction_task = asyncio.create_task(run_eviction_loop())
+    yield
+    eviction_task.cancel()
+    await batch_scheduler.stop()
+    inference_executor.shutdown()
+    await history_writer.stop()
+    await http_client.stop()
+    prefetch_task.cancel()
+    if not load_task.done():
+        load_task.cancel()
+
+app = FastAPI(title="AI Image Detector Service", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,20 +54,45 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Refuse oversized uploads before the multipart body is read (slack covers multipart framing)
+app.add_middleware(
+    UploadLimitMiddleware,
+    limits={
+        "/images/upload": MAX_UPLOAD_BYTES + 64 * 1024,
+        "/images/analyze": MAX_UPLOAD_BYTES + 64 * 1024,
+        "/images/predict/batch": MAX_BATCH_BYTES,
+    },
+)
+
 # 1) Mount your upload & predict routes under /images
 app.include_router(image_routes, prefix="/images")
 
-# 2) Serve the actual image files under /images/files
-os.makedirs("images", exist_ok=True)
+# 2) Serve the actual image files under /images/files (stored as <sha256>.<ext>)
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.mount(
     "/images/files",
-    StaticFiles(directory="images"),
+    StaticFiles(directory=UPLOAD_FOLDER),
     name="images"
 )
 
 @app.get("/health")
 async def health_check():
-    return {"status": "ai-image-detector-service up"}
+    return {
+        "status": "ai-image-detector-service up",
+        "model": model_registry.status()
+    }
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "batching": batch_scheduler.metrics(),
+        "executor": inference_executor.metrics(),
+        "preprocessing": model_registry.preprocessor.metrics(),
+        "prediction_cache": prediction_cache.metrics(),
+        "history_writer": history_writer.metrics(),
+        "http_client": http_client.metrics(),
+        "auth_cache": token_cache.metrics()
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,71 @@
+import json
+from fastapi import HTTPException, status
+
+
+class _BodyTooLarge(HTTPException):
+    # An HTTPException so FastAPI's body parsing re-raises it as-is (413) instead of a generic 400
+    def __init__(self, max_bytes: int):
+        super().__init__(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                         detail=f"Request body exceeds the {max_bytes} byte limit")
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware that rejects oversized request bodies before they are parsed.
+
+    FastAPI reads and spools the whole multipart body before the route runs,
+    so the byte limit has to be enforced here: a declared Content-Length over
+    the limit is refused immediately, and chunked bodies are counted as they
+    stream in and cut off with 413 as soon as they cross it.
+    """
+
+    def __init__(self, app, limits: dict):
+        # limits: {path: max body bytes} for POST endpoints that accept uploads
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.limits:
+            return await self.app(scope, receive, send)
+
+        max_bytes = self.limits[scope["path"]]
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            return await self._reject(send, max_bytes)
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    raise _BodyTooLarge(max_bytes)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except _BodyTooLarge:
+            if not response_started:
+                await self._reject(send, max_bytes)
+
+    async def _reject(self, send, max_bytes: int):
+        body = json.dumps({"detail": f"Request body exceeds the {max_bytes} byte limit"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
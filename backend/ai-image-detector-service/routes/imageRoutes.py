@@ -1,14 +1,15 @@
-from fastapi import APIRouter, Depends, Request, UploadFile, File, HTTPException
+import os
+from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, Request, UploadFile, File, HTTPException
 from fastapi.responses import JSONResponse
 from werkzeug.utils import secure_filename
-from controllers.imageController import handle_image_prediction
+from controllers.imageController import handle_image_prediction, handle_upload_and_predict, handle_batch_prediction
 from middleware.authMiddleware import verify_token
-import os
-import shutil
+from services.storageService import store_upload, read_upload, UploadTooLargeError
 
 image_routes = APIRouter()
-UPLOAD_FOLDER = 'images'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", 256))
 
 def allowed_file(filename: str):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -19,13 +20,13 @@ async def upload_image(file: UploadFile = File(...), decoded=Depends(verify_toke
     if not allowed_file(filename):
         raise HTTPException(status_code=400, detail='Invalid file type')
 
-    save_path = os.path.join(UPLOAD_FOLDER, filename)
-    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-    
-    with open(save_path, 'wb') as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Stored as images/<sha256>.<ext>, so identical uploads share one file
+    try:
+        stored_filename, _, _ = await store_upload(file, filename.rsplit('.', 1)[1])
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
-    return JSONResponse(content={'message': 'Upload successful', 'filename': filename}, status_code=200)
+    return JSONResponse(content={'message': 'Upload successful', 'filename': stored_filename}, status_code=200)
 
 @image_routes.get('/predict/{filename}')
 async def predict_image(filename: str, request: Request, decoded=Depends(verify_token)):
@@ -34,7 +35,7 @@ async def predict_image(filename: str, request: Request, decoded=Depends(verify_
     raw_id_token = auth_header.split(" ", 1)[1] if auth_header.startswith("Bearer ") else None
 
     try:
-        result = handle_image_prediction(
+        result = await handle_image_prediction(
             image_filename=filename,
             raw_id_token=raw_id_token,
             decoded_token=decoded
@@ -42,7 +43,76 @@ async def predict_image(filename: str, request: Request, decoded=Depends(verify_
         predicted_label, probabilities = result
         return {
             "predicted_label": predicted_label,
-            "probabilities": probabilities.tolist()
+            "probabilities": probabilities
         }
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@image_routes.post('/analyze')
+async def analyze_image(request: Request, background_tasks: BackgroundTasks, file: UploadFile = File(...),
+                        save_history: bool = Form(True), decoded=Depends(verify_token)):
+    """
+    Upload and predict in one round trip. Inference runs on the in-memory bytes;
+    the file is only written to disk (after the response) when history is saved.
+    """
+    filename = secure_filename(file.filename)
+    if not allowed_file(filename):
+        raise HTTPException(status_code=400, detail='Invalid file type')
+
+    try:
+        data = await read_upload(file)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    auth_header = request.headers.get("Authorization", "")
+    raw_id_token = auth_header.split(" ", 1)[1] if auth_header.startswith("Bearer ") else None
+
+    predicted_label, probabilities, stored_filename = await handle_upload_and_predict(
+        data=data,
+        extension=filename.rsplit('.', 1)[1],
+        background_tasks=background_tasks,
+        raw_id_token=raw_id_token,
+        decoded_token=decoded,
+        save_history=save_history
+    )
+    return {
+        "predicted_label": predicted_label,
+        "probabilities": probabilities,
+        "filename": stored_filename
+    }
+
+@image_routes.post('/predict/batch')
+async def predict_image_batch(request: Request, background_tasks: BackgroundTasks,
+                              files: List[UploadFile] = File(...), save_history: bool = Form(True),
+                              decoded=Depends(verify_token)):
+    """
+    Classify many images in one multipart request (repeat the 'files' field).
+    Returns one result per file, in order; files that fail validation or
+    decoding get an 'error' entry instead of failing the whole batch.
+    """
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f'At most {MAX_BATCH_FILES} files per request')
+
+    uploads = []
+    for file in files:
+        filename = secure_filename(file.filename or '')
+        extension = filename.rsplit('.', 1)[1] if allowed_file(filename) else None
+        try:
+            data = await read_upload(file) if extension else b''
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=f'{file.filename}: {str(e)}')
+        uploads.append((file.filename, extension, data))
+
+    auth_header = request.headers.get("Authorization", "")
+    raw_id_token = auth_header.split(" ", 1)[1] if auth_header.startswith("Bearer ") else None
+
+    results = await handle_batch_prediction(
+        uploads=uploads,
+        background_tasks=background_tasks,
+        raw_id_token=raw_id_token,
+        decoded_token=decoded,
+        save_history=save_history
+    )
+    return {"results": results}
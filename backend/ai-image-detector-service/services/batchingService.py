@@ -0,0 +1,118 @@
+import os
+import time
+import asyncio
+import numpy as np
+from controllers.src.main import predict_arrays
+from services.modelService import model_registry
+from services.metricsService import Histogram
+from services.executorService import inference_executor
+
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", 8))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", 10))
+
+
+class BatchScheduler:
+    """
+    Dynamic micro-batching for single-image predictions.
+
+    Callers submit one decoded (H, W, 3) uint8 image each and await their own
+    result. A background task collects pending requests until either
+    `max_batch_size` is reached or `max_wait_ms` has passed since the first one
+    arrived, normalizes them as a single batch and runs one forward pass for it.
+    """
+
+    def __init__(self, registry=model_registry, max_batch_size: int = BATCH_MAX_SIZE,
+                 max_wait_ms: float = BATCH_MAX_WAIT_MS):
+        self.registry = registry
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.batch_sizes = Histogram([1, 2, 4, 8, 16, 32, 64])
+        self.queue_wait_ms = Histogram([1, 2, 5, 10, 20, 50, 100, 250, 500, 1000])
+        self._queue = None
+        self._task = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # Fail anything still waiting so callers don't hang on shutdown
+        while self._queue and not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Batch scheduler stopped"))
+
+    async def submit(self, image: np.ndarray):
+        """Queue one decoded image and wait for its (label, probabilities) result."""
+        if self._task is None:
+            raise RuntimeError("Batch scheduler is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+
+            # Callers that gave up (e.g. client disconnected) don't need a slot
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                continue
+
+            dispatched = time.perf_counter()
+            self.batch_sizes.observe(len(batch))
+            for _, _, enqueued in batch:
+                self.queue_wait_ms.observe((dispatched - enqueued) * 1000)
+
+            try:
+                labels, probabilities = await inference_executor.run(
+                    self._forward, [image for image, _, _ in batch]
+                )
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for i, (_, future, _) in enumerate(batch):
+                if not future.done():
+                    # Keep the (1, num_classes) shape returned by predict_single_image
+                    future.set_result((labels[i], probabilities[i:i + 1]))
+
+    def _forward(self, images: list):
+        # Runs on the inference pool: normalize and predict in one go
+        return predict_arrays(images, self.registry.get(), self.registry.device, self.registry.preprocessor)
+
+    def metrics(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "pending": self._queue.qsize() if self._queue else 0,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
+
+
+batch_scheduler = BatchScheduler()
@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+
+# 0 disables the cache (e.g. for benchmarks)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", 4096))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", 7 * 24 * 3600))
+# Optional on-disk tier so cached predictions survive restarts (unset = memory only)
+PREDICTION_CACHE_DIR = os.getenv("PREDICTION_CACHE_DIR")
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """
+    Content-addressed prediction cache.
+
+    Keyed by (SHA-256 of the image bytes, model checkpoint version) so that a
+    re-upload of the same image under any filename skips decode and inference,
+    while a new checkpoint naturally invalidates old entries. Entries live in
+    an in-memory LRU with a TTL and, if `disk_dir` is set, are mirrored to one
+    JSON file per entry, read and written in a worker thread so the event
+    loop never blocks on disk.
+    """
+
+    def __init__(self, max_entries: int = PREDICTION_CACHE_SIZE, ttl: float = PREDICTION_CACHE_TTL,
+                 disk_dir: str = PREDICTION_CACHE_DIR):
+        self.enabled = max_entries > 0
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._file_hashes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _disk_path(self, content_hash: str, version: str) -> str:
+        return os.path.join(self.disk_dir, version, f"{content_hash}.json")
+
+    def _store_memory(self, key: tuple, entry: dict):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, content_hash: str, version: str):
+        try:
+            with open(self._disk_path(content_hash, version), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, content_hash: str, version: str, entry: dict):
+        path = self._disk_path(content_hash, version)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing prediction cache entry: {str(e)}")
+
+    async def get(self, content_hash: str, version: str):
+        """Return (label, probabilities) for a cached prediction, or None."""
+        if not self.enabled or not content_hash or not version:
+            return None
+        key = (content_hash, version)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and now - entry["stored_at"] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry["label"], entry["probabilities"]
+            if entry:
+                del self._entries[key]
+
+        if self.disk_dir:
+            entry = await asyncio.to_thread(self._read_disk, content_hash, version)
+            try:
+                if entry and now - entry["stored_at"] <= self.ttl:
+                    result = entry["label"], entry["probabilities"]
+                    with self._lock:
+                        self._store_memory(key, entry)
+                        self.hits += 1
+                    return result
+            except (KeyError, TypeError):
+                pass
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    async def put(self, content_hash: str, version: str, label: str, probabilities: list):
+        if not self.enabled or not content_hash or not version:
+            return
+        entry = {"label": label, "probabilities": probabilities, "stored_at": time.time()}
+        with self._lock:
+            self._store_memory((content_hash, version), entry)
+
+        if self.disk_dir:
+            await asyncio.to_thread(self._write_disk, content_hash, version, entry)
+
+    def remember_file_hash(self, filename: str, content_hash: str):
+        """Record the content hash computed at upload time for a stored filename."""
+        with self._lock:
+            self._file_hashes[filename] = content_hash
+            self._file_hashes.move_to_end(filename)
+            while len(self._file_hashes) > self.max_entries:
+                self._file_hashes.popitem(last=False)
+
+    def file_hash(self, filename: str):
+        with self._lock:
+            return self._file_hashes.get(filename)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "disk_tier": bool(self.disk_dir),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
+
+
+prediction_cache = PredictionCache()
@@ -0,0 +1,80 @@
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import torch
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 2))
+INFERENCE_MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", 32))
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", max(1, (os.cpu_count() or 1) // INFERENCE_WORKERS)))
+RETRY_AFTER_SECONDS = int(os.getenv("INFERENCE_RETRY_AFTER", 2))
+
+
+class InferenceQueueFullError(RuntimeError):
+    """Raised when the inference executor already has its maximum number of images in flight."""
+
+
+class InferenceExecutor:
+    """
+    Dedicated thread pool for CPU-heavy work (PIL decode, transforms, forward passes).
+
+    Keeps blocking inference off the uvicorn event loop so /health and uploads
+    stay responsive. Admission is bounded: once `max_queue` images are in
+    flight, new ones are rejected immediately instead of queueing unboundedly.
+    Torch's intra-op thread count is capped so the workers don't oversubscribe
+    the CPU between them.
+    """
+
+    def __init__(self, max_workers: int = INFERENCE_WORKERS, max_queue: int = INFERENCE_MAX_QUEUE,
+                 torch_threads: int = TORCH_NUM_THREADS):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(1, max_queue)
+        self.torch_threads = max(1, torch_threads)
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor = None
+
+    def start(self):
+        torch.set_num_threads(self.torch_threads)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @contextmanager
+    def admit(self, slots: int = 1):
+        """
+        Reserve in-flight slots (one per image) for the duration of one request
+        or one chunk of a batch; `slots` must not exceed `max_queue`.
+        Only touched from the event loop thread, so a plain counter is enough.
+        """
+        if self.in_flight + slots > self.max_queue:
+            self.rejected += 1
+            raise InferenceQueueFullError(
+                f"Inference queue is full ({self.in_flight}/{self.max_queue} images in flight)"
+            )
+        self.in_flight += slots
+        try:
+            yield
+        finally:
+            self.in_flight -= slots
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking callable on the inference pool and await its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "torch_threads": self.torch_threads,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+        }
+
+
+inference_executor = InferenceExecutor()
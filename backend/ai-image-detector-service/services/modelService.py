@@ -0,0 +1,132 @@
+import os
+import asyncio
+import threading
+import time
+import torch
+from controllers.src.custom_dataset import get_transform
+from controllers.src.preprocess import Preprocessor
+from controllers.src.main import find_latest_checkpoint, load_model
+from controllers.src.backends import BACKENDS, artifact_path
+
+WEIGHTS_FOLDER = os.getenv("MODEL_WEIGHTS_FOLDER", "./models")
+# eager (fp32 checkpoint) or an export.py artifact: quantized, torchscript, onnx
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "eager")
+
+
+class ModelNotReadyError(RuntimeError):
+    """Raised when a prediction is requested before the model has finished loading."""
+
+
+class ModelRegistry:
+    """
+    Process-lifetime holder for the CvT-13 detector.
+
+    The checkpoint is loaded exactly once (kicked off from the FastAPI lifespan),
+    switched to eval mode and warmed up with a dummy forward pass. Every request
+    then shares the same model instance instead of rebuilding it per prediction.
+
+    State machine: idle -> loading -> warming_up -> ready (or failed).
+    """
+
+    def __init__(self, weights_folder: str = WEIGHTS_FOLDER, backend: str = INFERENCE_BACKEND):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown INFERENCE_BACKEND '{backend}'. Choose one of: {', '.join(BACKENDS)}")
+        self.weights_folder = weights_folder
+        self.backend = backend
+        # Exported artifacts are CPU-only
+        use_cuda = torch.cuda.is_available() and backend == 'eager'
+        self.device = torch.device('cuda' if use_cuda else 'cpu')
+        self.transform = get_transform()
+        # Serving path: decoded uint8 arrays, normalized per batch into pooled buffers
+        self.preprocessor = Preprocessor()
+        self.model = None
+        self.version = None
+        self.state = "idle"
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def load(self):
+        """
+        Load the latest checkpoint and warm it up. Safe to call more than once;
+        only the first call does any work. Blocking, so run it off the event loop.
+        """
+        with self._lock:
+            if self.state == "ready":
+                return self.model
+
+            try:
+                self.state = "loading"
+                self.error = None
+                started = time.perf_counter()
+                if self.backend == 'eager':
+                    checkpoint = find_latest_checkpoint(self.weights_folder)
+                    source = os.path.basename(checkpoint)
+                else:
+                    # Artifacts keep a fixed name, so re-exports are told apart by mtime
+                    checkpoint = artifact_path(self.backend, self.weights_folder)
+                    source = f"{os.path.basename(checkpoint)}-{int(os.path.getmtime(checkpoint))}"
+                model = load_model(self.weights_folder, self.device, self.backend)
+                self.load_seconds = time.perf_counter() - started
+
+                self.state = "warming_up"
+                started = time.perf_counter()
+                with torch.no_grad():
+                    model(torch.zeros(1, 3, 200, 200, device=self.device))
+                self.warmup_seconds = time.perf_counter() - started
+
+                self.model = model
+                # Backend and preprocessing settings are part of the version so cached
+                # predictions never mix backends or input pipelines
+                self.version = f"{source}@{self.backend}+{self.preprocessor.signature}"
+                self.state = "ready"
+                print(f"Model {self.version} ready on {self.device} "
+                      f"(load {self.load_seconds:.2f}s, warm-up {self.warmup_seconds:.2f}s)")
+                return model
+            except Exception as e:
+                self.state = "failed"
+                self.error = str(e)
+                print(f"Error loading model: {str(e)}")
+                raise
+
+    def install(self, model, version: str):
+        """Serve an already-built model (e.g. a benchmark stub) instead of loading a checkpoint."""
+        with self._lock:
+            model.eval()
+            self.model = model
+            self.version = version
+            self.state = "ready"
+            self.error = None
+
+    async def start(self):
+        """Load the model in a worker thread; failures are recorded in the status."""
+        try:
+            await asyncio.to_thread(self.load)
+        except Exception:
+            pass
+
+    def get(self):
+        """Return the shared model, or raise ModelNotReadyError if it is not loaded yet."""
+        if not self.ready:
+            raise ModelNotReadyError(f"Model is not ready (state: {self.state})")
+        return self.model
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "ready": self.ready,
+            "version": self.version,
+            "backend": self.backend,
+            "device": str(self.device),
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "error": self.error,
+        }
+
+
+model_registry = ModelRegistry()
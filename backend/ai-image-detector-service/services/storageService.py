@@ -0,0 +1,234 @@
+import os
+import re
+import time
+import uuid
+import asyncio
+import hashlib
+import aiofiles
+import aiofiles.os
+
+UPLOAD_FOLDER = 'images'
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_BYTES", 200 * 1024 * 1024))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+IMAGE_RETENTION_SECONDS = float(os.getenv("IMAGE_RETENTION_SECONDS", 7 * 24 * 3600))
+IMAGE_DISK_QUOTA_BYTES = int(os.getenv("IMAGE_DISK_QUOTA_BYTES", 2 * 1024 * 1024 * 1024))
+EVICTION_INTERVAL_SECONDS = float(os.getenv("IMAGE_EVICTION_INTERVAL", 600))
+# How long a history record keeps its image from eviction after it was last saved
+IMAGE_PIN_RETENTION_SECONDS = float(os.getenv("IMAGE_PIN_RETENTION_SECONDS", 90 * 24 * 3600))
+
+# Partial uploads live outside the statically served folder (same filesystem for the rename)
+TMP_FOLDER = '.upload_tmp'
+# One empty marker per stored image that a history record links to (also outside the served folder)
+PIN_FOLDER = '.image_pins'
+# Stored files are named <sha256>.<ext>; anything else predates content addressing
+CONTENT_ADDRESSED_NAME = re.compile(r'^([0-9a-f]{64})\.[a-z0-9]+$')
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES."""
+
+
+def normalize_extension(extension: str) -> str:
+    extension = extension.lower()
+    return 'jpg' if extension == 'jpeg' else extension
+
+
+def content_hash_from_filename(filename: str):
+    """Return the SHA-256 encoded in a content-addressed filename, or None."""
+    match = CONTENT_ADDRESSED_NAME.match(filename)
+    return match.group(1) if match else None
+
+
+async def store_upload(upload, extension: str, max_bytes: int = MAX_UPLOAD_BYTES):
+    """
+    Stream an UploadFile to disk under its content hash.
+
+    The bytes are hashed while they are written to a temp file, and the upload
+    is aborted as soon as it exceeds `max_bytes`. The temp file is then renamed
+    to images/<sha256>.<ext>; if that file already exists the duplicate is
+    discarded, so identical uploads take no extra space.
+
+    Returns:
+        tuple: (stored filename, sha256 hex digest, size in bytes)
+    """
+    os.makedirs(TMP_FOLDER, exist_ok=True)
+    tmp_path = os.path.join(TMP_FOLDER, uuid.uuid4().hex)
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        async with aiofiles.open(tmp_path, 'wb') as out:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds the {max_bytes} byte limit")
+                digest.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        await _remove_quietly(tmp_path)
+        raise
+
+    content_hash = digest.hexdigest()
+    filename = f"{content_hash}.{normalize_extension(extension)}"
+    final_path = os.path.join(UPLOAD_FOLDER, filename)
+
+    if await aiofiles.os.path.exists(final_path):
+        await _remove_quietly(tmp_path)
+        # Refresh the age so eviction treats the file as recently used
+        os.utime(final_path)
+    else:
+        await aiofiles.os.replace(tmp_path, final_path)
+
+    return filename, content_hash, size
+
+
+async def read_upload(upload, max_bytes: int = MAX_UPLOAD_BYTES) -> bytes:
+    """Read an UploadFile into memory, aborting as soon as it exceeds `max_bytes`."""
+    buffer = bytearray()
+    while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+        buffer.extend(chunk)
+        if len(buffer) > max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds the {max_bytes} byte limit")
+    return bytes(buffer)
+
+
+async def store_bytes(data: bytes, extension: str):
+    """Persist an in-memory upload under its content hash (same layout as store_upload)."""
+    content_hash = hashlib.sha256(data).hexdigest()
+    filename = f"{content_hash}.{normalize_extension(extension)}"
+    final_path = os.path.join(UPLOAD_FOLDER, filename)
+
+    if await aiofiles.os.path.exists(final_path):
+        os.utime(final_path)
+        return filename, content_hash, len(data)
+
+    os.makedirs(TMP_FOLDER, exist_ok=True)
+    tmp_path = os.path.join(TMP_FOLDER, uuid.uuid4().hex)
+    try:
+        async with aiofiles.open(tmp_path, 'wb') as out:
+            await out.write(data)
+        await aiofiles.os.replace(tmp_path, final_path)
+    except BaseException:
+        await _remove_quietly(tmp_path)
+        raise
+    return filename, content_hash, len(data)
+
+
+def pin_image(filename: str):
+    """
+    Mark a stored image as referenced by a history record, so eviction keeps
+    the file its image_url points to for IMAGE_PIN_RETENTION_SECONDS after
+    the latest record that links to it was saved.
+    """
+    if not content_hash_from_filename(filename):
+        return  # only content-addressed files are ever evicted
+    os.makedirs(PIN_FOLDER, exist_ok=True)
+    path = os.path.join(PIN_FOLDER, filename)
+    open(path, 'a').close()
+    # The marker's mtime is when the pin expires from
+    os.utime(path)
+
+
+def pinned_images() -> set:
+    try:
+        return set(os.listdir(PIN_FOLDER))
+    except FileNotFoundError:
+        return set()
+
+
+async def _remove_quietly(path: str):
+    try:
+        await aiofiles.os.remove(path)
+    except OSError:
+        pass
+
+
+def expire_pins(pin_retention_seconds: float = IMAGE_PIN_RETENTION_SECONDS) -> int:
+    """Remove pins older than `pin_retention_seconds`; their images are then evicted as usual."""
+    if not os.path.isdir(PIN_FOLDER):
+        return 0
+    now = time.time()
+    expired = 0
+    for entry in os.scandir(PIN_FOLDER):
+        try:
+            if entry.is_file() and now - entry.stat().st_mtime > pin_retention_seconds:
+                os.remove(entry.path)
+                expired += 1
+        except OSError:
+            pass
+    return expired
+
+
+def evict_images(retention_seconds: float = IMAGE_RETENTION_SECONDS,
+                 quota_bytes: int = IMAGE_DISK_QUOTA_BYTES,
+                 pin_retention_seconds: float = IMAGE_PIN_RETENTION_SECONDS) -> dict:
+    """
+    Expire old pins, delete unpinned content-addressed images older than
+    `retention_seconds`, then the least recently stored unpinned ones until
+    the total size (pinned images included) fits in `quota_bytes`.
+    Files that are not content-addressed are left alone and not counted;
+    images pinned by a history record (see pin_image) are never deleted.
+    """
+    now = time.time()
+    unpinned = expire_pins(pin_retention_seconds)
+    pinned = pinned_images()
+    files = []
+    removed = 0
+    pinned_bytes = 0
+    for entry in os.scandir(UPLOAD_FOLDER):
+        if not entry.is_file() or not content_hash_from_filename(entry.name):
+            continue
+        stat = entry.stat()
+        if entry.name in pinned:
+            pinned_bytes += stat.st_size
+            continue
+        if now - stat.st_mtime > retention_seconds:
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass
+            continue
+        files.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = pinned_bytes + sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= quota_bytes:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+            total -= size
+        except OSError:
+            pass
+
+    # Leftovers from interrupted uploads
+    if os.path.isdir(TMP_FOLDER):
+        for entry in os.scandir(TMP_FOLDER):
+            if entry.is_file() and now - entry.stat().st_mtime > 3600:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    return {"removed": removed, "total_bytes": total, "pinned": len(pinned), "pinned_bytes": pinned_bytes,
+            "unpinned": unpinned, "over_quota": pinned_bytes > quota_bytes}
+
+
+async def run_eviction_loop(interval: float = EVICTION_INTERVAL_SECONDS):
+    """Background task (started from the lifespan) that periodically evicts old images."""
+    while True:
+        try:
+            result = await asyncio.to_thread(evict_images)
+            if result["removed"] or result["unpinned"]:
+                print(f"Evicted {result['removed']} stored images and expired {result['unpinned']} pins "
+                      f"({result['total_bytes']} bytes kept, {result['pinned']} images / "
+                      f"{result['pinned_bytes']} bytes pinned by history)")
+            if result["over_quota"]:
+                print(f"WARNING: images pinned by history alone use {result['pinned_bytes']} bytes, over the "
+                      f"{IMAGE_DISK_QUOTA_BYTES} byte IMAGE_DISK_QUOTA_BYTES; lower IMAGE_PIN_RETENTION_SECONDS "
+                      f"or raise the quota")
+        except Exception as e:
+            print(f"Error evicting stored images: {str(e)}")
+        await asyncio.sleep(interval)
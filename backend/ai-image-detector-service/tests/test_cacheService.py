@@ -0,0 +1,49 @@
+import asyncio
+import os
+
+from services.cacheService import PredictionCache
+
+
+def test_memory_tier_round_trip():
+    async def run():
+        cache = PredictionCache(max_entries=2, ttl=60)
+        await cache.put("h1", "v1", "fake", [[0.1, 0.9]])
+        assert await cache.get("h1", "v1") == ("fake", [[0.1, 0.9]])
+        # A new model version misses
+        assert await cache.get("h1", "v2") is None
+        return cache.metrics()
+
+    metrics = asyncio.run(run())
+    assert metrics["hits"] == 1 and metrics["misses"] == 1
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    async def run():
+        await PredictionCache(max_entries=8, ttl=60, disk_dir=str(tmp_path)).put("h1", "v1", "real", [[0.8, 0.2]])
+        restarted = PredictionCache(max_entries=8, ttl=60, disk_dir=str(tmp_path))
+        return await restarted.get("h1", "v1"), restarted.metrics()
+
+    result, metrics = asyncio.run(run())
+    assert result == ("real", [[0.8, 0.2]])
+    assert metrics["entries"] == 1
+    assert os.listdir(tmp_path / "v1") == ["h1.json"]
+
+
+def test_expired_and_corrupt_disk_entries_miss(tmp_path):
+    async def run():
+        await PredictionCache(max_entries=8, ttl=60, disk_dir=str(tmp_path)).put("old", "v1", "real", [[1.0, 0.0]])
+        (tmp_path / "v1" / "bad.json").write_text("{not json")
+        cache = PredictionCache(max_entries=8, ttl=-1, disk_dir=str(tmp_path))
+        return await cache.get("old", "v1"), await cache.get("bad", "v1")
+
+    assert asyncio.run(run()) == (None, None)
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    async def run():
+        cache = PredictionCache(max_entries=0, disk_dir=str(tmp_path))
+        await cache.put("h1", "v1", "fake", [[0.0, 1.0]])
+        return await cache.get("h1", "v1")
+
+    assert asyncio.run(run()) is None
+    assert os.listdir(tmp_path) == []
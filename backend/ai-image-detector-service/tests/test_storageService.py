@@ -0,0 +1,106 @@
+import asyncio
+import hashlib
+import os
+import time
+
+import pytest
+
+from services import storageService
+from services.storageService import evict_images, pin_image, pinned_images, store_bytes
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # Folders are relative to the service directory, as in main.py
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(storageService.UPLOAD_FOLDER)
+    return tmp_path
+
+
+def stored(data: bytes, age: float = 0) -> str:
+    filename, _, _ = asyncio.run(store_bytes(data, "png"))
+    if age:
+        past = time.time() - age
+        os.utime(os.path.join(storageService.UPLOAD_FOLDER, filename), (past, past))
+    return filename
+
+
+def age_pin(filename: str, age: float):
+    past = time.time() - age
+    os.utime(os.path.join(storageService.PIN_FOLDER, filename), (past, past))
+
+
+def exists(filename: str) -> bool:
+    return os.path.exists(os.path.join(storageService.UPLOAD_FOLDER, filename))
+
+
+def test_store_bytes_is_content_addressed():
+    data = b"same image"
+    first = stored(data)
+    assert first == f"{hashlib.sha256(data).hexdigest()}.png"
+    assert stored(data) == first
+    assert os.listdir(storageService.UPLOAD_FOLDER) == [first]
+
+
+def test_old_unpinned_images_are_evicted():
+    old, fresh = stored(b"old", age=100), stored(b"fresh")
+    legacy = os.path.join(storageService.UPLOAD_FOLDER, "legacy-upload.png")
+    open(legacy, "wb").close()
+    os.utime(legacy, (0, 0))
+
+    result = evict_images(retention_seconds=50, quota_bytes=10**6)
+    assert result["removed"] == 1
+    assert not exists(old) and exists(fresh)
+    assert os.path.exists(legacy)
+
+
+def test_quota_evicts_least_recently_stored_first():
+    oldest, middle, newest = stored(b"a" * 100, age=30), stored(b"b" * 100, age=20), stored(b"c" * 100, age=10)
+    result = evict_images(retention_seconds=3600, quota_bytes=250)
+    assert not exists(oldest) and exists(middle) and exists(newest)
+    assert result["total_bytes"] == 200
+
+
+def test_pinned_images_are_kept_but_count_towards_the_quota():
+    pinned, unpinned = stored(b"p" * 100, age=100), stored(b"u" * 100)
+    pin_image(pinned)
+    assert pinned_images() == {pinned}
+
+    result = evict_images(retention_seconds=50, quota_bytes=150)
+    assert exists(pinned) and not exists(unpinned)
+    assert result["pinned_bytes"] == 100 and result["total_bytes"] == 100
+    assert not result["over_quota"]
+
+
+def test_pins_alone_over_quota_are_reported():
+    pinned = stored(b"p" * 100)
+    pin_image(pinned)
+    result = evict_images(retention_seconds=3600, quota_bytes=50)
+    assert exists(pinned)
+    assert result["over_quota"]
+
+
+def test_expired_pins_release_their_images():
+    kept, expired = stored(b"kept", age=100), stored(b"expired", age=100)
+    pin_image(kept)
+    pin_image(expired)
+    age_pin(expired, 1000)
+
+    result = evict_images(retention_seconds=50, quota_bytes=10**6, pin_retention_seconds=500)
+    assert result["unpinned"] == 1
+    assert pinned_images() == {kept}
+    assert exists(kept) and not exists(expired)
+
+
+def test_repinning_renews_the_pin():
+    filename = stored(b"renewed", age=100)
+    pin_image(filename)
+    age_pin(filename, 1000)
+    pin_image(filename)
+    evict_images(retention_seconds=50, quota_bytes=10**6, pin_retention_seconds=500)
+    assert exists(filename)
+
+
+def test_only_content_addressed_files_are_pinned():
+    pin_image("legacy-upload.png")
+    assert pinned_images() == set()
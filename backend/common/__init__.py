@@ -0,0 +1 @@
+# Code shared by the Python services (copied to /common in each image; see docker-compose.yml)
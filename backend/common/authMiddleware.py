@@ -0,0 +1,138 @@
+import os
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+import firebase_admin
+from firebase_admin import credentials, auth
+from fastapi import Request, HTTPException, status
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Verified tokens kept in memory (least recently used evicted first)
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10000))
+# Cached tokens are dropped this many seconds before their `exp`
+AUTH_CACHE_EXPIRY_MARGIN = float(os.getenv("AUTH_CACHE_EXPIRY_MARGIN", 30))
+
+# Google's public keys for Firebase ID token signatures
+ID_TOKEN_CERT_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+
+# Initialize Firebase Admin (if not already initialized)
+if not firebase_admin._apps:
+    cred_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "firebase-service-account.json")
+    cred = credentials.Certificate(cred_path)
+    firebase_admin.initialize_app(cred)
+
+
+class VerifiedTokenCache:
+    """
+    Decoded claims of recently verified ID tokens, keyed by the SHA-256 of
+    the token (raw tokens are never held as keys). An entry lives until the
+    token's own `exp`, so a cached token is never accepted after it expires.
+    """
+
+    def __init__(self, max_entries: int = AUTH_CACHE_SIZE, expiry_margin: float = AUTH_CACHE_EXPIRY_MARGIN):
+        self.max_entries = max(0, max_entries)
+        self.expiry_margin = expiry_margin
+        self._entries = OrderedDict()  # sha256(token) -> (expires_at, claims)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> dict | None:
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, token: str, claims: dict):
+        if self.max_entries == 0 or "exp" not in claims:
+            return
+        expires_at = claims["exp"] - self.expiry_margin
+        if expires_at <= time.time():
+            return
+        key = self._key(token)
+        self._entries[key] = (expires_at, claims)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+token_cache = VerifiedTokenCache()
+
+
+async def verify_id_token(token: str) -> dict:
+    """Verify a Firebase ID token, from cache when possible; signature checks run in a worker thread."""
+    claims = token_cache.get(token)
+    if claims is None:
+        claims = await asyncio.to_thread(auth.verify_id_token, token)
+        token_cache.put(token, claims)
+    # Callers get their own copy of the cached claims
+    return dict(claims)
+
+
+async def prefetch_public_keys():
+    """
+    Warm the Firebase Admin certificate cache at startup so the first
+    requests don't wait on Google. Failures are only logged; verification
+    fetches the keys itself if they are still missing.
+
+    The keys are cached in the token verifier's own cache-control session,
+    which firebase-admin doesn't expose, so this reaches into its internals
+    (as of the firebase-admin version pinned in requirements.txt) and is
+    skipped with a warning if they change.
+    """
+    try:
+        verifier = auth._get_client(firebase_admin.get_app())._token_verifier
+        fetch = verifier.request
+    except (AttributeError, ValueError):
+        fetch = None
+    if not callable(fetch):
+        print(f"WARNING: firebase-admin {firebase_admin.__version__} has no token verifier session to warm; "
+              "skipping the Firebase public key prefetch (check the pinned firebase-admin version)")
+        return
+    try:
+        await asyncio.to_thread(fetch, ID_TOKEN_CERT_URL)
+    except Exception as e:
+        print(f"Could not prefetch Firebase public keys: {str(e)}")
+
+
+async def verify_token(request: Request):
+    """
+    Dependency to verify Firebase ID Token passed in 'Authorization: Bearer <token>'.
+    On success, returns the decoded token (uid, email, etc.).
+    On failure, raises HTTP 401.
+    """
+    auth_header = request.headers.get("Authorization")
+    if not auth_header:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing Authorization header")
+
+    scheme, _, token = auth_header.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid Authorization header format")
+
+    try:
+        return await verify_id_token(token)  # contains 'uid', 'email', etc.
+    except Exception as e:
+        # Token is invalid or expired
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired ID token")
@@ -0,0 +1,380 @@
+import os
+import glob
+import json
+import time
+import base64
+import random
+import string
+import asyncio
+import threading
+import httpx
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; the journal is then only safe for one process
+    fcntl = None
+
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", 50))
+HISTORY_FLUSH_INTERVAL = float(os.getenv("HISTORY_FLUSH_INTERVAL", 0.5))
+HISTORY_MAX_ATTEMPTS = int(os.getenv("HISTORY_MAX_ATTEMPTS", 4))
+HISTORY_RETRY_BASE = float(os.getenv("HISTORY_RETRY_BASE", 0.5))
+HISTORY_TIMEOUT = float(os.getenv("HISTORY_TIMEOUT", 10))
+HISTORY_QUEUE_MAX = int(os.getenv("HISTORY_QUEUE_MAX", 10000))
+# Writes that could not be delivered are appended here and replayed later
+HISTORY_JOURNAL_PATH = os.getenv("HISTORY_JOURNAL_PATH", ".history_journal.jsonl")
+HISTORY_REPLAY_INTERVAL = float(os.getenv("HISTORY_REPLAY_INTERVAL", 30))
+HISTORY_FLUSH_TIMEOUT = float(os.getenv("HISTORY_FLUSH_TIMEOUT", 10))
+
+# Same alphabet and length as Firestore auto-generated ids
+_ID_ALPHABET = string.ascii_letters + string.digits
+
+
+def new_record_id() -> str:
+    return "".join(random.SystemRandom().choices(_ID_ALPHABET, k=20))
+
+
+def token_uid(id_token: str) -> str | None:
+    """
+    The uid claim of a Firebase ID token, read without verification: the
+    token was already verified by the auth middleware of the request that
+    produced the record.
+    """
+    try:
+        payload = id_token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return claims.get("user_id") or claims.get("sub")
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def _lock(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+def _is_current(f, path: str) -> bool:
+    # False if the file was renamed away (claimed for replay) while we waited for its lock
+    try:
+        return os.fstat(f.fileno()).st_ino == os.stat(path).st_ino
+    except FileNotFoundError:
+        return False
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class HistoryWriter:
+    """
+    Write-behind client for the History Service.
+
+    `enqueue` returns a record id immediately and the request moves on; a
+    background task collects queued writes for up to `flush_interval`, groups
+    them by (service, ID token) and sends each group to
+    POST /history/<service>/batch with the pre-assigned ids, so a retried
+    batch overwrites rather than duplicates. Failed sends are retried with
+    exponential backoff; once retries are exhausted (or while the History
+    Service is known to be down) entries are appended to an on-disk JSONL
+    journal that is replayed every `replay_interval` and at startup. `stop`
+    flushes what is queued and journals anything it cannot deliver in time.
+
+    Queued entries carry the caller's Firebase ID token, but the journal
+    doesn't: it stores the uid, and replays authenticate with the shared
+    HISTORY_SERVICE_KEY on that user's behalf (the History Service must be
+    given the same key). Without a key, `start` logs an error and failed
+    writes stay in the journal until one is configured. The journal is
+    shared by every worker in the directory: appends and replay claims take
+    an exclusive file lock, and each replay renames the journal to a
+    per-process file first, so an entry is replayed once.
+    """
+
+    def __init__(self, base_url: str = None, journal_path: str = HISTORY_JOURNAL_PATH,
+                 batch_size: int = HISTORY_BATCH_SIZE, flush_interval: float = HISTORY_FLUSH_INTERVAL,
+                 max_attempts: int = HISTORY_MAX_ATTEMPTS, retry_base: float = HISTORY_RETRY_BASE,
+                 timeout: float = HISTORY_TIMEOUT, max_queue: int = HISTORY_QUEUE_MAX,
+                 replay_interval: float = HISTORY_REPLAY_INTERVAL, service_key: str = None):
+        self.base_url = base_url
+        self.service_key = service_key
+        self.journal_path = journal_path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self.timeout = timeout
+        self.max_queue = max_queue
+        self.replay_interval = replay_interval
+        self.stats = {"enqueued": 0, "sent": 0, "retried": 0, "journaled": 0, "replayed": 0, "dropped": 0}
+        self._queue = None
+        self._task = None
+        self._loop = None
+        self._client = None
+        self._owns_client = False
+        self._inflight = []
+        self._down_until = 0.0
+        self._replayed_at = 0.0
+        self._journal_lock = threading.Lock()
+
+    async def start(self, client: httpx.AsyncClient = None):
+        if self.base_url is None:
+            # Read at start so services that call load_dotenv() after importing us still work
+            self.base_url = os.getenv("HISTORY_SERVICE_URL", "http://0.0.0.0:8004")
+        self.base_url = self.base_url.rstrip("/")
+        if self.service_key is None:
+            # Shared secret the History Service accepts for journal replays (see its authMiddleware.js)
+            self.service_key = os.getenv("HISTORY_SERVICE_KEY")
+        if not self.service_key:
+            print("ERROR: HISTORY_SERVICE_KEY is not set; history writes that fail will be journaled "
+                  f"to {self.journal_path} but not replayed until it is configured")
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._owns_client = client is None
+        self._client = client or httpx.AsyncClient(timeout=self.timeout)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = HISTORY_FLUSH_TIMEOUT):
+        """Flush queued writes (up to `timeout` seconds), then journal whatever is left."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        leftovers = list(self._inflight)
+        while not self._queue.empty():
+            leftovers.append(self._queue.get_nowait())
+        self._spool(leftovers)
+        if self._owns_client:
+            await self._client.aclose()
+
+    def enqueue(self, service: str, id_token: str, data: dict) -> str:
+        """Queue one history record and return the id it will be stored under."""
+        entry = {"id": new_record_id(), "service": service, "token": id_token, "uid": token_uid(id_token),
+                 "data": data, "queued_at": time.time()}
+        self.stats["enqueued"] += 1
+        if self._queue is None:
+            # Not started (e.g. a script without the app lifespan): keep it for the next replay
+            self._spool([entry])
+        elif self._in_loop_thread():
+            self._put(entry)
+        else:
+            # Called from a worker thread (sync code run via asyncio.to_thread)
+            self._loop.call_soon_threadsafe(self._put, entry)
+        return entry["id"]
+
+    def _in_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def _put(self, entry: dict):
+        if self._queue.qsize() >= self.max_queue:
+            self._spool([entry])
+        else:
+            self._queue.put_nowait(entry)
+
+    async def _collect(self) -> list:
+        batch = [await asyncio.wait_for(self._queue.get(), self.replay_interval)]
+        deadline = self._loop.time() + self.flush_interval
+        while len(batch) < self.batch_size * 4:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        await self._replay()
+        while True:
+            if time.monotonic() - self._replayed_at >= self.replay_interval:
+                await self._replay()
+            try:
+                entries = await self._collect()
+            except asyncio.TimeoutError:
+                continue
+
+            self._inflight = entries
+            try:
+                groups = {}
+                for entry in entries:
+                    # Replayed entries have no token and are grouped by uid
+                    key = (entry["service"], entry.get("token"), entry.get("uid"))
+                    groups.setdefault(key, []).append(entry)
+                for (service, token, uid), group in groups.items():
+                    for start in range(0, len(group), self.batch_size):
+                        await self._deliver(service, token, uid, group[start:start + self.batch_size])
+            except asyncio.CancelledError:
+                # Left in _inflight for stop() to journal
+                raise
+            except Exception as e:
+                print(f"Error writing history batch: {str(e)}")
+                self._spool(entries)
+            self._inflight = []
+            for _ in entries:
+                self._queue.task_done()
+
+    def _auth_headers(self, token: str | None, uid: str | None) -> dict | None:
+        if token:
+            return {"Authorization": f"Bearer {token}"}
+        if self.service_key and uid:
+            return {"X-Service-Key": self.service_key, "X-On-Behalf-Of": uid}
+        return None
+
+    async def _deliver(self, service: str, token: str | None, uid: str | None, entries: list):
+        if time.monotonic() < self._down_until:
+            self._spool(entries)
+            return
+        headers = self._auth_headers(token, uid)
+        if headers is None:
+            # A journaled entry with no service key to replay it: keep it on disk
+            self._spool(entries)
+            return
+
+        for attempt in range(self.max_attempts):
+            try:
+                resp = await self._client.post(
+                    f"{self.base_url}/history/{service}/batch",
+                    json={"items": [e["data"] for e in entries], "ids": [e["id"] for e in entries]},
+                    headers=headers,
+                    timeout=self.timeout,
+                )
+                if resp.status_code == 201:
+                    self.stats["sent"] += len(entries)
+                    return
+                if 400 <= resp.status_code < 500 and resp.status_code not in (408, 429):
+                    # Bad payload or rejected credentials: retrying won't help
+                    print(f"History Service rejected {len(entries)} {service} records: "
+                          f"{resp.status_code} {resp.text[:200]}")
+                    self.stats["dropped"] += len(entries)
+                    return
+                error = f"{resp.status_code} {resp.text[:200]}"
+            except httpx.HTTPError as e:
+                error = str(e) or type(e).__name__
+
+            if attempt + 1 < self.max_attempts:
+                self.stats["retried"] += 1
+                delay = self.retry_base * (2 ** attempt)
+                await asyncio.sleep(delay + random.uniform(0, delay))
+
+        print(f"History Service unavailable ({error}); journaling {len(entries)} {service} records")
+        self._down_until = time.monotonic() + self.replay_interval
+        self._spool(entries)
+
+    def _spool(self, entries: list):
+        if not entries:
+            return
+        # Never write ID tokens to disk; replays authenticate with the service key instead
+        records = [{k: v for k, v in entry.items() if k != "token"} for entry in entries]
+        kept = [r for r in records if r.get("uid")]
+        if len(kept) < len(records):
+            # Without a uid there is no user to replay them for
+            print(f"Dropping {len(records) - len(kept)} undeliverable history records (no uid)")
+            self.stats["dropped"] += len(records) - len(kept)
+        if not kept:
+            return
+        try:
+            with self._journal_lock:
+                while True:
+                    fd = os.open(self.journal_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+                    with os.fdopen(fd, "a") as f:
+                        _lock(f)
+                        if _is_current(f, self.journal_path):
+                            f.write("".join(json.dumps(record) + "\n" for record in kept))
+                            break
+            self.stats["journaled"] += len(kept)
+        except OSError as e:
+            print(f"Error journaling {len(kept)} history records: {str(e)}")
+            self.stats["dropped"] += len(kept)
+
+    def _claim_journal(self) -> list:
+        """
+        Rename the journal (and replay files left by dead processes) to
+        files owned by this process, so no other worker replays them too.
+        """
+        claimed = []
+        prefix = f"{self.journal_path}.replay."
+        for path in glob.glob(glob.escape(prefix) + "*"):
+            try:
+                pid = int(path[len(prefix):].split("-")[0])
+            except ValueError:
+                continue
+            if pid != os.getpid() and _process_alive(pid):
+                continue
+            target = f"{prefix}{os.getpid()}-{len(claimed)}"
+            try:
+                os.replace(path, target)
+            except FileNotFoundError:
+                continue  # claimed by another worker
+            claimed.append(target)
+
+        try:
+            with open(self.journal_path, "r") as f:
+                _lock(f)
+                if _is_current(f, self.journal_path) and os.fstat(f.fileno()).st_size > 0:
+                    target = f"{prefix}{os.getpid()}-{len(claimed)}"
+                    os.replace(self.journal_path, target)
+                    claimed.append(target)
+        except FileNotFoundError:
+            pass
+        return claimed
+
+    async def _replay(self):
+        """
+        Move journaled entries back onto the queue (skipped while the History
+        Service is down, or without a service key to authenticate them).
+        """
+        if time.monotonic() < self._down_until or not self.service_key:
+            return
+        self._replayed_at = time.monotonic()
+        try:
+            with self._journal_lock:
+                claimed = self._claim_journal()
+        except OSError as e:
+            print(f"Error claiming history journal: {str(e)}")
+            return
+
+        entries = []
+        for path in claimed:
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    # Journals written before tokens were kept off disk
+                    token = entry.pop("token", None)
+                    entry.setdefault("uid", token_uid(token) if token else None)
+                    entries.append(entry)
+            os.remove(path)
+
+        self.stats["replayed"] += len(entries)
+        for entry in entries:
+            self._put(entry)
+        if entries:
+            print(f"Replaying {len(entries)} journaled history records")
+
+    def metrics(self) -> dict:
+        return {
+            **self.stats,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "history_service_down": time.monotonic() < self._down_until,
+        }
+
+
+history_writer = HistoryWriter()
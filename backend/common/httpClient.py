@@ -0,0 +1,139 @@
+import os
+import asyncio
+import httpx
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", 20))
+# Seconds an idle pooled connection is kept open
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+# Concurrent requests to any one host; further requests wait for a slot
+HTTP_PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", 10))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 15))
+# Seconds to wait for a free pooled connection
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", 10))
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body that frees its host slot once the body is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class _HostLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps the pooled transport with a per-host cap on in-flight requests
+    (httpx only limits the pool as a whole). A slot is held from sending the
+    request until its response body is closed. Per-host semaphores are
+    created on demand and dropped once idle.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, per_host_limit: int):
+        self._transport = transport
+        self.per_host_limit = max(1, per_host_limit)
+        self._hosts = {}  # host -> [semaphore, users]
+        self.requests = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        entry = self._hosts.setdefault(host, [asyncio.Semaphore(self.per_host_limit), 0])
+        entry[1] += 1
+
+        def leave():
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._hosts.pop(host, None)
+
+        try:
+            await entry[0].acquire()
+        except BaseException:
+            leave()
+            raise
+
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                entry[0].release()
+                leave()
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            release()
+            raise
+        self.requests += 1
+        response.stream = _ReleasingStream(response.stream, release)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+    def active_hosts(self) -> int:
+        return len(self._hosts)
+
+
+class HttpClient:
+    """
+    One pooled `httpx.AsyncClient` per service process, opened and closed by
+    the app lifespan. Connections are kept alive between calls (to the
+    History Service, scraped sites, ...) instead of paying a TCP/TLS
+    handshake per request, and nothing blocks the event loop.
+    """
+
+    def __init__(self, max_connections: int = HTTP_MAX_CONNECTIONS,
+                 max_keepalive: int = HTTP_MAX_KEEPALIVE,
+                 keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY,
+                 per_host_limit: int = HTTP_PER_HOST_LIMIT):
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive,
+                                   keepalive_expiry=keepalive_expiry)
+        self.timeout = httpx.Timeout(connect=HTTP_CONNECT_TIMEOUT, read=HTTP_READ_TIMEOUT,
+                                     write=HTTP_READ_TIMEOUT, pool=HTTP_POOL_TIMEOUT)
+        self.per_host_limit = per_host_limit
+        self._client = None
+        self._transport = None
+
+    async def start(self) -> httpx.AsyncClient:
+        # Limits belong to the transport when one is passed explicitly
+        self._transport = _HostLimitedTransport(httpx.AsyncHTTPTransport(limits=self.limits),
+                                                self.per_host_limit)
+        self._client = httpx.AsyncClient(transport=self._transport, timeout=self.timeout)
+        return self._client
+
+    async def stop(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("HTTP client not started (is the app lifespan running?)")
+        return self._client
+
+    def metrics(self) -> dict:
+        return {
+            "max_connections": self.limits.max_connections,
+            "max_keepalive": self.limits.max_keepalive_connections,
+            "per_host_limit": self.per_host_limit,
+            "requests": self._transport.requests if self._transport else 0,
+            "active_hosts": self._transport.active_hosts() if self._transport else 0,
+        }
+
+
+http_client = HttpClient()
@@ -0,0 +1,41 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Request coalescing: while work for a key is in flight, later callers
+    with the same key await the same result instead of starting it again.
+
+    The work runs as its own task, so it finishes (and feeds any caches)
+    even if the request that started it is cancelled; each caller only
+    stops waiting. Exceptions are delivered to every waiter. The key is
+    forgotten as soon as the work completes, so nothing is cached here.
+    Callers share the result object and must not mutate it.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}  # key -> task
+        self.stats = {"started": 0, "coalesced": 0}
+
+    async def do(self, key, fn):
+        """Return the result of `fn()` (a coroutine function), shared with concurrent callers of `key`."""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+            self.stats["started"] += 1
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter went away
+            task.exception()
+
+    def metrics(self) -> dict:
+        return {**self.stats, "in_flight": len(self._calls)}
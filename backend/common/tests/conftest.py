@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Import as the services do: `common` as a package from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
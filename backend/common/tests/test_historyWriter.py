@@ -0,0 +1,157 @@
+import asyncio
+import base64
+import json
+
+import httpx
+import pytest
+
+from common.historyWriter import HistoryWriter, token_uid
+
+
+def make_token(uid: str) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps({"user_id": uid}).encode()).decode().rstrip("=")
+    return f"header.{payload}.signature"
+
+
+class FakeHistoryService:
+    """Records batch writes; answers 503 while `down` is set."""
+
+    def __init__(self):
+        self.down = False
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if self.down:
+            return httpx.Response(503, text="unavailable")
+        return httpx.Response(201, json={"ids": json.loads(request.content)["ids"]})
+
+
+@pytest.fixture
+def service():
+    return FakeHistoryService()
+
+
+def make_writer(tmp_path, service_key="secret"):
+    return HistoryWriter(base_url="http://history", journal_path=str(tmp_path / "journal.jsonl"),
+                         flush_interval=0.01, max_attempts=1, retry_base=0, replay_interval=0.05,
+                         service_key=service_key)
+
+
+async def _settle(writer, seconds=0.3):
+    await asyncio.sleep(seconds)
+    await writer.stop(timeout=1)
+
+
+def test_token_uid():
+    assert token_uid(make_token("u1")) == "u1"
+    assert token_uid("not-a-jwt") is None
+    assert token_uid(None) is None
+
+
+def test_writes_are_batched_with_the_users_token(tmp_path, service):
+    async def run():
+        writer = make_writer(tmp_path)
+        await writer.start(httpx.AsyncClient(transport=httpx.MockTransport(service.handler)))
+        ids = [writer.enqueue("linkAnalyser", make_token("u1"), {"n": n}) for n in range(3)]
+        await _settle(writer)
+        return writer, ids
+
+    writer, ids = asyncio.run(run())
+    assert len(service.requests) == 1
+    request = service.requests[0]
+    assert request.url.path == "/history/linkAnalyser/batch"
+    assert request.headers["authorization"] == f"Bearer {make_token('u1')}"
+    assert json.loads(request.content)["ids"] == ids
+    assert writer.stats["sent"] == 3
+    assert not (tmp_path / "journal.jsonl").exists()
+
+
+def test_failed_writes_are_journaled_without_tokens_and_replayed(tmp_path, service):
+    journal = tmp_path / "journal.jsonl"
+
+    async def run():
+        writer = make_writer(tmp_path)
+        await writer.start(httpx.AsyncClient(transport=httpx.MockTransport(service.handler)))
+        service.down = True
+        record_id = writer.enqueue("imageDetector", make_token("u2"), {"n": 1})
+        await asyncio.sleep(0.1)
+        on_disk = [json.loads(line) for line in journal.read_text().splitlines()]
+        service.down = False
+        await _settle(writer, 0.4)
+        return writer, record_id, on_disk
+
+    writer, record_id, on_disk = asyncio.run(run())
+    assert [(e["id"], e["uid"]) for e in on_disk] == [(record_id, "u2")]
+    assert "token" not in on_disk[0]
+
+    replay = service.requests[-1]
+    assert replay.headers["x-service-key"] == "secret"
+    assert replay.headers["x-on-behalf-of"] == "u2"
+    assert "authorization" not in replay.headers
+    assert json.loads(replay.content)["ids"] == [record_id]
+    # It may have been journaled again if a replay ran before the service came back
+    assert writer.stats["journaled"] >= 1 and writer.stats["replayed"] == writer.stats["journaled"]
+    assert writer.stats["sent"] == 1
+    assert writer.stats["dropped"] == 0
+    assert not journal.exists()
+
+
+def test_without_service_key_failed_writes_stay_journaled(tmp_path, service, monkeypatch, capsys):
+    monkeypatch.delenv("HISTORY_SERVICE_KEY", raising=False)
+    journal = tmp_path / "journal.jsonl"
+
+    async def run():
+        writer = make_writer(tmp_path, service_key=None)
+        await writer.start(httpx.AsyncClient(transport=httpx.MockTransport(service.handler)))
+        service.down = True
+        writer.enqueue("linkAnalyser", make_token("u3"), {"n": 1})
+        await asyncio.sleep(0.1)
+        service.down = False
+        await _settle(writer, 0.3)
+        return writer
+
+    writer = asyncio.run(run())
+    assert "HISTORY_SERVICE_KEY is not set" in capsys.readouterr().out
+    assert writer.stats["dropped"] == 0
+    assert [json.loads(line)["uid"] for line in journal.read_text().splitlines()] == ["u3"]
+
+    # Once a key is configured the next writer delivers them
+    async def rerun():
+        writer = make_writer(tmp_path, service_key="secret")
+        await writer.start(httpx.AsyncClient(transport=httpx.MockTransport(service.handler)))
+        await _settle(writer, 0.2)
+        return writer
+
+    writer = asyncio.run(rerun())
+    assert writer.stats["replayed"] == 1 and writer.stats["sent"] == 1
+    assert service.requests[-1].headers["x-on-behalf-of"] == "u3"
+    assert not journal.exists()
+
+
+def test_rejected_writes_are_dropped(tmp_path):
+    def reject(request):
+        return httpx.Response(400, text="bad payload")
+
+    async def run():
+        writer = make_writer(tmp_path)
+        await writer.start(httpx.AsyncClient(transport=httpx.MockTransport(reject)))
+        writer.enqueue("linkAnalyser", make_token("u4"), {"n": 1})
+        await _settle(writer)
+        return writer
+
+    writer = asyncio.run(run())
+    assert writer.stats["dropped"] == 1 and writer.stats["journaled"] == 0
+    assert not (tmp_path / "journal.jsonl").exists()
+
+
+def test_enqueue_before_start_is_replayed_at_start(tmp_path, service):
+    async def run():
+        writer = make_writer(tmp_path)
+        record_id = writer.enqueue("linkAnalyser", make_token("u5"), {"n": 1})
+        await writer.start(httpx.AsyncClient(transport=httpx.MockTransport(service.handler)))
+        await _settle(writer)
+        return record_id
+
+    record_id = asyncio.run(run())
+    assert json.loads(service.requests[-1].content)["ids"] == [record_id]
@@ -1,37 +1,42 @@
+import asyncio
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
 from services.scrapewebsiteService import scrape_article_with_fallbacks
 from services.contentpreprocessService import preprocess_article
 from services.llmService import news_analyse
 from services.savehistoryService import save_to_history
+from common.singleflight import SingleFlight
 from fastapi import HTTPException, status
 
 
-def analyze_article_flow(request_data: dict, decoded_token: dict):
-    """
-    Controller function that handles the full fake news detection pipeline:
-    1. Scrape article from URL
-    2. Preprocess content for LLM
-    3. Analyze with LLM
-    4. Save results to history
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "igshid")
 
-    Args:
-        request_data (dict): Incoming request with `url` and optional `rawAuthHeader`
-        decoded_token (dict): Decoded Firebase token with at least a `uid`
+# Concurrent requests for the same article share one scrape + LLM call
+article_flight = SingleFlight("news_analysis")
 
-    Returns:
-        dict: {
-            "status": "success",
-            "score": int,
-            "explanation": str,
-            "title": str
-        }
-    """
-    url = request_data.get("url")
-    if not url or not isinstance(url, str):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                            detail="Field 'url' (string) is required.")
 
+def canonical_url(url: str) -> str:
+    """
+    Key identifying an article regardless of how the link was shared:
+    lower-case scheme and host, no fragment, default port or tracking
+    parameters.
+    """
+    try:
+        p = urlparse(url.strip())
+        port = p.port
+    except ValueError:
+        return url.strip()
+    host = (p.hostname or "").lower()
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+    query = urlencode([(k, v) for k, v in parse_qsl(p.query, keep_blank_values=True)
+                       if not k.lower().startswith(TRACKING_PARAMS)])
+    return urlunparse((p.scheme.lower(), host, p.path or "/", "", query, ""))
+
+
+async def _analyze_article(url: str) -> dict:
+    """Steps 1-3 of the pipeline; returns {"result": <LLM result>, "title": str}."""
     # 1. Scrape article
-    scraped = scrape_article_with_fallbacks(url)
+    scraped = await scrape_article_with_fallbacks(url)
 
     # Handle any errors
     if scraped["status"] not in ["success", "partial"]:
@@ -50,13 +55,46 @@ def analyze_article_flow(request_data: dict, decoded_token: dict):
     title = processed["title"]
 
     # 3. Analyze with LLM
-    result = news_analyse(prompt)
+    result = await asyncio.to_thread(news_analyse, prompt)
 
     # Handle any errors
     if result["status"] != "success":
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY,
                             detail=result.get("message", "LLM failed."))
 
+    return {"result": result, "title": title}
+
+
+async def analyze_article_flow(request_data: dict, decoded_token: dict):
+    """
+    Controller function that handles the full fake news detection pipeline:
+    1. Scrape article from URL
+    2. Preprocess content for LLM
+    3. Analyze with LLM
+    4. Save results to history
+
+    Args:
+        request_data (dict): Incoming request with `url` and optional `rawAuthHeader`
+        decoded_token (dict): Decoded Firebase token with at least a `uid`
+
+    Returns:
+        dict: {
+            "status": "success",
+            "score": int,
+            "explanation": str,
+            "title": str
+        }
+    """
+    url = request_data.get("url")
+    if not url or not isinstance(url, str):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Field 'url' (string) is required.")
+
+    # 1-3. Scrape, preprocess and analyse (shared by concurrent requests for the same article)
+    analysis = await article_flight.do(canonical_url(url), lambda: _analyze_article(url))
+    result = analysis["result"]
+    title = analysis["title"]
+
     # 4. Save to history
     uid = decoded_token.get("uid")
     if not uid:
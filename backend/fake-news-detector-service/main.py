@@ -1,17 +1,39 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import os
+import sys
+import asyncio
 import uvicorn
+
+# Shared code in backend/common (copied to /common in the Docker image)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from routes.newsRoute import router as news_router
+from controllers.newsController import article_flight
+from common.historyWriter import history_writer
+from common.httpClient import http_client
+from middleware.authMiddleware import prefetch_public_keys, token_cache
 
 # Load environment variables
 load_dotenv()
 
 PORT = int(os.getenv("PORT"))
 
+# Start/stop the background history writer
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the Firebase key cache without delaying startup
+    prefetch_task = asyncio.create_task(prefetch_public_keys())
+    await history_writer.start(await http_client.start())
+    yield
+    await history_writer.stop()
+    await http_client.stop()
+    prefetch_task.cancel()
+
 # FastAPI app initialization
-app = FastAPI(title="Fake News Detector Service")
+app = FastAPI(title="Fake News Detector Service", lifespan=lifespan)
 
 # Enable CORS for frontend communication
 app.add_middleware(
@@ -30,6 +52,15 @@ app.include_router(news_router, prefix="/news")
 async def health_check():
     return {"status": "fake-news-detector-service up"}
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "history_writer": history_writer.metrics(),
+        "http_client": http_client.metrics(),
+        "auth_cache": token_cache.metrics(),
+        "single_flight": article_flight.metrics()
+    }
+
 # Uvicorn entry point
 if __name__ == "__main__":
     port = PORT
@@ -16,5 +16,4 @@ async def analyze_article_endpoint(request: Request, payload: dict, decoded=Depe
     # Pass it into analyze_group by tacking onto payload
     payload["rawAuthHeader"] = raw_auth
 
-    # Remove await since analyze_article_flow is not async
-    return analyze_article_flow(payload, decoded)
\ No newline at end of file
+    return await analyze_article_flow(payload, decoded)
\ No newline at end of file
@@ -1,5 +1,4 @@
-import os 
-import requests
+from common.historyWriter import history_writer
 
 def save_to_history(
     uid: str,
@@ -11,32 +10,17 @@ def save_to_history(
     ):
 
     """
-    Save the telegram group summary result to the History Service.
-    POST /history/FakeNewsDetector
-    Body: { "data": { ... } }
+    Queue the fake news result for the History Service.
+    Written behind the response in batches (POST /history/FakeNewsDetector/batch);
+    see common/historyWriter.py.
     """
 
-    HISTORY_SERVICE_URL = os.getenv("HISTORY_SERVICE_URL")
-    if not HISTORY_SERVICE_URL.endswith("/"):
-        HISTORY_SERVICE_URL = HISTORY_SERVICE_URL.rstrip("/")
-    
-    url = f"{HISTORY_SERVICE_URL}/history/FakeNewsDetector"
-
-    payload = {
-        "data": {
-            "news_url": news_url,
-            "classification": classification,
-            "fake_probability": fake_probability,
-            "explanation": explanation,
-        }
-    }
-
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {id_token}"
+    data = {
+        "news_url": news_url,
+        "classification": classification,
+        "fake_probability": fake_probability,
+        "explanation": explanation,
     }
 
-    resp = requests.post(url, json=payload, headers=headers, timeout=20)
-    if resp.status_code != 201:
-        return {"status":"error", "message":f"Failed to save to history: {resp.status_code} {resp.text}"}
-    return {"status":"success", "message":"Saved successfully."}
\ No newline at end of file
+    record_id = history_writer.enqueue("FakeNewsDetector", id_token, data)
+    return {"status":"success", "message":"Queued for saving.", "id": record_id}
@@ -1,7 +1,13 @@
-import requests
+import os
+import asyncio
+import httpx
 from bs4 import BeautifulSoup
 from newspaper import Article
 from fastapi import HTTPException, status
+from common.httpClient import http_client
+
+NEWS_USER_AGENT = os.getenv("NEWS_USER_AGENT", "Mozilla/5.0 (compatible; DeceptiScan/1.0)")
+NEWS_FETCH_TIMEOUT = float(os.getenv("NEWS_FETCH_TIMEOUT", 10))
 
 def detect_paywall(text: str) -> bool:
     """
@@ -13,77 +19,83 @@ def detect_paywall(text: str) -> bool:
     return any(keyword in text.lower() for keyword in paywall_keywords)
 
 
-def scrape_article_with_fallbacks(url: str) -> dict:
+def _article_result(title: str, text: str) -> dict:
+    snippet = text[:300] + "..." if len(text) > 300 else text
+    if detect_paywall(text):
+        return {
+            "status": "partial",
+            "title": title,
+            "snippet": snippet,
+            "content": None,
+            "message": "Article may be paywalled. Returning snippet only."
+        }
+
+    return {
+        "status": "success",
+        "title": title,
+        "content": text,
+        "snippet": snippet
+    }
+
+
+async def fetch_page(url: str) -> str:
     """
-    Scrapes an article from a URL using newspaper3k, with fallback to BeautifulSoup.
-    Rejects or limits content if a paywall is detected.
+    Download the page once through the shared pooled client (following
+    redirects); both parsers below work from this HTML.
+    """
+    try:
+        response = await http_client.client.get(url, headers={"User-Agent": NEWS_USER_AGENT},
+                                                follow_redirects=True, timeout=NEWS_FETCH_TIMEOUT)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Failed to retrieve page: {str(e) or type(e).__name__}")
+    if response.status_code != 200:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Failed to retrieve page.")
+    return response.text
 
-    Args:
-        url (str): The news article URL to scrape.
 
-    Returns:
-        dict: {
-            "status": "success" | "error",
-            "title": str,
-            "content": str,
-            "snippet": str
-        }
+def parse_article(url: str, html: str) -> dict:
     """
-    # First try with newspaper3k
+    Extracts the article with newspaper3k, with fallback to BeautifulSoup.
+    CPU-bound; run it off the event loop.
+    """
+    # First try with newspaper3k (input_html skips its own download)
     try:
         article = Article(url)
-        article.download()
+        article.download(input_html=html)
         article.parse()
-        title = article.title
-        text = article.text.strip()
-
-        if detect_paywall(text):
-            snippet = text[:300] + "..." if len(text) > 300 else text
-            return {
-                "status": "partial",
-                "title": title,
-                "snippet": snippet,
-                "content": None,
-                "message": "Article may be paywalled. Returning snippet only."
-            }
-
-        return {
-            "status": "success",
-            "title": title,
-            "content": text,
-            "snippet": text[:300] + "..." if len(text) > 300 else text
-        }
+        return _article_result(article.title, article.text.strip())
 
     except Exception:
         # Fallback: BeautifulSoup
         try:
-            response = requests.get(url, timeout=5)
-            if response.status_code != 200:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Failed to retrieve page.")
-
-            soup = BeautifulSoup(response.content, "html.parser")
-            title = soup.title.string.strip() if soup.title else "Untitled"
+            soup = BeautifulSoup(html, "html.parser")
+            title = soup.title.string.strip() if soup.title and soup.title.string else "Untitled"
 
             # Try to get all paragraph text
             paragraphs = soup.find_all("p")
             text = "\n".join(p.get_text() for p in paragraphs).strip()
-
-            if detect_paywall(text):
-                snippet = text[:300] + "..." if len(text) > 300 else text
-                return {
-                    "status": "partial",
-                    "title": title,
-                    "snippet": snippet,
-                    "content": None,
-                    "message": "Article may be paywalled. Returning snippet only."
-                }
-
-            return {
-                "status": "success",
-                "title": title,
-                "content": text,
-                "snippet": text[:300] + "..." if len(text) > 300 else text
-            }
+            return _article_result(title, text)
 
         except Exception as e:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to scrape article: {str(e)}")
+
+
+async def scrape_article_with_fallbacks(url: str) -> dict:
+    """
+    Scrapes an article from a URL using newspaper3k, with fallback to BeautifulSoup.
+    Rejects or limits content if a paywall is detected.
+
+    Args:
+        url (str): The news article URL to scrape.
+
+    Returns:
+        dict: {
+            "status": "success" | "partial",
+            "title": str,
+            "content": str | None,
+            "snippet": str
+        }
+    """
+    html = await fetch_page(url)
+    return await asyncio.to_thread(parse_article, url, html)
@@ -7,7 +7,8 @@ const historyRoutes = require("./routes/historyRoutes");
 const app = express();
 
 // 2. Middleware: parse JSON bodies
-app.use(express.json());
+//    (raised limit so batch writes of many records fit in one body)
+app.use(express.json({ limit: "5mb" }));
 
 // 3. Mount the history routes at /history
 //    (All endpoints will be prefixed with /history)
@@ -18,4 +19,9 @@ const PORT = process.env.PORT || 8004;
 
 app.listen(PORT, () => {
   console.log(`History Service listening on http://0.0.0.0:${PORT}`);
+  if (!process.env.HISTORY_SERVICE_KEY) {
+    console.error(
+      "ERROR: HISTORY_SERVICE_KEY is not set; journaled history writes from the analyser services will be rejected"
+    );
+  }
 });
\ No newline at end of file
@@ -61,6 +61,70 @@ async function createHistory(req, res) {
   }
 }
 
+// Firestore caps a single batched write at 500 operations
+const MAX_BATCH_WRITES = 500;
+
+/**
+ * Create many history entries under a service subcollection in one request.
+ * POST /history/:service/batch
+ * Body: { items: object[], ids?: string[] }
+ *   Each item is the same `data` object createHistory accepts. When `ids` is
+ *   given (one per item), documents are written under those ids, so a client
+ *   can know record ids up front and retries overwrite instead of duplicating.
+ */
+async function createHistoryBatch(req, res) {
+  const { items, ids: requestedIds } = req.body;
+  const uid = req.user.uid;
+  const service = req.params.service;
+
+  if (!service) {
+    res.status(400).json({ error: "Service name (URL param) is required" });
+    return;
+  }
+  if (!Array.isArray(items) || items.length === 0) {
+    res.status(400)
+      .json({ error: "items (non-empty array of objects) is required" });
+    return;
+  }
+  if (requestedIds !== undefined && (
+    !Array.isArray(requestedIds) ||
+    requestedIds.length !== items.length ||
+    !requestedIds.every((id) => typeof id === "string" && /^[A-Za-z0-9_-]{1,128}$/.test(id))
+  )) {
+    res.status(400)
+      .json({ error: "ids must be an array of document ids, one per item" });
+    return;
+  }
+
+  try {
+    const userDocRef = db.collection("history").doc(uid);
+    await userDocRef.set({}, { merge: true });
+
+    const subcolRef = getUserServiceCollection(uid, service);
+    const ids = [];
+    for (let start = 0; start < items.length; start += MAX_BATCH_WRITES) {
+      const batch = db.batch();
+      const chunk = items.slice(start, start + MAX_BATCH_WRITES);
+      for (const [offset, data] of chunk.entries()) {
+        const docRef = requestedIds
+          ? subcolRef.doc(requestedIds[start + offset])
+          : subcolRef.doc();
+        batch.set(docRef, {
+          ...data,
+          createdAt: firebaseAdmin.firestore.FieldValue.serverTimestamp(),
+        });
+        ids.push(docRef.id);
+      }
+      await batch.commit();
+    }
+    return res.status(201).json({ ids });
+  } catch (err) {
+    console.error("Error batch writing to Firestore:", err);
+    res.status(500).json({ error: "Internal server error" });
+    return;
+  }
+}
+
 /**
  * Get all history entries for a given service subcollection, for the authenticated user.
  * GET /history/:service
@@ -198,6 +262,7 @@ async function deleteHistory(req, res) {
 
 module.exports = {
   createHistory,
+  createHistoryBatch,
   getAllHistory,
   getHistoryById,
   updateHistory,
@@ -1,3 +1,4 @@
+const crypto = require("crypto");
 const firebaseAdmin = require("firebase-admin");
 
 // Initialize Firebase Admin if not already initialized.
@@ -34,4 +35,33 @@ async function verifyToken(req, res, next) {
   }
 }
 
-module.exports = verifyToken;
\ No newline at end of file
+function sameSecret(presented, expected) {
+  const a = Buffer.from(presented);
+  const b = Buffer.from(expected);
+  return a.length === b.length && crypto.timingSafeEqual(a, b);
+}
+
+/**
+ * Like verifyToken, but also accepts internal callers that authenticate with
+ * the shared HISTORY_SERVICE_KEY (X-Service-Key) and name the user they write
+ * for (X-On-Behalf-Of). The Python services' history writers use this to
+ * replay journaled records, since they don't keep users' ID tokens on disk.
+ */
+function verifyServiceOrToken(req, res, next) {
+  const presented = req.headers["x-service-key"];
+  if (presented === undefined) {
+    return verifyToken(req, res, next);
+  }
+
+  const serviceKey = process.env.HISTORY_SERVICE_KEY;
+  const uid = req.headers["x-on-behalf-of"];
+  if (!serviceKey || !uid || !sameSecret(presented, serviceKey)) {
+    res.status(401).json({ error: "Invalid service credentials" });
+    return;
+  }
+  req.user = { uid, service: true };
+  return next();
+}
+
+module.exports = verifyToken;
+module.exports.verifyServiceOrToken = verifyServiceOrToken;
\ No newline at end of file
@@ -1,15 +1,20 @@
 const express = require("express");
 const router = express.Router();
 const verifyToken = require("../middleware/authMiddleware");
+const { verifyServiceOrToken } = verifyToken;
 
 const {
   createHistory,
+  createHistoryBatch,
   getAllHistory,
   getHistoryById,
   updateHistory,
   deleteHistory,
 } = require("../controllers/historyController");
 
+// Bulk writes also accept the internal service key (journal replay)
+router.post("/:service/batch", verifyServiceOrToken, createHistoryBatch);
+
 // All routes below require a valid ID token
 router.use(verifyToken);
 
@@ -1,117 +1,87 @@
 import os
-import socket
-import ssl
 import json
-import datetime
-import requests
-import whois
+import asyncio
+import httpx
 from fastapi import HTTPException, status
-from urllib.parse import urlparse
-from bs4 import BeautifulSoup
+from urllib.parse import urlparse, urlunparse
 from dotenv import load_dotenv
+from services.probeService import fetch_redirect_chain
+from services.limiterService import link_limiter
+from services.threatIntelService import threat_intel
+from services.lexicalService import score_url
+from common.historyWriter import history_writer
+from common.httpClient import http_client
 
 load_dotenv()
 
 HISTORY_SERVICE_URL = os.getenv("HISTORY_SERVICE_URL", "http://0.0.0.0:8004").rstrip("/")
+LINK_BATCH_MAX_URLS = int(os.getenv("LINK_BATCH_MAX_URLS", 100))
 
-def resolve_ip(hostname: str) -> str | None:
+def is_valid_url(url: str) -> bool:
     try:
-        return socket.gethostbyname(hostname)
+        p = urlparse(url)
+        return p.scheme in ("http", "https") and bool(p.netloc)
     except:
-        return None
+        return False
 
 
-def get_certificate_issuer(hostname: str) -> str | None:
+def normalize_url(url: str) -> str:
+    """
+    Canonical form used to deduplicate batch input: trimmed, lower-case scheme
+    and host, default port and fragment dropped, empty path as "/".
+    Strings that don't parse as http(s) URLs are returned trimmed.
+    """
+    url = url.strip()
     try:
-        ctx = ssl.create_default_context()
-        with ctx.wrap_socket(socket.socket(), server_hostname=hostname) as s:
-            s.settimeout(5)
-            s.connect((hostname, 443))
-            cert_bin = s.getpeercert(True)
-        from OpenSSL import crypto
-        cert = crypto.load_certificate(crypto.FILETYPE_ASN1, cert_bin)
-        return cert.get_issuer().CN
-    except:
-        return None
+        p = urlparse(url)
+        if p.scheme.lower() not in ("http", "https") or not p.hostname:
+            return url
+        scheme = p.scheme.lower()
+        host = p.hostname.lower()
+        if ":" in host:
+            host = f"[{host}]"
+        if p.port and p.port != (443 if scheme == "https" else 80):
+            host = f"{host}:{p.port}"
+        if p.username or p.password:
+            userinfo = p.username or ""
+            if p.password:
+                userinfo += f":{p.password}"
+            host = f"{userinfo}@{host}"
+        return urlunparse((scheme, host, p.path or "/", p.params, p.query, ""))
+    except ValueError:
+        return url
 
 
-def is_valid_url(url: str) -> bool:
-    try:
-        p = urlparse(url)
-        return p.scheme in ("http", "https") and bool(p.netloc)
-    except:
-        return False
+def intel_verdict(url: str, category: str, entry: str) -> dict:
+    """Answer from the local threat intel index, in the same shape as a probed analysis."""
+    issues = [f"Listed on threat intelligence blocklist: {entry}"] if category == "block" else []
+    return {"safe": len(issues) == 0, "issues": issues, "redirect_details": [], "url_chain": [url]}
 
 
-def fetch_redirect_chain(url: str, max_hops: int = 5) -> list[dict]:
-    chain = []
-    current_url = url
-    for hop in range(max_hops + 1):
-        try:
-            resp = requests.get(current_url, timeout=5, allow_redirects=False)
-        except Exception as e:
-            chain.append({"url": current_url, "error": str(e)})
-            break
-
-        parsed = urlparse(current_url)
-        hostname = parsed.hostname or ""
-        ip = resolve_ip(hostname)
-
-        tls_valid = None
-        issuer = None
-        if parsed.scheme == "https":
-            try:
-                requests.get(current_url, timeout=5)
-                tls_valid = True
-            except requests.exceptions.SSLError:
-                tls_valid = False
-            except:
-                tls_valid = None
-            issuer = get_certificate_issuer(hostname)
-
-        # WHOIS age
-        try:
-            w = whois.whois(hostname)
-            created = w.creation_date
-            if isinstance(created, list):
-                created = created[0]
-            age_days = (datetime.datetime.now() - created).days if isinstance(created, datetime.datetime) else -1
-        except:
-            age_days = -1
-
-        title, forms = ("", [])
-        if resp.status_code == 200:
-            soup = BeautifulSoup(resp.text, "html.parser")
-            title = soup.find("title").get_text(strip=True) if soup.find("title") else ""
-            forms = [f.get("action", "") for f in soup.find_all("form")]
-
-        chain.append({
-            "url": current_url,
-            "status_code": resp.status_code,
-            "ip": ip,
-            "tls_valid": tls_valid,
-            "cert_issuer": issuer,
-            "domain_age_days": age_days,
-            "title": title,
-            "form_actions": forms,
-        })
-
-        if resp.status_code in (301, 302, 307, 308) and "Location" in resp.headers:
-            loc = resp.headers["Location"]
-            next_parsed = urlparse(loc)
-            if not next_parsed.scheme:
-                current_url = parsed._replace(path=loc).geturl()
-            else:
-                current_url = loc
-            continue
-        break
+def lexical_verdict(url: str, lexical) -> dict:
+    """Answer from the offline lexical score alone, in the same shape as a probed analysis."""
+    issues = []
+    if lexical.malicious:
+        issues.append(f"Suspicious URL structure (score {lexical.score}): {'; '.join(lexical.reasons)}")
+    return {"safe": len(issues) == 0, "issues": issues, "redirect_details": [], "url_chain": [url],
+            "lexical_score": lexical.score}
 
-    return chain
 
+async def analyze_link(url: str) -> dict:
+    # Known-bad and trusted links are answered without touching the network
+    await threat_intel.refresh()
+    listed = threat_intel.lookup(url)
+    if listed and listed[0] != "shortener":
+        return intel_verdict(url, *listed)
+
+    # So are links whose text alone is clearly malicious (or clearly benign, if enabled);
+    # shorteners always need the probe to see where they lead
+    lexical = score_url(url)
+    if not listed and (lexical.malicious or lexical.benign):
+        return lexical_verdict(url, lexical)
 
-def analyze_link(url: str) -> dict:
     issues = []
-    chain = fetch_redirect_chain(url)
+    chain = await fetch_redirect_chain(url)
     url_chain = [i.get("url", "") for i in chain]
     first = chain[0]
     parsed = urlparse(first["url"])
@@ -134,7 +104,20 @@ def analyze_link(url: str) -> dict:
     if len(chain) > 5:
         issues.append(f"Redirect chain length is {len(chain)} (>5)")
 
-    return {"safe": len(issues) == 0, "issues": issues, "redirect_details": chain, "url_chain": url_chain}
+    # Where a shortener (or any redirect) leads gets the same offline checks as the link itself
+    for hop in dict.fromkeys(u for u in url_chain[1:] if u):
+        hop_listed = threat_intel.lookup(hop)
+        if hop_listed and hop_listed[0] == "block":
+            issues.append(f"Listed on threat intelligence blocklist: {hop_listed[1]} (redirect target {hop})")
+    final = url_chain[-1] if url_chain else ""
+    if final and final != url_chain[0] and not threat_intel.lookup(final):
+        final_lexical = score_url(final)
+        if final_lexical.malicious:
+            issues.append(f"Suspicious URL structure (score {final_lexical.score}) at redirect target {final}: "
+                          f"{'; '.join(final_lexical.reasons)}")
+
+    return {"safe": len(issues) == 0, "issues": issues, "redirect_details": chain, "url_chain": url_chain,
+            "lexical_score": lexical.score}
 
 
 def save_to_history(
@@ -143,14 +126,8 @@ def save_to_history(
     url: str,
     result: dict
 ) -> str:
-    endpoint = f"{HISTORY_SERVICE_URL}/history/linkAnalyser"
-    payload = {"data": {"url": url, **result}}
-    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {id_token}"}
-    resp = requests.post(endpoint, json=payload, headers=headers, timeout=10)
-    if resp.status_code != 201:
-        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY,
-                            detail=f"Failed to save link history: {resp.status_code} {resp.text}")
-    return resp.json().get("id")
+    """Queue an analysis for the History Service and return the id it will be stored under."""
+    return history_writer.enqueue("linkAnalyser", id_token, {"url": url, **result})
 
 
 def generate_explanations(issues: list[str]) -> list[dict]:
@@ -161,7 +138,9 @@ def generate_explanations(issues: list[str]) -> list[dict]:
         "Domain age": "Newly registered domains are often used for phishing campaigns.",
         "Generic 'login' page title": "A generic login page without brand context may indicate a phishing attempt.",
         "Form posts externally": "Forms that submit to a different domain can capture credentials for malicious use.",
-        "Redirect chain length": "Long redirect chains can be used to obfuscate the final landing page."
+        "Redirect chain length": "Long redirect chains can be used to obfuscate the final landing page.",
+        "Listed on threat intelligence blocklist": "The domain or URL is on a list of known phishing or malware sites.",
+        "Suspicious URL structure": "The link itself has several traits typical of phishing URLs, such as impersonated brands, look-alike characters or raw IP hosts."
     }
     out = []
     for issue in issues:
@@ -175,7 +154,7 @@ async def handle_link_analysis(request_data: dict, decoded_token: dict):
     if not url or not isinstance(url, str):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail="Field 'url' (string) is required")
-    result = analyze_link(url)
+    result = await analyze_link(url)
     uid = decoded_token.get("uid")
     if not uid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
@@ -188,10 +167,84 @@ async def handle_link_analysis(request_data: dict, decoded_token: dict):
     doc_id = save_to_history(uid, token, url, result)
     return {"id": doc_id, **result}
 
-def get_link_details(uid: str, id_token: str, record_id: str) -> dict:
+async def _analyze_limited(url: str) -> tuple[str, dict | None, str | None]:
+    try:
+        host = urlparse(url).hostname or ""
+    except ValueError as e:
+        # normalize_url passes unparsable input through, e.g. "http://[abc/x"
+        return url, None, f"Invalid URL: {str(e)}"
+    async with link_limiter.slot(host):
+        try:
+            return url, await analyze_link(url), None
+        except Exception as e:
+            print(f"Error analysing link in batch: {str(e)}")
+            return url, None, str(e)
+
+async def handle_link_batch_analysis(request_data: dict, decoded_token: dict):
+    """
+    Validate a batch request and return an async generator of NDJSON lines.
+
+    URLs are deduplicated after normalization and analysed concurrently under
+    the global and per-host limits; each result is emitted as soon as it is
+    ready (so lines are not in input order) and queued for the History
+    Service, which writes them in bulk. A final summary line carries the
+    record ids.
+    """
+    urls = request_data.get("urls")
+    if not isinstance(urls, list) or not urls:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Field 'urls' (non-empty list of strings) is required")
+    if len(urls) > LINK_BATCH_MAX_URLS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"At most {LINK_BATCH_MAX_URLS} URLs per batch")
+    uid = decoded_token.get("uid")
+    if not uid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail="Invalid token: missing uid")
+    auth_header = request_data.get("rawAuthHeader", "")
+    if not auth_header.startswith("Bearer "):
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                            detail="Missing rawAuthHeader for saving history")
+    token = auth_header.split(" ", 1)[1]
+
+    inputs = {}  # normalized url -> original strings, in first-seen order
+    invalid = []
+    for raw in urls:
+        if not isinstance(raw, str) or not raw.strip():
+            invalid.append(raw)
+            continue
+        inputs.setdefault(normalize_url(raw), []).append(raw)
+
+    async def stream():
+        for raw in invalid:
+            yield json.dumps({"url": raw, "error": "URL must be a non-empty string"}) + "\n"
+
+        tasks = [asyncio.create_task(_analyze_limited(url)) for url in inputs]
+        history_ids = {}
+        try:
+            for finished in asyncio.as_completed(tasks):
+                url, result, error = await finished
+                if error is not None:
+                    yield json.dumps({"url": url, "inputs": inputs[url], "error": error}) + "\n"
+                    continue
+                history_ids[url] = save_to_history(uid, token, url, result)
+                yield json.dumps({"url": url, "inputs": inputs[url], **result}) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        yield json.dumps({"done": True, "analysed": len(history_ids), "history_ids": history_ids}) + "\n"
+
+    return stream()
+
+async def get_link_details(uid: str, id_token: str, record_id: str) -> dict:
     endpoint = f"{HISTORY_SERVICE_URL}/history/linkAnalyser/{record_id}"
     headers = {"Authorization": f"Bearer {id_token}"}
-    resp = requests.get(endpoint, headers=headers, timeout=5)
+    try:
+        resp = await http_client.client.get(endpoint, headers=headers, timeout=5)
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY,
+                            detail=f"History Service unavailable: {str(e) or type(e).__name__}")
     if resp.status_code != 200:
         raise HTTPException(status_code=resp.status_code, detail=resp.text)
     data = resp.json()
@@ -212,4 +265,4 @@ async def handle_link_details(record_id: str, request: "fastapi.Request", decode
     if not uid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail="Invalid token: missing uid")
-    return get_link_details(uid, token, record_id)
+    return await get_link_details(uid, token, record_id)
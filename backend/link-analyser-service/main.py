@@ -1,12 +1,35 @@
 import os
+import sys
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+
+# Shared code in backend/common (copied to /common in the Docker image)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from routes.linkRoutes import router as link_router
+from common.historyWriter import history_writer
+from common.httpClient import http_client
+from middleware.authMiddleware import prefetch_public_keys, token_cache
+from services.cacheService import dns_cache, whois_cache
+from services.limiterService import link_limiter
+from services.threatIntelService import threat_intel
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = FastAPI(title="Link Analyser Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the Firebase key cache without delaying startup
+    prefetch_task = asyncio.create_task(prefetch_public_keys())
+    await history_writer.start(await http_client.start())
+    yield
+    await history_writer.stop()
+    await http_client.stop()
+    prefetch_task.cancel()
+
+app = FastAPI(title="Link Analyser Service", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,6 +45,18 @@ app.include_router(link_router, prefix="/link")
 async def health_check():
     return {"status": "link-analyser-service up"}
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "dns_cache": dns_cache.metrics(),
+        "whois_cache": whois_cache.metrics(),
+        "concurrency": link_limiter.metrics(),
+        "threat_intel": threat_intel.status(),
+        "history_writer": history_writer.metrics(),
+        "http_client": http_client.metrics(),
+        "auth_cache": token_cache.metrics()
+    }
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8003))
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
 from middleware.authMiddleware import verify_token
-from controllers.linkController import handle_link_analysis, handle_link_details
+from controllers.linkController import handle_link_analysis, handle_link_batch_analysis, handle_link_details
 
 router = APIRouter()
 
@@ -9,6 +10,12 @@ async def analyze_link_endpoint(request: Request, payload: dict, decoded=Depends
     payload["rawAuthHeader"] = request.headers.get("Authorization", "")
     return await handle_link_analysis(payload, decoded)
 
+@router.post("/analyze/batch")
+async def analyze_link_batch_endpoint(request: Request, payload: dict, decoded=Depends(verify_token)):
+    payload["rawAuthHeader"] = request.headers.get("Authorization", "")
+    lines = await handle_link_batch_analysis(payload, decoded)
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
 @router.get("/details/{record_id}")
 async def link_details_endpoint(request: Request, record_id: str, decoded=Depends(verify_token)):
     return await handle_link_details(record_id, request, decoded)
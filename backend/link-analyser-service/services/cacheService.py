@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+
+LOOKUP_CACHE_SIZE = int(os.getenv("LINK_CACHE_SIZE", 10000))
+# Optional SQLite file shared by every worker and kept across restarts (unset = memory only)
+LOOKUP_CACHE_DB = os.getenv("LINK_CACHE_DB")
+
+DNS_TTL = float(os.getenv("LINK_DNS_TTL", 300))
+DNS_NEGATIVE_TTL = float(os.getenv("LINK_DNS_NEGATIVE_TTL", 30))
+WHOIS_TTL = float(os.getenv("LINK_WHOIS_TTL", 7 * 24 * 3600))
+WHOIS_NEGATIVE_TTL = float(os.getenv("LINK_WHOIS_NEGATIVE_TTL", 3600))
+
+
+class SQLiteStore:
+    """
+    Persistent second tier for LookupCache: one row per (kind, key) holding a
+    JSON value and its absolute expiry. WAL mode lets several uvicorn workers
+    share the file.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS lookups ("
+            "kind TEXT NOT NULL, key TEXT NOT NULL, value TEXT, expires_at REAL NOT NULL, "
+            "PRIMARY KEY (kind, key))"
+        )
+        self._conn.commit()
+
+    def get(self, kind: str, key: str):
+        """Return (value, expires_at) or None if there is no live row."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM lookups WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+        if not row or row[1] <= time.time():
+            return None
+        return json.loads(row[0]), row[1]
+
+    def put(self, kind: str, key: str, value, expires_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO lookups (kind, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (kind, key, json.dumps(value), expires_at)
+            )
+            self._conn.commit()
+
+    def purge_expired(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM lookups WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+
+
+class LookupCache:
+    """
+    TTL + LRU cache for one kind of network lookup (DNS, WHOIS, ...).
+
+    Successful results live for `ttl` seconds. Failures (a None result) are
+    cached too, for the shorter `negative_ttl`, so a dead or rate-limiting
+    host is not retried on every hop. Memory is bounded by `max_entries` with
+    least-recently-used eviction; with a SQLiteStore, entries are also written
+    through to disk and read back on a memory miss.
+    """
+
+    def __init__(self, kind: str, ttl: float, negative_ttl: float,
+                 max_entries: int = LOOKUP_CACHE_SIZE, store: SQLiteStore = None):
+        self.kind = kind
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max(1, max_entries)
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._loading = {}  # key -> load task, so concurrent misses share one lookup
+
+    def _remember(self, key: str, value, expires_at: float):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _get_memory(self, key: str):
+        entry = self._entries.get(key)
+        if entry and entry[1] > time.time():
+            self._entries.move_to_end(key)
+            return True, entry[0]
+        if entry:
+            del self._entries[key]
+        return False, None
+
+    async def get(self, key: str):
+        """Return (True, value) for a live entry (value may be None), else (False, None)."""
+        found, value = self._get_memory(key)
+        if found:
+            self.hits += 1
+            return True, value
+
+        if self.store:
+            # SQLite calls block, so they run off the event loop
+            try:
+                stored = await asyncio.to_thread(self.store.get, self.kind, key)
+            except sqlite3.Error as e:
+                print(f"Error reading {self.kind} cache: {str(e)}")
+                stored = None
+            if stored:
+                self._remember(key, *stored)
+                self.hits += 1
+                return True, stored[0]
+
+        self.misses += 1
+        return False, None
+
+    async def put(self, key: str, value):
+        expires_at = time.time() + (self.ttl if value is not None else self.negative_ttl)
+        self._remember(key, value, expires_at)
+        if self.store:
+            try:
+                await asyncio.to_thread(self.store.put, self.kind, key, value, expires_at)
+            except sqlite3.Error as e:
+                print(f"Error writing {self.kind} cache: {str(e)}")
+
+    async def get_or_load(self, key: str, loader):
+        """
+        Return the cached value for `key`, or await `loader()` once and cache
+        its result. Concurrent callers for the same key wait on the same load.
+
+        The load runs as its own task (as in common/singleflight.py), so a
+        caller that is cancelled (client disconnect, analysis deadline) only
+        stops waiting: the other callers still get the result, and it is
+        still cached.
+        """
+        found, value = await self.get(key)
+        if found:
+            return value
+
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, loader))
+            self._loading[key] = task
+            task.add_done_callback(lambda t: self._loaded(key, t))
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, loader):
+        value = await loader()
+        await self.put(key, value)
+        return value
+
+    def _loaded(self, key: str, task: asyncio.Task):
+        if self._loading.get(key) is task:
+            del self._loading[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter went away
+            task.exception()
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "negative_ttl_seconds": self.negative_ttl,
+            "persistent": bool(self.store),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+        }
+
+
+lookup_store = SQLiteStore(LOOKUP_CACHE_DB) if LOOKUP_CACHE_DB else None
+if lookup_store:
+    lookup_store.purge_expired()
+
+dns_cache = LookupCache("dns", DNS_TTL, DNS_NEGATIVE_TTL, store=lookup_store)
+# Values are ISO creation dates, so ages stay correct for as long as they are cached
+whois_cache = LookupCache("whois", WHOIS_TTL, WHOIS_NEGATIVE_TTL, store=lookup_store)
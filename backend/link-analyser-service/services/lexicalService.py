@@ -0,0 +1,218 @@
+import os
+import re
+import math
+import ipaddress
+import unicodedata
+from collections import Counter
+from urllib.parse import urlparse
+
+# Scores at or above this are answered unsafe without probing the network
+LEXICAL_MALICIOUS_THRESHOLD = float(os.getenv("LEXICAL_MALICIOUS_THRESHOLD", 0.8))
+# Scores at or below this are answered safe without probing; negative disables it,
+# since a clean-looking URL can still be a days-old phishing domain
+LEXICAL_BENIGN_THRESHOLD = float(os.getenv("LEXICAL_BENIGN_THRESHOLD", -1))
+
+SUSPICIOUS_TLDS = {
+    "zip", "mov", "xyz", "top", "tk", "ml", "ga", "cf", "gq", "click", "country", "kim",
+    "work", "support", "rest", "fit", "loan", "men", "review", "cam", "icu", "buzz", "monster",
+}
+# Impersonated brands and the registrable domains each one really uses; the
+# brand's name on one of its own domains (outlook.live.com) is not impersonation
+BRAND_DOMAINS = {
+    "paypal": {"paypal.com", "paypal.me", "paypalobjects.com"},
+    "apple": {"apple.com", "icloud.com", "apple.news"},
+    "icloud": {"icloud.com", "apple.com"},
+    "microsoft": {"microsoft.com", "microsoftonline.com", "live.com", "office.com", "outlook.com",
+                  "azure.com", "windows.net", "sharepoint.com", "msn.com"},
+    "office365": {"office365.com", "office.com", "microsoft.com", "microsoftonline.com"},
+    "outlook": {"outlook.com", "live.com", "office.com", "office365.com", "microsoft.com"},
+    "google": {"google.com", "googleusercontent.com", "googleapis.com", "gstatic.com", "youtube.com"},
+    "gmail": {"gmail.com", "google.com"},
+    "amazon": {"amazon.com", "amazonaws.com", "amazon.co.uk", "amazon.de", "amazon.co.jp", "amazon.com.au"},
+    "netflix": {"netflix.com", "nflxvideo.net"},
+    "facebook": {"facebook.com", "fb.com", "fbcdn.net", "meta.com"},
+    "instagram": {"instagram.com", "cdninstagram.com"},
+    "whatsapp": {"whatsapp.com", "whatsapp.net", "wa.me"},
+    "telegram": {"telegram.org", "telegram.me", "t.me"},
+    "linkedin": {"linkedin.com", "licdn.com", "lnkd.in"},
+    "dropbox": {"dropbox.com", "dropboxusercontent.com"},
+    "docusign": {"docusign.com", "docusign.net"},
+    "coinbase": {"coinbase.com"},
+    "binance": {"binance.com"},
+    "metamask": {"metamask.io"},
+    "dhl": {"dhl.com", "dhl.de", "dhl.co.uk", "dhlparcel.co.uk", "dhlparcel.nl"},
+    "fedex": {"fedex.com"},
+    "usps": {"usps.com"},
+}
+BRANDS = set(BRAND_DOMAINS)
+# Words phishing hosts glue onto a brand name, as in "appleid" or "securepaypal"
+IMPERSONATION_AFFIXES = (
+    "id", "my", "login", "signin", "secure", "verify", "account", "accounts", "support", "help",
+    "update", "service", "online", "auth", "wallet", "billing", "official", "team",
+)
+# Digits used as look-alike letters ("paypa1", "amaz0n")
+DIGIT_CONFUSABLES = str.maketrans({"0": "o", "1": "l", "3": "e", "4": "a", "5": "s", "7": "t"})
+# Second-level public suffixes common enough to matter when finding the registrable label
+TWO_LEVEL_SUFFIXES = {
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "com.au", "net.au", "co.nz", "co.jp", "co.kr",
+    "com.br", "com.cn", "com.mx", "co.in", "co.za", "com.sg", "com.my", "com.tr", "com.vn",
+}
+# Non-Latin letters that render like Latin ones, mapped back for brand matching
+CONFUSABLES = str.maketrans({
+    "а": "a", "е": "e", "о": "o", "р": "p", "с": "c", "у": "y", "х": "x", "і": "i", "ј": "j",
+    "ѕ": "s", "ԁ": "d", "ɡ": "g", "ո": "n", "α": "a", "ο": "o", "ρ": "p", "ν": "v", "τ": "t",
+})
+PATH_KEYWORDS = ("login", "signin", "verify", "account", "update", "secure", "wallet", "confirm", "unlock")
+
+
+class LexicalVerdict:
+    """Score in [0, 1] (higher = more suspicious) and the features that contributed."""
+
+    def __init__(self, score: float, reasons: list):
+        self.score = score
+        self.reasons = reasons
+
+    @property
+    def malicious(self) -> bool:
+        return self.score >= LEXICAL_MALICIOUS_THRESHOLD
+
+    @property
+    def benign(self) -> bool:
+        return self.score <= LEXICAL_BENIGN_THRESHOLD
+
+
+def shannon_entropy(text: str) -> float:
+    if not text:
+        return 0.0
+    counts = Counter(text)
+    return -sum(n / len(text) * math.log2(n / len(text)) for n in counts.values())
+
+
+def _is_ip_literal(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        pass
+    # Integer / hex forms browsers still resolve, e.g. http://3232235777/ or 0xC0A80101
+    return host.isdigit() or (host.startswith("0x") and all(c in "0123456789abcdef" for c in host[2:]))
+
+
+def _unicode_label(label: str) -> str:
+    if label.startswith("xn--"):
+        try:
+            return label.encode("ascii").decode("idna")
+        except UnicodeError:
+            return label
+    return label
+
+
+def _scripts(text: str) -> set:
+    scripts = set()
+    for ch in text:
+        if ch.isalpha():
+            # e.g. "LATIN SMALL LETTER A", "CYRILLIC SMALL LETTER A"
+            scripts.add(unicodedata.name(ch, "UNKNOWN").split(" ")[0])
+    return scripts
+
+
+def _registrable_domain(labels: list) -> str:
+    if len(labels) >= 3 and ".".join(labels[-2:]) in TWO_LEVEL_SUFFIXES:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def _brand_owns(brand: str, registrable: str) -> bool:
+    # Listed domains, plus the brand's own name under a country TLD (paypal.de, apple.co.uk)
+    name, _, suffix = registrable.partition(".")
+    return registrable in BRAND_DOMAINS[brand] or (name == brand and suffix.split(".")[-1] not in SUSPICIOUS_TLDS)
+
+
+def _impersonates(token: str, brand: str) -> bool:
+    """
+    Whole-token match against the brand, allowing look-alike digits, one
+    substituted letter in longer brand names, and phishing affixes
+    ("appleid", "securepaypal"). Plain prefixes don't count, so "applebees"
+    or "appleton" are not Apple.
+    """
+    if token == brand or (not any(c.isdigit() for c in brand) and token.translate(DIGIT_CONFUSABLES) == brand):
+        return True
+    if len(brand) >= 6 and len(token) == len(brand) and sum(a != b for a, b in zip(token, brand)) == 1:
+        return True
+    return any(token in (brand + affix, affix + brand) for affix in IMPERSONATION_AFFIXES)
+
+
+def score_url(url: str) -> LexicalVerdict:
+    """
+    Cheap, offline suspicion score from the URL text alone: IP-literal hosts,
+    userinfo tricks, punycode / mixed-script homoglyphs, brand names outside
+    the brand's own domain, suspicious TLDs, deep subdomains, high-entropy
+    hosts and credential-themed paths. No network I/O.
+    """
+    try:
+        p = urlparse(url.strip())
+        host = (p.hostname or "").rstrip(".")
+        port = p.port
+    except ValueError:
+        return LexicalVerdict(0.0, [])
+    if not host:
+        return LexicalVerdict(0.0, [])
+
+    score = 0.0
+    reasons = []
+
+    def flag(weight: float, reason: str):
+        nonlocal score
+        score += weight
+        reasons.append(reason)
+
+    if _is_ip_literal(host):
+        flag(0.5, "IP address used as host")
+        labels = []
+    else:
+        labels = host.split(".")
+
+    if "@" in p.netloc:
+        flag(0.4, "credentials/'@' in the authority hide the real host")
+    if port and port not in (80, 443):
+        flag(0.1, f"non-standard port {port}")
+
+    if labels:
+        unicode_labels = [_unicode_label(label) for label in labels]
+        unicode_host = ".".join(unicode_labels).lower()
+        if any(len(_scripts(label)) > 1 for label in unicode_labels):
+            flag(0.6, "mixed-script domain (possible homoglyph)")
+        elif any(label.startswith("xn--") for label in labels) or not host.isascii():
+            flag(0.2, "internationalized (punycode) domain")
+
+        registrable = _registrable_domain(labels)
+        # Matched on the de-confused Unicode form, so "pаypal" (Cyrillic а) counts too
+        tokens = re.split(r"[^a-z0-9]+", unicode_host.translate(CONFUSABLES))
+        brand = next((b for b in sorted(BRANDS)
+                      if not _brand_owns(b, registrable) and any(_impersonates(t, b) for t in tokens)), None)
+        if brand:
+            flag(0.5, f"brand '{brand}' in an unrelated domain")
+
+        if labels[-1] in SUSPICIOUS_TLDS:
+            flag(0.25, f"suspicious TLD '.{labels[-1]}'")
+
+        subdomains = len(labels) - (3 if ".".join(labels[-2:]) in TWO_LEVEL_SUFFIXES else 2)
+        if subdomains >= 4:
+            flag(0.2, f"{subdomains} subdomain levels")
+        elif subdomains == 3:
+            flag(0.1, f"{subdomains} subdomain levels")
+
+        longest = max(labels, key=len)
+        if len(longest) >= 12 and shannon_entropy(longest) > 3.7:
+            flag(0.15, "random-looking host name")
+        if unicode_host.count("-") >= 3:
+            flag(0.15, "many hyphens in host")
+
+    path = (p.path + "?" + p.query).lower()
+    keywords = [k for k in PATH_KEYWORDS if k in path]
+    if keywords:
+        flag(min(0.2, 0.1 * len(keywords)), f"credential-themed path ({', '.join(keywords)})")
+    if len(url) > 100:
+        flag(0.1, "very long URL")
+
+    return LexicalVerdict(min(1.0, round(score, 3)), reasons)
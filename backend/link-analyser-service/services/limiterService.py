@@ -0,0 +1,48 @@
+import os
+import asyncio
+from contextlib import asynccontextmanager
+
+LINK_GLOBAL_CONCURRENCY = int(os.getenv("LINK_GLOBAL_CONCURRENCY", 20))
+LINK_PER_HOST_CONCURRENCY = int(os.getenv("LINK_PER_HOST_CONCURRENCY", 2))
+
+
+class ConcurrencyLimiter:
+    """
+    Caps how many link analyses run at once, both overall and per host, so a
+    batch full of URLs on one domain neither hogs the service nor hammers that
+    host. Per-host semaphores are created on demand and dropped once idle.
+    """
+
+    def __init__(self, global_limit: int = LINK_GLOBAL_CONCURRENCY,
+                 per_host_limit: int = LINK_PER_HOST_CONCURRENCY):
+        self.global_limit = max(1, global_limit)
+        self.per_host_limit = max(1, per_host_limit)
+        self._global = None
+        self._hosts = {}  # host -> [semaphore, users]
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        if self._global is None:
+            # Created lazily so it binds to the running event loop
+            self._global = asyncio.Semaphore(self.global_limit)
+
+        entry = self._hosts.setdefault(host, [asyncio.Semaphore(self.per_host_limit), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                async with self._global:
+                    yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._hosts[host]
+
+    def metrics(self) -> dict:
+        return {
+            "global_limit": self.global_limit,
+            "per_host_limit": self.per_host_limit,
+            "active_hosts": len(self._hosts),
+        }
+
+
+link_limiter = ConcurrencyLimiter()
@@ -0,0 +1,90 @@
+import os
+import codecs
+from html.parser import HTMLParser
+
+# Stop collecting form actions after this many forms
+MAX_FORMS = int(os.getenv("LINK_MAX_FORMS", 50))
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+
+class PageScanner(HTMLParser):
+    """
+    Event-based extraction of the first <title> and every <form action>.
+
+    Fed incrementally as the body streams in; `done` turns true once the
+    document is closed (</html>) or MAX_FORMS forms have been seen, so the
+    caller can stop reading. No tree is built.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.form_actions = []
+        self.done = False
+        self._title_parts = None
+        self._title_seen = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title" and not self._title_seen:
+            self._title_parts = []
+        elif tag == "form":
+            self.form_actions.append(dict(attrs).get("action") or "")
+            if len(self.form_actions) >= MAX_FORMS:
+                self.done = True
+
+    def handle_data(self, data):
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._title_parts is not None:
+            self._finish_title()
+        elif tag == "html":
+            self.done = True
+
+    def _finish_title(self):
+        self.title = "".join(self._title_parts).strip()
+        self._title_parts = None
+        self._title_seen = True
+
+    def close(self):
+        super().close()
+        # Unterminated <title> at the end of a truncated body
+        if self._title_parts is not None:
+            self._finish_title()
+
+
+def is_html(headers: dict) -> bool:
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    # Servers often omit the header on phishing kits; treat that as HTML
+    return not content_type or content_type in HTML_CONTENT_TYPES
+
+
+def response_charset(headers: dict) -> str:
+    content_type = headers.get("content-type", "")
+    if "charset=" in content_type:
+        charset = content_type.split("charset=", 1)[1].split(";")[0].strip().strip('"')
+        try:
+            codecs.lookup(charset)
+            return charset
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+async def scan_page(chunks, headers: dict) -> tuple[str, list[str]]:
+    """
+    Consume an async iterator of body chunks and return (title, form actions).
+    Stops pulling chunks as soon as the scanner has seen enough.
+    """
+    scanner = PageScanner()
+    decoder = codecs.getincrementaldecoder(response_charset(headers))(errors="replace")
+    async for chunk in chunks:
+        scanner.feed(decoder.decode(chunk))
+        if scanner.done:
+            break
+    else:
+        scanner.feed(decoder.decode(b"", final=True))
+    scanner.close()
+    return scanner.title, scanner.form_actions
@@ -0,0 +1,285 @@
+import os
+import ssl
+import socket
+import asyncio
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+import whois
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from services.cacheService import dns_cache, whois_cache
+from services.pageService import is_html, scan_page
+
+# Per-request timeout for a single hop / lookup
+PROBE_TIMEOUT = float(os.getenv("LINK_PROBE_TIMEOUT", 5))
+# Wall-clock budget for a whole analysis (redirect walk + enrichment)
+ANALYSIS_DEADLINE = float(os.getenv("LINK_ANALYSIS_DEADLINE", 15))
+# Threads for blocking WHOIS lookups; bounds how many can hang at once
+LOOKUP_WORKERS = int(os.getenv("LINK_LOOKUP_WORKERS", 16))
+# Most of a page body we will read from a single hop
+MAX_BODY_BYTES = int(os.getenv("LINK_MAX_BODY_BYTES", 512 * 1024))
+BODY_CHUNK_SIZE = 16 * 1024
+
+REDIRECT_STATUS_CODES = (301, 302, 307, 308)
+USER_AGENT = "Mozilla/5.0 (compatible; link-analyser/1.0)"
+
+_lookup_executor = ThreadPoolExecutor(max_workers=LOOKUP_WORKERS, thread_name_prefix="link-lookup")
+
+
+async def _run_blocking(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_lookup_executor, fn, *args)
+
+
+async def _getaddrinfo(hostname: str) -> str | None:
+    try:
+        infos = await asyncio.wait_for(
+            asyncio.get_running_loop().getaddrinfo(hostname, None, type=socket.SOCK_STREAM),
+            PROBE_TIMEOUT
+        )
+        # Prefer IPv4 like gethostbyname did, but fall back to IPv6-only hosts
+        infos = sorted(infos, key=lambda info: info[0] != socket.AF_INET)
+        return infos[0][4][0] if infos else None
+    except Exception:
+        return None
+
+
+async def resolve_ip(hostname: str) -> str | None:
+    return await dns_cache.get_or_load(hostname.lower(), lambda: _getaddrinfo(hostname))
+
+
+def parse_certificate(der: bytes) -> dict:
+    """Issuer CN, expiry and DNS SANs of a DER-encoded peer certificate."""
+    cert = x509.load_der_x509_certificate(der)
+    common_names = cert.issuer.get_attributes_for_oid(NameOID.COMMON_NAME)
+    try:
+        sans = cert.extensions.get_extension_for_class(x509.SubjectAlternativeName).value.get_values_for_type(x509.DNSName)
+    except x509.ExtensionNotFound:
+        sans = []
+    not_after = getattr(cert, "not_valid_after_utc", None) or cert.not_valid_after
+    return {
+        "issuer": common_names[0].value if common_names else None,
+        "not_after": not_after.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "sans": sans,
+    }
+
+
+def get_creation_date(hostname: str) -> str | None:
+    """Domain registration date from WHOIS as an ISO string, or None if unknown."""
+    try:
+        w = whois.whois(hostname)
+        created = w.creation_date
+        if isinstance(created, list):
+            created = created[0]
+        if not isinstance(created, datetime.datetime):
+            return None
+        # Compared against naive local time, as before
+        return created.replace(tzinfo=None).isoformat()
+    except:
+        return None
+
+
+async def lookup_domain_age(hostname: str) -> int:
+    """Days since the domain was registered according to WHOIS, or -1 if unknown."""
+    created = await whois_cache.get_or_load(
+        hostname.lower(), lambda: _run_blocking(get_creation_date, hostname)
+    )
+    if created is None:
+        return -1
+    return (datetime.datetime.now() - datetime.datetime.fromisoformat(created)).days
+
+
+def _is_certificate_error(exc: BaseException) -> bool:
+    while exc is not None:
+        if isinstance(exc, ssl.SSLCertVerificationError) or "CERTIFICATE_VERIFY_FAILED" in str(exc):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+async def _read_headers(reader) -> tuple[int, dict]:
+    status_line = await reader.readline()
+    parts = status_line.decode("latin-1").split(None, 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/") or not parts[1].isdigit():
+        raise ValueError(f"Malformed HTTP status line: {status_line[:100]!r}")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        # First occurrence wins (e.g. duplicate Location headers)
+        headers.setdefault(name.strip().lower(), value.strip())
+    return int(parts[1]), headers
+
+
+async def _iter_body(reader, headers: dict, limit: int):
+    """Yield the response body in chunks (identity, Content-Length or chunked), at most `limit` bytes."""
+    remaining = limit
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while remaining > 0:
+            size_line = await reader.readline()
+            size = int(size_line.split(b";")[0].strip() or b"0", 16)
+            if size == 0:
+                return
+            while size > 0 and remaining > 0:
+                chunk = await reader.readexactly(min(size, remaining, BODY_CHUNK_SIZE))
+                size -= len(chunk)
+                remaining -= len(chunk)
+                yield chunk
+            if size > 0:
+                return
+            await reader.readline()
+        return
+
+    length = headers.get("content-length")
+    if length and length.isdigit():
+        remaining = min(int(length), limit)
+    while remaining > 0:
+        chunk = await reader.read(min(BODY_CHUNK_SIZE, remaining))
+        if not chunk:
+            return
+        remaining -= len(chunk)
+        yield chunk
+
+
+async def _exchange(url: str, ip: str, verify: bool) -> dict:
+    parsed = urlparse(url)
+    https = parsed.scheme == "https"
+    hostname = parsed.hostname or ""
+    port = parsed.port or (443 if https else 80)
+
+    context = None
+    if https:
+        context = ssl.create_default_context()
+        if not verify:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+
+    reader, writer = await asyncio.open_connection(
+        ip, port, ssl=context, server_hostname=hostname if https else None
+    )
+    try:
+        certificate = None
+        if https:
+            der = writer.get_extra_info("ssl_object").getpeercert(binary_form=True)
+            if der:
+                certificate = parse_certificate(der)
+
+        host_header = hostname if parsed.port is None else f"{hostname}:{parsed.port}"
+        target = (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+        writer.write(
+            f"GET {target} HTTP/1.1\r\n"
+            f"Host: {host_header}\r\n"
+            f"User-Agent: {USER_AGENT}\r\n"
+            "Accept: text/html,*/*;q=0.8\r\n"
+            "Accept-Encoding: identity\r\n"
+            "Connection: close\r\n\r\n".encode("latin-1")
+        )
+        await writer.drain()
+
+        status_code, headers = await _read_headers(reader)
+        while 100 <= status_code < 200:
+            status_code, headers = await _read_headers(reader)
+
+        # Only final HTML pages are scanned; redirects, errors and binaries skip the body
+        title, forms = ("", [])
+        if status_code == 200 and is_html(headers):
+            title, forms = await scan_page(_iter_body(reader, headers, MAX_BODY_BYTES), headers)
+        return {"status_code": status_code, "headers": headers, "title": title,
+                "form_actions": forms, "certificate": certificate}
+    finally:
+        writer.transport.abort()
+
+
+async def probe_hop(url: str) -> dict:
+    """
+    Fetch one hop over a single connection: for https, one TLS handshake gives
+    the verification result, the peer certificate and the HTTP response. Only
+    when verification fails is the host contacted again, without verification,
+    so the page can still be inspected (tls_valid=False).
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError(f"Unsupported URL: {url}")
+    ip = await resolve_ip(parsed.hostname)
+    if ip is None:
+        raise OSError(f"Could not resolve host: {parsed.hostname}")
+
+    https = parsed.scheme == "https"
+    try:
+        result = await _exchange(url, ip, verify=True)
+        tls_valid = True if https else None
+    except (ssl.SSLError, OSError) as e:
+        if not (https and _is_certificate_error(e)):
+            raise
+        result = await _exchange(url, ip, verify=False)
+        tls_valid = False
+    return {"ip": ip, "tls_valid": tls_valid, **result}
+
+
+async def fetch_redirect_chain(url: str, max_hops: int = 5, deadline: float = ANALYSIS_DEADLINE) -> list[dict]:
+    """
+    Follow the redirect chain hop by hop as fast as possible. Each hop is one
+    connection (see probe_hop); WHOIS lookups for every host run concurrently
+    in the background. Everything shares one deadline; lookups that have not
+    finished by then are reported with their "unknown" values.
+    """
+    loop = asyncio.get_running_loop()
+    stop_at = loop.time() + deadline
+    hops = []
+    ages = {}  # hostname -> WHOIS task, so repeated hosts are looked up once
+    error = None
+    current_url = url
+
+    for _ in range(max_hops + 1):
+        hostname = urlparse(current_url).hostname or ""
+        if hostname not in ages:
+            ages[hostname] = asyncio.create_task(lookup_domain_age(hostname))
+
+        remaining = stop_at - loop.time()
+        try:
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            hop = await asyncio.wait_for(probe_hop(current_url), min(remaining, PROBE_TIMEOUT))
+        except asyncio.TimeoutError:
+            message = "Analysis deadline exceeded" if stop_at - loop.time() <= 0 else "Timed out"
+            error = {"url": current_url, "error": message}
+            break
+        except Exception as e:
+            error = {"url": current_url, "error": str(e) or type(e).__name__}
+            break
+
+        hops.append((current_url, hostname, hop))
+
+        location = hop["headers"].get("location")
+        if hop["status_code"] in REDIRECT_STATUS_CODES and location:
+            current_url = urljoin(current_url, location)
+            continue
+        break
+
+    tasks = list(ages.values())
+    _, pending = await asyncio.wait(tasks, timeout=max(0.0, stop_at - loop.time()))
+    for task in pending:
+        task.cancel()
+
+    chain = []
+    for hop_url, hostname, hop in hops:
+        task = ages[hostname]
+        age_days = task.result() if task.done() and not task.cancelled() and not task.exception() else -1
+        certificate = hop["certificate"] or {}
+        chain.append({
+            "url": hop_url,
+            "status_code": hop["status_code"],
+            "ip": hop["ip"],
+            "tls_valid": hop["tls_valid"],
+            "cert_issuer": certificate.get("issuer"),
+            "cert_not_after": certificate.get("not_after"),
+            "cert_sans": certificate.get("sans", []),
+            "domain_age_days": age_days,
+            "title": hop["title"],
+            "form_actions": hop["form_actions"],
+        })
+    if error:
+        chain.append(error)
+    return chain
@@ -0,0 +1,167 @@
+import os
+import time
+import asyncio
+from bisect import bisect_right
+from urllib.parse import urlparse
+
+# Optional list file (see threat_intel.example.txt); unset = empty index
+THREAT_INTEL_FILE = os.getenv("THREAT_INTEL_FILE")
+# How often (seconds) to check the file's mtime for hot reloads
+THREAT_INTEL_RELOAD_INTERVAL = float(os.getenv("THREAT_INTEL_RELOAD_INTERVAL", 5))
+
+# block: known bad, answer unsafe immediately
+# shortener: always probe, even if a parent domain is allowlisted
+# allow: trusted, answer safe immediately
+CATEGORIES = ("block", "shortener", "allow")
+
+
+def _host(hostname: str) -> str:
+    return hostname.strip().rstrip(".").lower()
+
+
+def url_key(url: str) -> str | None:
+    """host + path, the form URL prefixes are stored and matched in (scheme, query and fragment ignored)."""
+    try:
+        p = urlparse(url if "://" in url else f"http://{url}")
+    except ValueError:
+        return None
+    if not p.hostname:
+        return None
+    return _host(p.hostname) + (p.path or "/")
+
+
+def _longest_prefix(prefixes: list, key: str) -> str | None:
+    """Longest entry of the sorted list `prefixes` that is a prefix of `key`, via bisection."""
+    while key:
+        i = bisect_right(prefixes, key)
+        if i == 0:
+            return None
+        candidate = prefixes[i - 1]
+        if key.startswith(candidate):
+            return candidate
+        # Any matching prefix must also be a prefix of the common part
+        key = key[:len(os.path.commonprefix([key, candidate]))]
+    return None
+
+
+class IntelIndex:
+    """Immutable lookup tables for one version of the list file."""
+
+    def __init__(self, domains: dict = None, prefixes: dict = None):
+        # category -> set of domains (matching the domain and all its subdomains)
+        self.domains = domains or {c: set() for c in CATEGORIES}
+        # category -> sorted list of url_key prefixes
+        self.prefixes = prefixes or {c: [] for c in CATEGORIES}
+
+    @classmethod
+    def load(cls, path: str):
+        domains = {c: set() for c in CATEGORIES}
+        prefixes = {c: set() for c in CATEGORIES}
+        with open(path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.split("#", 1)[0].strip()
+                if not line:
+                    continue
+                category, _, entry = line.partition(" ")
+                entry = entry.strip()
+                if category not in CATEGORIES or not entry:
+                    print(f"Skipping threat intel line {line_no}: {line!r}")
+                    continue
+                if "/" in entry:
+                    key = url_key(entry)
+                    if key:
+                        prefixes[category].add(key)
+                else:
+                    domains[category].add(_host(entry))
+        return cls(domains, {c: sorted(p) for c, p in prefixes.items()})
+
+    def size(self) -> int:
+        return sum(len(d) for d in self.domains.values()) + sum(len(p) for p in self.prefixes.values())
+
+    def match(self, url: str):
+        """
+        Return (category, matched entry) for the first category that lists the
+        URL's host (or a parent domain) or a prefix of its host/path, checking
+        block, then shortener, then allow. None if nothing matches.
+        """
+        key = url_key(url)
+        if not key:
+            return None
+        host = key.split("/", 1)[0]
+        labels = host.split(".")
+        suffixes = [".".join(labels[i:]) for i in range(len(labels))]
+
+        for category in CATEGORIES:
+            listed = self.domains[category]
+            for suffix in suffixes:
+                if suffix in listed:
+                    return category, suffix
+            prefix = _longest_prefix(self.prefixes[category], key)
+            if prefix:
+                return category, prefix
+        return None
+
+
+class ThreatIntel:
+    """
+    Local block/allow knowledge consulted before any network probe.
+
+    Domains live in hash sets (a host matches itself and every parent
+    domain), URL prefixes in sorted lists searched by bisection, so a lookup
+    is a handful of set probes plus a binary search. The list file is
+    re-read in a worker thread when its mtime changes, and the new index is
+    swapped in whole, so lookups never see a half-loaded list.
+    """
+
+    def __init__(self, path: str = THREAT_INTEL_FILE, reload_interval: float = THREAT_INTEL_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.index = IntelIndex()
+        self.loaded_mtime = None
+        self.loaded_at = None
+        self.error = None
+        self._checked_at = 0.0
+        self._reloading = False
+        if path:
+            self._reload()
+
+    def _reload(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+            if mtime == self.loaded_mtime:
+                return
+            self.index = IntelIndex.load(self.path)
+            self.loaded_mtime = mtime
+            self.loaded_at = time.time()
+            self.error = None
+            print(f"Loaded threat intel index from {self.path} ({self.index.size()} entries)")
+        except OSError as e:
+            # Keep serving the last good index
+            self.error = str(e)
+            print(f"Error loading threat intel from {self.path}: {str(e)}")
+
+    async def refresh(self):
+        """Reload the list if the file changed; checks at most once per reload_interval."""
+        now = time.monotonic()
+        if not self.path or self._reloading or now - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = now
+        self._reloading = True
+        try:
+            await asyncio.to_thread(self._reload)
+        finally:
+            self._reloading = False
+
+    def lookup(self, url: str):
+        return self.index.match(url)
+
+    def status(self) -> dict:
+        return {
+            "path": self.path,
+            "entries": self.index.size(),
+            "loaded_at": self.loaded_at,
+            "error": self.error,
+        }
+
+
+threat_intel = ThreatIntel()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Run from the service directory like main.py: services/ importable, common/ from the parent
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+sys.path.append(os.path.dirname(SERVICE_DIR))
@@ -0,0 +1,38 @@
+import pytest
+
+from services.lexicalService import LEXICAL_MALICIOUS_THRESHOLD, score_url
+
+
+def _brand_flagged(url: str) -> bool:
+    return any(reason.startswith("brand ") for reason in score_url(url).reasons)
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.applebees.com/en/account/login",
+    "https://appleton-library.org/login",
+    "https://www.dhlparcel.co.uk/en/track",
+    "https://outlook.live.com/mail/login",
+    "https://login.microsoftonline.com/",
+    "https://paypal.de/signin",
+])
+def test_legitimate_domains_are_not_impersonation(url):
+    assert not _brand_flagged(url)
+    assert score_url(url).score < LEXICAL_MALICIOUS_THRESHOLD
+
+
+@pytest.mark.parametrize("url", [
+    "https://paypal-secure.com/login",
+    "http://appleid-verify.xyz/login",
+    "http://paypa1.com/login",
+    "http://amaz0n.co/verify",
+    "https://outlook.office-mail.xyz/",
+    "https://paypal.xyz/",
+])
+def test_brand_outside_its_domains_is_flagged(url):
+    assert _brand_flagged(url)
+
+
+def test_homoglyph_brand_is_answered_unsafe():
+    verdict = score_url("https://xn--pple-43d.com/login")  # Cyrillic "а" + "pple"
+    assert verdict.malicious
+    assert any("apple" in reason for reason in verdict.reasons)
@@ -0,0 +1,85 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import controllers.linkController as linkController
+from controllers.linkController import handle_link_batch_analysis, normalize_url
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("  HTTPS://Example.COM  ", "https://example.com/"),
+    ("http://example.com:80/a#frag", "http://example.com/a"),
+    ("https://example.com:8443/a?q=1", "https://example.com:8443/a?q=1"),
+    ("https://user:pw@Example.com/", "https://user:pw@example.com/"),
+    ("http://[::1]:8080/x", "http://[::1]:8080/x"),
+    ("ftp://example.com/file", "ftp://example.com/file"),
+    ("http://[abc/x", "http://[abc/x"),
+])
+def test_normalize_url(raw, expected):
+    assert normalize_url(raw) == expected
+
+
+@pytest.fixture
+def stubbed(monkeypatch):
+    analysed = []
+    saved = []
+
+    async def fake_analyze_link(url):
+        analysed.append(url)
+        await asyncio.sleep(0)
+        if "boom" in url:
+            raise RuntimeError("probe failed")
+        return {"safe": True, "issues": [], "redirect_details": [], "url_chain": [url]}
+
+    def fake_save(uid, token, url, result):
+        saved.append(url)
+        return f"id-{len(saved)}"
+
+    monkeypatch.setattr(linkController, "analyze_link", fake_analyze_link)
+    monkeypatch.setattr(linkController, "save_to_history", fake_save)
+    return analysed, saved
+
+
+def _run_batch(urls):
+    async def run():
+        lines = await handle_link_batch_analysis({"urls": urls, "rawAuthHeader": "Bearer tok"}, {"uid": "u"})
+        return [json.loads(line) async for line in lines]
+    return asyncio.run(run())
+
+
+def test_batch_dedupes_and_reports_every_url(stubbed):
+    analysed, saved = stubbed
+    lines = _run_batch(["https://a.example/x", "HTTPS://A.example/x#top", "https://b.example/", "", 42,
+                        "https://boom.example/"])
+
+    assert sorted(analysed) == ["https://a.example/x", "https://b.example/", "https://boom.example/"]
+    by_url = {line.get("url"): line for line in lines}
+    assert by_url["https://a.example/x"]["inputs"] == ["https://a.example/x", "HTTPS://A.example/x#top"]
+    assert by_url["https://boom.example/"]["error"] == "probe failed"
+    assert by_url[""]["error"] and by_url[42]["error"]
+    assert lines[-1]["done"] is True and lines[-1]["analysed"] == 2
+    assert set(lines[-1]["history_ids"]) == {"https://a.example/x", "https://b.example/"}
+    assert sorted(saved) == ["https://a.example/x", "https://b.example/"]
+
+
+def test_unparsable_url_is_a_per_url_error(stubbed):
+    analysed, saved = stubbed
+    lines = _run_batch(["http://[abc/x", "https://ok.example/"])
+
+    assert lines[-1]["done"] is True and lines[-1]["analysed"] == 1
+    errors = [line for line in lines if line.get("url") == "http://[abc/x"]
+    assert errors and "Invalid URL" in errors[0]["error"]
+    assert saved == ["https://ok.example/"]
+
+
+def test_batch_limits():
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(handle_link_batch_analysis({"urls": [], "rawAuthHeader": "Bearer t"}, {"uid": "u"}))
+    assert e.value.status_code == 400
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(handle_link_batch_analysis(
+            {"urls": ["https://x.example/"] * (linkController.LINK_BATCH_MAX_URLS + 1), "rawAuthHeader": "Bearer t"},
+            {"uid": "u"}))
+    assert e.value.status_code == 400
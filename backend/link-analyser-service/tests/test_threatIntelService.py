@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+import controllers.linkController as linkController
+from services.threatIntelService import IntelIndex, ThreatIntel, _longest_prefix, url_key
+
+
+@pytest.fixture
+def intel_file(tmp_path):
+    path = tmp_path / "intel.txt"
+    path.write_text(
+        "# comment\n"
+        "block evil.example\n"
+        "block docs.example/phish/\n"
+        "block docs.example/phish/deeper/\n"
+        "shortener bit.example\n"
+        "allow docs.example\n"
+        "allow sub.bit.example\n"
+        "bogus line\n",
+        encoding="utf-8",
+    )
+    return path
+
+
+def test_url_key_ignores_scheme_query_and_fragment():
+    assert url_key("HTTPS://Docs.Example./a/b?q=1#f") == "docs.example/a/b"
+    assert url_key("docs.example") == "docs.example/"
+    assert url_key("http://[abc/x") is None
+
+
+def test_longest_prefix_picks_the_longest_match():
+    prefixes = sorted(["a.example/", "a.example/x/", "a.example/x/y/", "b.example/"])
+    assert _longest_prefix(prefixes, "a.example/x/y/z") == "a.example/x/y/"
+    assert _longest_prefix(prefixes, "a.example/x/q") == "a.example/x/"
+    assert _longest_prefix(prefixes, "a.example/w") == "a.example/"
+    assert _longest_prefix(prefixes, "a.exampl") is None
+    assert _longest_prefix(prefixes, "c.example/") is None
+
+
+def test_match_categories_in_order(intel_file):
+    index = IntelIndex.load(str(intel_file))
+    assert index.match("https://evil.example/") == ("block", "evil.example")
+    assert index.match("https://a.b.evil.example/x") == ("block", "evil.example")
+    assert index.match("https://notevil.example/") is None
+    # A blocked prefix wins over the allowlisted domain it lives on
+    assert index.match("https://docs.example/phish/deeper/page") == ("block", "docs.example/phish/deeper/")
+    assert index.match("https://docs.example/phish/x") == ("block", "docs.example/phish/")
+    assert index.match("https://docs.example/guide") == ("allow", "docs.example")
+    # Shorteners are probed even under an allowlisted parent
+    assert index.match("https://sub.bit.example/abc") == ("shortener", "bit.example")
+    assert index.size() == 6
+
+
+def test_reload_on_change(intel_file):
+    intel = ThreatIntel(str(intel_file), reload_interval=0)
+    assert intel.lookup("https://fresh.example/") is None
+    intel_file.write_text("block fresh.example\n", encoding="utf-8")
+    intel.loaded_mtime = None
+    asyncio.run(intel.refresh())
+    assert intel.lookup("https://fresh.example/") == ("block", "fresh.example")
+    assert intel.status()["entries"] == 1
+
+
+def test_shortener_leading_to_blocked_site_is_unsafe(intel_file, monkeypatch):
+    monkeypatch.setattr(linkController, "threat_intel", ThreatIntel(str(intel_file), reload_interval=3600))
+
+    async def fake_chain(url):
+        return [
+            {"url": url, "status": 301, "tls_valid": True},
+            {"url": "https://landing.example/", "status": 302, "tls_valid": True},
+            {"url": "https://evil.example/login", "status": 200, "tls_valid": True},
+        ]
+
+    monkeypatch.setattr(linkController, "fetch_redirect_chain", fake_chain)
+    result = asyncio.run(linkController.analyze_link("https://bit.example/abc"))
+    assert result["safe"] is False
+    assert any(issue.startswith("Listed on threat intelligence blocklist: evil.example") for issue in result["issues"])
+    explanations = linkController.generate_explanations(result["issues"])
+    assert "known phishing" in explanations[0]["explanation"]
+
+
+def test_shortener_leading_to_suspicious_url_is_unsafe(intel_file, monkeypatch):
+    monkeypatch.setattr(linkController, "threat_intel", ThreatIntel(str(intel_file), reload_interval=3600))
+
+    async def fake_chain(url):
+        return [
+            {"url": url, "status": 301, "tls_valid": True},
+            {"url": "https://xn--pple-43d.com/login", "status": 200, "tls_valid": True},
+        ]
+
+    monkeypatch.setattr(linkController, "fetch_redirect_chain", fake_chain)
+    result = asyncio.run(linkController.analyze_link("https://bit.example/abc"))
+    assert result["safe"] is False
+    assert any(issue.startswith("Suspicious URL structure") and "xn--pple-43d.com" in issue
+               for issue in result["issues"])
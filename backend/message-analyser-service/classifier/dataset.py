@@ -0,0 +1,114 @@
+# dataset.py
+#
+# Labelled examples for the local message classifier.
+#
+# Examples come from past analyses: either a JSONL file (one object per line
+# with "message"/"originalMessage" and "classification"/"label", optionally
+# "scam_probability"/"scamProbability" and "source") or, with --firestore,
+# straight from the History Service's Firestore "messageAnalyser"
+# subcollections. Only records whose verdict came from the LLM
+# (source "llm") are used, so the classifier is never trained or evaluated
+# on its own or the verdict cache's answers, and evaluation measures
+# agreement with the LLM. Records written before "source" was recorded are
+# skipped unless --allow_missing_source is given.
+
+import json
+import os
+import random
+import sys
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from services.verdictCacheService import message_key  # noqa: E402
+
+
+def _probability(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_example(record, min_confidence=0.0, allow_missing_source=False):
+    """(message, label) from an LLM-verdict history record, or None if unusable or not confident enough."""
+    source = record.get("source")
+    if source != "llm" and not (source is None and allow_missing_source):
+        return None
+    message = record.get("message") or record.get("originalMessage")
+    classification = record.get("classification") or record.get("label")
+    if not isinstance(message, str) or not message.strip() or classification not in ("Scam", "Safe"):
+        return None
+    label = 1 if classification == "Scam" else 0
+
+    probability = _probability(record.get("scam_probability", record.get("scamProbability")))
+    if min_confidence and probability is not None:
+        confidence = probability if label else 1 - probability
+        if confidence < min_confidence:
+            return None
+    return message, label
+
+
+def load_jsonl(path, min_confidence=0.0, allow_missing_source=False):
+    examples = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            example = to_example(json.loads(line), min_confidence, allow_missing_source)
+            if example:
+                examples.append(example)
+    return examples
+
+
+def load_firestore(min_confidence=0.0, limit=None, allow_missing_source=False):
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    if not firebase_admin._apps:
+        cred_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "firebase-service-account.json")
+        firebase_admin.initialize_app(credentials.Certificate(cred_path))
+    query = firestore.client().collection_group("messageAnalyser")
+    if limit:
+        query = query.limit(limit)
+    examples = []
+    for doc in query.stream():
+        example = to_example(doc.to_dict(), min_confidence, allow_missing_source)
+        if example:
+            examples.append(example)
+    return examples
+
+
+def split_by_campaign(examples, holdout=0.2, seed=13):
+    """
+    Train/holdout split that keeps every copy of a campaign (same normalized
+    text) on one side, so the holdout score isn't inflated by near-copies.
+    Duplicate copies are collapsed to one example.
+    """
+    groups = {}
+    for message, label in examples:
+        groups.setdefault(message_key(message), (message, label))
+    keys = sorted(groups)
+    random.Random(seed).shuffle(keys)
+    cut = int(len(keys) * (1 - holdout))
+    return [groups[k] for k in keys[:cut]], [groups[k] for k in keys[cut:]]
+
+
+def add_source_arguments(parser):
+    parser.add_argument('--data', type=str, help='JSONL file of past analyses.')
+    parser.add_argument('--firestore', action='store_true', help='Read past analyses from Firestore instead of --data.')
+    parser.add_argument('--limit', type=int, default=None, help='Max Firestore records to read.')
+    parser.add_argument('--min_confidence', type=float, default=0.0,
+                        help='Skip records whose LLM confidence in its own verdict is below this.')
+    parser.add_argument('--allow_missing_source', action='store_true',
+                        help='Also use records without a "source" field (written before it was recorded); '
+                             'only safe for data from before the verdict cache and local classifier were deployed.')
+
+
+def load_from_arguments(parser, args):
+    if args.firestore:
+        return load_firestore(args.min_confidence, args.limit, args.allow_missing_source)
+    if not args.data:
+        parser.error('one of --data or --firestore is required')
+    return load_jsonl(args.data, args.min_confidence, args.allow_missing_source)
@@ -0,0 +1,83 @@
+# evaluate.py
+#
+# Offline evaluation of the local classifier stage.
+#
+#   python classifier/evaluate.py --data history.jsonl
+#   python classifier/evaluate.py --firestore --model classifier/model.json.gz --output eval.json
+#
+# For the configured confidence band (and a sweep of alternatives) it
+# reports the fraction of messages decided locally, i.e. LLM calls avoided,
+# and how often those local verdicts agree with the LLM's label, including
+# how many LLM-flagged scams the local stage would have let through as Safe.
+
+import argparse
+import json
+import os
+import sys
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from dataset import add_source_arguments, load_from_arguments  # noqa: E402
+from services.classifierService import (  # noqa: E402
+    HashedNgramClassifier, MESSAGE_CLASSIFIER_PATH, CLASSIFIER_SCAM_THRESHOLD, CLASSIFIER_SAFE_THRESHOLD,
+)
+
+SWEEP = [(0.9, 0.1), (0.95, 0.05), (0.97, 0.03), (0.99, 0.01)]
+
+
+def band_report(scored, scam_threshold, safe_threshold):
+    """scored: list of (probability, label) pairs."""
+    local = [(p >= scam_threshold, label) for p, label in scored
+             if p >= scam_threshold or p <= safe_threshold]
+    agree = sum(1 for predicted_scam, label in local if predicted_scam == bool(label))
+    missed_scams = sum(1 for predicted_scam, label in local if not predicted_scam and label)
+    false_alarms = sum(1 for predicted_scam, label in local if predicted_scam and not label)
+    return {
+        'scam_threshold': scam_threshold,
+        'safe_threshold': safe_threshold,
+        'decided_locally': len(local),
+        'llm_calls_avoided': round(len(local) / len(scored), 4) if scored else 0.0,
+        'agreement': round(agree / len(local), 4) if local else None,
+        'scams_passed_as_safe': missed_scams,
+        'safe_flagged_as_scam': false_alarms,
+    }
+
+
+def evaluate(model, examples, scam_threshold=CLASSIFIER_SCAM_THRESHOLD, safe_threshold=CLASSIFIER_SAFE_THRESHOLD):
+    scored = [(model.predict_proba(message), label) for message, label in examples]
+    accuracy = sum(1 for p, label in scored if (p >= 0.5) == bool(label))
+    bands = {(scam_threshold, safe_threshold)} | set(SWEEP)
+    return {
+        'examples': len(scored),
+        'scam_share': round(sum(label for _, label in scored) / len(scored), 4) if scored else None,
+        'accuracy_at_0.5': round(accuracy / len(scored), 4) if scored else None,
+        'configured_band': band_report(scored, scam_threshold, safe_threshold),
+        'sweep': [band_report(scored, hi, lo) for hi, lo in sorted(bands)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate the local message classifier against LLM verdicts.')
+    add_source_arguments(parser)
+    parser.add_argument('--model', type=str, default=os.path.join(SERVICE_DIR, MESSAGE_CLASSIFIER_PATH),
+                        help='Exported model (classifier/train.py).')
+    parser.add_argument('--scam_threshold', type=float, default=CLASSIFIER_SCAM_THRESHOLD)
+    parser.add_argument('--safe_threshold', type=float, default=CLASSIFIER_SAFE_THRESHOLD)
+    parser.add_argument('--output', type=str, default=None, help='Also write the report to this JSON file.')
+    args = parser.parse_args()
+
+    examples = load_from_arguments(parser, args)
+    if not examples:
+        parser.error('no usable labelled examples')
+    model = HashedNgramClassifier.load(args.model)
+    report = evaluate(model, examples, args.scam_threshold, args.safe_threshold)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# train.py
+#
+# Trains the local message classifier from past LLM verdicts and exports it.
+#
+#   python classifier/train.py --data history.jsonl
+#   python classifier/train.py --firestore --min_confidence 0.8 --output classifier/model.json.gz
+#
+# Copies of the same campaign are collapsed and kept on one side of the
+# train/holdout split; the holdout report (see evaluate.py) is printed and
+# stored in the model's metadata. The service loads the model from
+# MESSAGE_CLASSIFIER_PATH at startup.
+
+import argparse
+import json
+import os
+import sys
+import time
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from dataset import add_source_arguments, load_from_arguments, split_by_campaign  # noqa: E402
+from evaluate import evaluate  # noqa: E402
+from services.classifierService import HashedNgramClassifier, MESSAGE_CLASSIFIER_PATH  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train and export the local message classifier.')
+    add_source_arguments(parser)
+    parser.add_argument('--output', type=str, default=os.path.join(SERVICE_DIR, MESSAGE_CLASSIFIER_PATH),
+                        help='Where to write the model.')
+    parser.add_argument('--bits', type=int, default=18, help='Feature hash size (2**bits buckets).')
+    parser.add_argument('--epochs', type=int, default=8)
+    parser.add_argument('--learning_rate', type=float, default=0.5)
+    parser.add_argument('--l2', type=float, default=1e-6)
+    parser.add_argument('--holdout', type=float, default=0.2, help='Fraction of campaigns held out for evaluation.')
+    args = parser.parse_args()
+
+    examples = load_from_arguments(parser, args)
+    train, holdout = split_by_campaign(examples, args.holdout)
+    if not train or len({label for _, label in train}) < 2:
+        parser.error('need both Scam and Safe examples to train')
+    print(f'{len(examples)} records, {len(train) + len(holdout)} distinct campaigns '
+          f'({len(train)} train / {len(holdout)} holdout)')
+
+    start = time.time()
+    model = HashedNgramClassifier(bits=args.bits).fit(
+        [m for m, _ in train], [label for _, label in train],
+        epochs=args.epochs, learning_rate=args.learning_rate, l2=args.l2)
+    print(f'Trained in {time.time() - start:.1f}s, {len(model.weights)} non-zero weights')
+
+    report = evaluate(model, holdout) if holdout else None
+    if report:
+        print(json.dumps(report, indent=2))
+
+    model.save(args.output, metadata={
+        'trained_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'train_examples': len(train),
+        'holdout': report,
+    })
+    print(f'Model written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
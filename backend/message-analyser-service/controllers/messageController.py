@@ -1,25 +1,25 @@
 import os
-import requests
 import json
+import asyncio
 from fastapi import HTTPException, status
-from groq import Groq
+from services.groqService import groq_client, GroqDeadlineExceeded, GROQ_MODEL
+from services.verdictCacheService import verdict_cache, message_key
+from services.classifierService import local_classifier
+from services.packService import (
+    BATCH_SYSTEM_PROMPT, pack_messages, build_pack_prompt, max_output_tokens, parse_pack_response,
+)
+from common.singleflight import SingleFlight
+from common.historyWriter import history_writer
 
 from dotenv import load_dotenv
 load_dotenv()
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    raise RuntimeError("Missing GROQ_API_KEY in .env")
+MESSAGE_BATCH_MAX_MESSAGES = int(os.getenv("MESSAGE_BATCH_MAX_MESSAGES", 500))
 
-# Initialize Groq LLM client
-client = Groq(api_key=GROQ_API_KEY)
+# Concurrent requests for the same (normalized) message share one LLM call
+analysis_flight = SingleFlight("message_analysis")
 
-# History Service config
-HISTORY_SERVICE_URL = os.getenv("HISTORY_SERVICE_URL", "http://0.0.0.0:8004")
-if not HISTORY_SERVICE_URL.endswith("/"):
-    HISTORY_SERVICE_URL = HISTORY_SERVICE_URL.rstrip("/")
-
-def analyze_with_groq(message: str) -> dict:
+async def analyze_with_groq(message: str) -> dict:
     """
     Send a prompt to Groq LLM to classify 'message' as 'Scam' or 'Safe'
     and get a short summary explaining why.
@@ -27,8 +27,8 @@ def analyze_with_groq(message: str) -> dict:
     """
 
     try:
-        resp = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
+        resp = await groq_client.complete(
+            model=GROQ_MODEL,
             messages=[
                 {
                     "role": "system",
@@ -83,12 +83,51 @@ def analyze_with_groq(message: str) -> dict:
 
         return {"classification": classification, "summary": summary, "scam_probability": scam_probability}
 
+    except GroqDeadlineExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"Groq LLM error: {str(e)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Groq LLM error: {str(e)}"
+        )
+
+async def analyze_pack_with_groq(pack: list[str]) -> list[dict | None]:
+    """
+    Classify several messages with a single Groq call (see services/packService.py).
+    Returns one verdict per message in `pack`, None where the model's answer
+    for that message is missing or malformed.
+    """
+
+    try:
+        resp = await groq_client.complete(
+            model=GROQ_MODEL,
+            messages=[
+                {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+                {"role": "user", "content": build_pack_prompt(pack)},
+            ],
+            temperature=1,
+            max_tokens=max_output_tokens(pack),
+            top_p=1,
+            stream=False,
+            response_format={"type": "json_object"},
+            stop=None,
+        )
+    except GroqDeadlineExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"Groq LLM error: {str(e)}"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_502_BAD_GATEWAY,
             detail=f"Groq LLM error: {str(e)}"
         )
 
+    return parse_pack_response(pack, resp.choices[0].message.content or "")
+
 def save_to_history(
     uid: str,
     id_token: str,
@@ -96,40 +135,55 @@ def save_to_history(
     summary: str,
     original_message: str,
     scam_probability: float,
-    ) -> None:
+    source: str,
+    ) -> str:
     """
-    Call the History Service to save this analysis under 'messageAnalyser' subcollection:
-    POST /history/messageAnalyser
-    Body: { "data": { ... } }
+    Queue this analysis for the History Service's 'messageAnalyser' subcollection.
+    Written behind the response in batches (POST /history/messageAnalyser/batch);
+    see common/historyWriter.py. Returns the id the record will be stored under.
+    `source` is where the verdict came from ("llm", "cache" or "local"), so the
+    local classifier is only ever trained on the LLM's own verdicts.
     """
-    url = f"{HISTORY_SERVICE_URL}/history/messageAnalyser"
-
-    payload = {
-        "data": {
-            "classification": classification,
-            "summary": summary,
-            "originalMessage": original_message,
-            "scamProbability": scam_probability,
-        }
+    data = {
+        "classification": classification,
+        "summary": summary,
+        "originalMessage": original_message,
+        "scamProbability": scam_probability,
+        "source": source,
     }
 
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {id_token}"
-    }
+    return history_writer.enqueue("messageAnalyser", id_token, data)
+
+async def _analyze_and_cache(message: str) -> dict:
+    analysis = await analyze_with_groq(message)
+    verdict_cache.put(message, analysis)
+    return analysis
+
+def _raw_id_token(request_data: dict, decoded_token: dict) -> str:
+    # We need the raw ID token to pass to History Service
+    # FastAPI dependency only gave us decoded_token, not the raw token.
+    # So we assume the caller passed 'Authorization' header with 'Bearer <idToken>'—we re‐use that.
+    raw_id_token = None
+    auth_header = request_data.get("rawAuthHeader")
+    if auth_header and auth_header.startswith("Bearer "):
+        raw_id_token = auth_header.split(" ", 1)[1]
 
-    resp = requests.post(url, json=payload, headers=headers, timeout=20)
-    if resp.status_code != 201:
+    if not raw_id_token:
+        # Try to extract from context if available
+        raw_id_token = decoded_token.get("token")
+    if not raw_id_token:
         raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail=f"Failed to save to history: {resp.status_code} {resp.text}"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Unable to retrieve ID token to forward to History Service"
         )
+    return raw_id_token
 
 async def handle_analyze(request_data: dict, decoded_token: dict):
     """
     Orchestrates:
-    1. Call Groq to analyze message.
-    2. Call History Service to save the result.
+    1. Call Groq to analyze message (or reuse a cached verdict, or let the
+       local classifier answer clear-cut cases).
+    2. Queue the result for the History Service.
     Returns the analysis result in JSON format.
     """
     message = request_data.get("message")
@@ -139,8 +193,14 @@ async def handle_analyze(request_data: dict, decoded_token: dict):
             detail="Field 'message' (string) is required"
         )
 
-    # 1. Analyze with Groq
-    analysis = analyze_with_groq(message)
+    # 1. Analyze with Groq, unless a copy of this message (same campaign) was seen recently
+    analysis, source = verdict_cache.get(message), "cache"
+    if analysis is None:
+        # Clear-cut messages are answered by the local model; only uncertain ones reach the LLM
+        analysis, source = local_classifier.classify(message), "local"
+    if analysis is None:
+        analysis = await analysis_flight.do(message_key(message), lambda: _analyze_and_cache(message))
+        source = "llm"
     classification = analysis["classification"]
     summary = analysis["summary"]
     scam_probability = analysis.get("scam_probability", 0.0)
@@ -153,22 +213,7 @@ async def handle_analyze(request_data: dict, decoded_token: dict):
             detail="Invalid token: no uid"
         )
 
-    # We need the raw ID token to pass to History Service
-    # FastAPI dependency only gave us decoded_token, not the raw token.
-    # So we assume the caller passed 'Authorization' header with 'Bearer <idToken>'—we re‐use that.
-    raw_id_token = None
-    auth_header = request_data.get("rawAuthHeader")
-    if auth_header and auth_header.startswith("Bearer "):
-        raw_id_token = auth_header.split(" ", 1)[1]
-
-    if not raw_id_token:
-        # Try to extract from context if available
-        raw_id_token = decoded_token.get("token")
-    if not raw_id_token:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Unable to retrieve ID token to forward to History Service"
-        )
+    raw_id_token = _raw_id_token(request_data, decoded_token)
 
     save_to_history(
         uid=uid,
@@ -176,9 +221,138 @@ async def handle_analyze(request_data: dict, decoded_token: dict):
         classification=classification,
         summary=summary,
         original_message=message,
-        scam_probability=scam_probability
+        scam_probability=scam_probability,
+        source=source
     )
 
     # 3. Return to caller
     return {"classification": classification, "summary": summary, 
             "scam_probability": scam_probability}
+
+async def _analyze_single(message: str) -> tuple[dict | None, str | None]:
+    try:
+        return await analysis_flight.do(message_key(message), lambda: _analyze_and_cache(message)), None
+    except HTTPException as e:
+        return None, e.detail
+
+async def _analyze_pack(pack: list[str]) -> list[tuple[dict | None, str, str | None]]:
+    """(analysis, source, error) per message; messages the packed answer didn't cover go one by one."""
+    try:
+        verdicts = await analyze_pack_with_groq(pack)
+    except HTTPException as e:
+        if e.status_code == status.HTTP_504_GATEWAY_TIMEOUT:
+            # Out of time already; single calls would only time out too
+            return [(None, "llm", e.detail)] * len(pack)
+        # E.g. Groq rejecting the packed reply (json_validate_failed) or failing after retries
+        print(f"Packed analysis of {len(pack)} messages failed, retrying them one by one: {e.detail}")
+        verdicts = [None] * len(pack)
+
+    retry = [message for message, verdict in zip(pack, verdicts) if verdict is None]
+    singles = dict(zip(retry, await asyncio.gather(*(_analyze_single(m) for m in retry))))
+    results = []
+    for message, verdict in zip(pack, verdicts):
+        if verdict is None:
+            analysis, error = singles[message]
+            results.append((analysis, "llm", error))
+        else:
+            verdict_cache.put(message, verdict)
+            results.append((verdict, "llm_batch", None))
+    return results
+
+async def handle_analyze_batch(request_data: dict, decoded_token: dict):
+    """
+    Analyse a list of messages in one request.
+
+    Messages are deduplicated by their normalized text (the verdict cache
+    key); each distinct message is answered from the verdict cache or the
+    local classifier where possible, and the rest are packed several per
+    Groq call up to a token budget, with the packs run concurrently. Any
+    message whose packed result doesn't parse, or whose whole pack failed
+    short of the deadline, is retried on its own.
+    Results come back in input order, and each distinct message is queued
+    once for the History Service.
+    """
+    messages = request_data.get("messages")
+    if not isinstance(messages, list) or not messages:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Field 'messages' (non-empty list of strings) is required"
+        )
+    if len(messages) > MESSAGE_BATCH_MAX_MESSAGES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MESSAGE_BATCH_MAX_MESSAGES} messages per batch"
+        )
+    uid = decoded_token.get("uid")
+    if not uid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token: no uid"
+        )
+    raw_id_token = _raw_id_token(request_data, decoded_token)
+
+    groups = {}  # message key -> input positions, in first-seen order
+    for i, message in enumerate(messages):
+        if isinstance(message, str) and message.strip():
+            groups.setdefault(message_key(message), []).append(i)
+
+    # 1. Cache and local classifier, as in handle_analyze
+    answers = {}  # message key -> (analysis, source, error)
+    pending = {}  # representative message -> message key
+    for key, positions in groups.items():
+        message = messages[positions[0]]
+        analysis = verdict_cache.get(message)
+        if analysis is not None:
+            answers[key] = (analysis, "cache", None)
+            continue
+        analysis = local_classifier.classify(message)
+        if analysis is not None:
+            answers[key] = (analysis, "local", None)
+            continue
+        pending[message] = key
+
+    # 2. Everything else goes to Groq, several messages per call
+    packs = pack_messages(list(pending))
+    for pack, results in zip(packs, await asyncio.gather(*(_analyze_pack(p) for p in packs))):
+        for message, result in zip(pack, results):
+            answers[pending[message]] = result
+
+    # 3. Map back to the input and queue history, once per distinct message string
+    history_ids = {}
+    results = []
+    for message in messages:
+        if not isinstance(message, str) or not message.strip():
+            results.append({"message": message, "error": "Message must be a non-empty string"})
+            continue
+        analysis, source, error = answers[message_key(message)]
+        if error is not None:
+            results.append({"message": message, "error": error})
+            continue
+        if message not in history_ids:
+            history_ids[message] = save_to_history(
+                uid=uid,
+                id_token=raw_id_token,
+                classification=analysis["classification"],
+                summary=analysis["summary"],
+                original_message=message,
+                scam_probability=analysis.get("scam_probability", 0.0),
+                source="llm" if source == "llm_batch" else source
+            )
+        results.append({"message": message, "id": history_ids[message], "source": source,
+                        "classification": analysis["classification"], "summary": analysis["summary"],
+                        "scam_probability": analysis.get("scam_probability", 0.0)})
+
+    sources = [r.get("source") for r in results]
+    return {
+        "results": results,
+        "stats": {
+            "messages": len(messages),
+            "distinct": len(groups),
+            "cache": sources.count("cache"),
+            "local": sources.count("local"),
+            "llm_batch": sources.count("llm_batch"),
+            "llm": sources.count("llm"),
+            "errors": sum(1 for r in results if "error" in r),
+            "packs": len(packs),
+        },
+    }
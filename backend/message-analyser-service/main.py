@@ -1,14 +1,39 @@
 # backend/message-analyser-service/main.py
 
+import os
+import sys
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from routes.messageRoutes import router as message_router
 from fastapi.middleware.cors import CORSMiddleware
-import os
 from dotenv import load_dotenv
 
+# Shared code in backend/common (copied to /common in the Docker image)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from routes.messageRoutes import router as message_router
+from controllers.messageController import analysis_flight
+from common.historyWriter import history_writer
+from common.httpClient import http_client
+from middleware.authMiddleware import prefetch_public_keys, token_cache
+from services.groqService import groq_client
+from services.verdictCacheService import verdict_cache
+from services.classifierService import local_classifier
+
 load_dotenv()
 
-app = FastAPI(title="Message Analyser Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the Firebase key cache without delaying startup
+    prefetch_task = asyncio.create_task(prefetch_public_keys())
+    await history_writer.start(await http_client.start())
+    yield
+    await history_writer.stop()
+    await http_client.stop()
+    prefetch_task.cancel()
+    await groq_client.close()
+
+app = FastAPI(title="Message Analyser Service", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,6 +50,18 @@ app.include_router(message_router, prefix="/message")
 async def health_check():
     return {"status": "message-analyser-service up"}
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "history_writer": history_writer.metrics(),
+        "http_client": http_client.metrics(),
+        "auth_cache": token_cache.metrics(),
+        "groq": groq_client.metrics(),
+        "verdict_cache": verdict_cache.metrics(),
+        "local_classifier": local_classifier.metrics(),
+        "single_flight": analysis_flight.metrics()
+    }
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8002))
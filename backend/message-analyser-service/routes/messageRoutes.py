@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, Request
 from middleware.authMiddleware import verify_token
-from controllers.messageController import handle_analyze
+from controllers.messageController import handle_analyze, handle_analyze_batch
 
 router = APIRouter()
 
@@ -17,3 +17,13 @@ async def analyze_message_endpoint(request: Request, payload: dict, decoded=Depe
     payload["rawAuthHeader"] = raw_auth
 
     return await handle_analyze(payload, decoded)
+
+@router.post("/analyze/batch")
+async def analyze_message_batch_endpoint(request: Request, payload: dict, decoded=Depends(verify_token)):
+    """
+    Endpoint: POST /analyze/batch
+    Headers: Authorization: Bearer <ID_TOKEN>
+    Body: { "messages": ["<text to analyze>", ...] }
+    """
+    payload["rawAuthHeader"] = request.headers.get("Authorization", "")
+    return await handle_analyze_batch(payload, decoded)
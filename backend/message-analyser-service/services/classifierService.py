@@ -0,0 +1,171 @@
+import os
+import re
+import gzip
+import json
+import math
+import random
+import hashlib
+from services.verdictCacheService import normalize_message
+
+# Exported model (see classifier/train.py); the local stage is off when the file is missing
+MESSAGE_CLASSIFIER_PATH = os.getenv("MESSAGE_CLASSIFIER_PATH", "classifier/model.json.gz")
+# Confidence band: probabilities between the two thresholds go to the LLM
+CLASSIFIER_SCAM_THRESHOLD = float(os.getenv("CLASSIFIER_SCAM_THRESHOLD", 0.97))
+CLASSIFIER_SAFE_THRESHOLD = float(os.getenv("CLASSIFIER_SAFE_THRESHOLD", 0.03))
+
+_WORD = re.compile(r"<[^<>\s]+>|\w+")
+
+
+class HashedNgramClassifier:
+    """
+    Logistic regression over hashed features of the normalized message
+    (the same masking the verdict cache uses): word unigrams and bigrams
+    plus character 3-5-grams of each word, hashed into `2 ** bits` buckets.
+    Weights are stored sparsely, so scoring a message is one dictionary
+    lookup per feature; pure Python, no model server.
+    """
+
+    def __init__(self, bits: int = 18, weights: dict = None, bias: float = 0.0):
+        self.bits = bits
+        self.weights = weights or {}
+        self.bias = bias
+
+    def _bucket(self, feature: str) -> int:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") & ((1 << self.bits) - 1)
+
+    @staticmethod
+    def features(message: str) -> list[str]:
+        tokens = _WORD.findall(normalize_message(message))
+        features = [f"w:{t}" for t in tokens]
+        features += [f"b:{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for token in tokens:
+            if token.startswith("<"):
+                continue
+            padded = f" {token} "
+            for n in (3, 4, 5):
+                features += [f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1)]
+        return features
+
+    def _vector(self, message: str) -> dict:
+        """bucket -> L2-normalized count, so long and short messages score on the same scale."""
+        counts = {}
+        for feature in self.features(message):
+            bucket = self._bucket(feature)
+            counts[bucket] = counts.get(bucket, 0) + 1
+        norm = math.sqrt(sum(c * c for c in counts.values())) or 1.0
+        return {bucket: c / norm for bucket, c in counts.items()}
+
+    def predict_proba(self, message: str) -> float:
+        """Probability that the message is a scam."""
+        z = self.bias + sum(self.weights.get(b, 0.0) * x for b, x in self._vector(message).items())
+        return 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z))))
+
+    def indicators(self, message: str, scam: bool, limit: int = 3) -> list[str]:
+        """Words/phrases that pushed the score most towards the given class."""
+        sign = 1 if scam else -1
+        scored = {}
+        for feature in self.features(message):
+            if feature.startswith("c:"):
+                continue
+            weight = sign * self.weights.get(self._bucket(feature), 0.0)
+            if weight > 0:
+                scored[feature[2:]] = max(weight, scored.get(feature[2:], 0.0))
+        return [f for f, _ in sorted(scored.items(), key=lambda kv: -kv[1])[:limit]]
+
+    def fit(self, messages: list[str], labels: list[int], epochs: int = 8,
+            learning_rate: float = 0.5, l2: float = 1e-6, seed: int = 13):
+        """Plain SGD on log-loss with L2 regularisation; labels are 1 (scam) / 0 (safe)."""
+        vectors = [self._vector(m) for m in messages]
+        order = list(range(len(vectors)))
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(order)
+            rate = learning_rate / (1 + epoch)
+            for i in order:
+                x = vectors[i]
+                z = self.bias + sum(self.weights.get(b, 0.0) * v for b, v in x.items())
+                p = 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z))))
+                gradient = p - labels[i]
+                self.bias -= rate * gradient
+                for b, v in x.items():
+                    w = self.weights.get(b, 0.0)
+                    self.weights[b] = w - rate * (gradient * v + l2 * w)
+        # Drop near-zero weights so the exported model stays small
+        self.weights = {b: w for b, w in self.weights.items() if abs(w) > 1e-4}
+        return self
+
+    def save(self, path: str, metadata: dict = None):
+        model = {"version": 1, "bits": self.bits, "bias": self.bias,
+                 "weights": {str(b): round(w, 6) for b, w in self.weights.items()},
+                 "metadata": metadata or {}}
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(model, f)
+
+    @classmethod
+    def load(cls, path: str):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            model = json.load(f)
+        return cls(bits=model["bits"], bias=model["bias"],
+                   weights={int(b): w for b, w in model["weights"].items()})
+
+
+class LocalClassifier:
+    """
+    Cheap first stage in front of the LLM: messages the local model is
+    confident about (probability >= scam_threshold or <= safe_threshold) are
+    answered locally; everything in between goes to Groq.
+    """
+
+    def __init__(self, path: str = MESSAGE_CLASSIFIER_PATH, scam_threshold: float = CLASSIFIER_SCAM_THRESHOLD,
+                 safe_threshold: float = CLASSIFIER_SAFE_THRESHOLD):
+        self.path = path
+        self.scam_threshold = scam_threshold
+        self.safe_threshold = safe_threshold
+        self.model = None
+        self.stats = {"scam": 0, "safe": 0, "uncertain": 0}
+        if path and os.path.exists(path):
+            try:
+                self.model = HashedNgramClassifier.load(path)
+                print(f"Loaded local message classifier from {path} ({len(self.model.weights)} weights)")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Error loading local message classifier from {path}: {str(e)}")
+
+    def classify(self, message: str) -> dict | None:
+        """A verdict in the same shape as analyze_with_groq, or None if the LLM should decide."""
+        if self.model is None:
+            return None
+        probability = self.model.predict_proba(message)
+        if probability >= self.scam_threshold:
+            self.stats["scam"] += 1
+            indicators = self.model.indicators(message, scam=True)
+            summary = "Classified as a scam by the local model; the message closely matches known scam messages"
+        elif probability <= self.safe_threshold:
+            self.stats["safe"] += 1
+            indicators = self.model.indicators(message, scam=False)
+            summary = "Classified as safe by the local model; the message closely matches known legitimate messages"
+        else:
+            self.stats["uncertain"] += 1
+            return None
+
+        if indicators:
+            summary += " (indicative wording: " + ", ".join(f"'{i}'" for i in indicators) + ")"
+        return {
+            "classification": "Scam" if probability >= self.scam_threshold else "Safe",
+            "summary": summary + ".",
+            "scam_probability": round(probability, 4),
+        }
+
+    def metrics(self) -> dict:
+        decided = self.stats["scam"] + self.stats["safe"]
+        total = decided + self.stats["uncertain"]
+        return {
+            **self.stats,
+            "loaded": self.model is not None,
+            "scam_threshold": self.scam_threshold,
+            "safe_threshold": self.safe_threshold,
+            "llm_calls_avoided": round(decided / total, 4) if total else 0.0,
+        }
+
+
+local_classifier = LocalClassifier()
@@ -0,0 +1,122 @@
+import os
+import random
+import asyncio
+from groq import AsyncGroq, APIStatusError, APIConnectionError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+if not GROQ_API_KEY:
+    raise RuntimeError("Missing GROQ_API_KEY in .env")
+
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+# Completions in flight at once from this process; further calls wait their turn
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", 8))
+# Seconds one call may take overall, including queueing and retries
+GROQ_DEADLINE = float(os.getenv("GROQ_DEADLINE", 45))
+GROQ_MAX_ATTEMPTS = int(os.getenv("GROQ_MAX_ATTEMPTS", 3))
+GROQ_RETRY_BASE = float(os.getenv("GROQ_RETRY_BASE", 0.5))
+
+
+class GroqDeadlineExceeded(Exception):
+    pass
+
+
+def _retryable(e: Exception) -> bool:
+    if isinstance(e, APIStatusError):
+        return e.status_code == 429 or e.status_code >= 500
+    # Connection errors and per-attempt timeouts
+    return isinstance(e, (APIConnectionError, asyncio.TimeoutError))
+
+
+def _retry_after(e: Exception) -> float | None:
+    if isinstance(e, APIStatusError):
+        try:
+            return float(e.response.headers.get("retry-after"))
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+class GroqClient:
+    """
+    AsyncGroq behind a semaphore, so LLM calls overlap on the event loop
+    instead of blocking it, while at most `max_concurrency` are sent at
+    once. Every call gets an overall deadline; 429s, 5xx and connection
+    errors are retried with jittered exponential backoff (honouring
+    Retry-After), releasing the slot while waiting. The SDK's own retries
+    are disabled so the deadline covers everything.
+    """
+
+    def __init__(self, api_key: str = GROQ_API_KEY, max_concurrency: int = GROQ_MAX_CONCURRENCY,
+                 deadline: float = GROQ_DEADLINE, max_attempts: int = GROQ_MAX_ATTEMPTS,
+                 retry_base: float = GROQ_RETRY_BASE):
+        self.client = AsyncGroq(api_key=api_key, max_retries=0)
+        self.max_concurrency = max(1, max_concurrency)
+        self.deadline = deadline
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self._semaphore = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "deadline_exceeded": 0}
+
+    async def complete(self, **kwargs):
+        """chat.completions.create with the concurrency cap, deadline and retries applied."""
+        if self._semaphore is None:
+            # Created lazily so it binds to the running event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + self.deadline
+        self.stats["calls"] += 1
+        for attempt in range(self.max_attempts):
+            remaining = give_up_at - loop.time()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                return await asyncio.wait_for(self._attempt(kwargs), remaining)
+            except Exception as e:
+                error = e
+            if isinstance(error, asyncio.TimeoutError) and loop.time() >= give_up_at:
+                self.stats["deadline_exceeded"] += 1
+                raise GroqDeadlineExceeded(f"No response from Groq within {self.deadline:g}s")
+            if not _retryable(error) or attempt + 1 == self.max_attempts:
+                self.stats["failures"] += 1
+                raise error
+
+            delay = self.retry_base * (2 ** attempt)
+            delay = _retry_after(error) or delay + random.uniform(0, delay)
+            if loop.time() + delay >= give_up_at:
+                self.stats["failures"] += 1
+                raise error
+            self.stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+    async def _attempt(self, kwargs: dict):
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            return await self.client.chat.completions.create(**kwargs)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def close(self):
+        await self.client.close()
+
+    def metrics(self) -> dict:
+        return {
+            **self.stats,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+        }
+
+
+groq_client = GroqClient()
@@ -0,0 +1,86 @@
+import os
+import json
+
+# Rough prompt budget per packed LLM call (input tokens, excluding the fixed instructions)
+MESSAGE_PACK_TOKEN_BUDGET = int(os.getenv("MESSAGE_PACK_TOKEN_BUDGET", 4000))
+MESSAGE_PACK_MAX_ITEMS = int(os.getenv("MESSAGE_PACK_MAX_ITEMS", 20))
+# Completion tokens reserved per message in a pack (verdict + short summary)
+MESSAGE_PACK_OUTPUT_TOKENS = int(os.getenv("MESSAGE_PACK_OUTPUT_TOKENS", 160))
+
+BATCH_SYSTEM_PROMPT = """
+You are a helpful assistant that classifies user-provided SMS or email messages as either "Scam" or "Safe".
+You receive a JSON object {"messages": [{"id": "<id>", "text": "<message>"}, ...]}.
+Judge every message independently and return exactly one result per id, as JSON:
+{"results": [{"id": "<id>", "classification": "<Scam or Safe>", "summary": "<short explanation, at most 60 words>", "scam_probability": <0.0 to 1.0, confidence that it is a scam>}, ...]}
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text, plus JSON framing per item
+    return len(text) // 4 + 12
+
+
+def pack_messages(messages: list[str], token_budget: int = MESSAGE_PACK_TOKEN_BUDGET,
+                  max_items: int = MESSAGE_PACK_MAX_ITEMS) -> list[list[str]]:
+    """
+    Greedily group messages into packs of at most `max_items` whose
+    estimated prompt size stays within `token_budget`. A message larger than
+    the budget on its own gets a pack to itself.
+    """
+    packs, current, used = [], [], 0
+    for message in messages:
+        cost = estimate_tokens(message)
+        if current and (used + cost > token_budget or len(current) >= max_items):
+            packs.append(current)
+            current, used = [], 0
+        current.append(message)
+        used += cost
+    if current:
+        packs.append(current)
+    return packs
+
+
+def build_pack_prompt(pack: list[str]) -> str:
+    return json.dumps({"messages": [{"id": str(i), "text": text} for i, text in enumerate(pack)]},
+                      ensure_ascii=False)
+
+
+def max_output_tokens(pack: list[str]) -> int:
+    return MESSAGE_PACK_OUTPUT_TOKENS * len(pack) + 64
+
+
+def _verdict(item) -> dict | None:
+    if not isinstance(item, dict):
+        return None
+    classification = item.get("classification")
+    summary = item.get("summary")
+    if classification not in ("Scam", "Safe") or not isinstance(summary, str):
+        return None
+    # A missing probability is malformed too: the message is retried on its own
+    try:
+        scam_probability = min(1.0, max(0.0, float(item["scam_probability"])))
+    except (KeyError, TypeError, ValueError):
+        return None
+    return {"classification": classification, "summary": summary, "scam_probability": scam_probability}
+
+
+def parse_pack_response(pack: list[str], content: str) -> list[dict | None]:
+    """
+    Verdicts aligned with `pack`; None for any message whose result is
+    missing or malformed (or for all of them if the reply isn't valid JSON).
+    """
+    verdicts = [None] * len(pack)
+    try:
+        results = json.loads(content).get("results")
+    except (ValueError, AttributeError):
+        return verdicts
+    if not isinstance(results, list):
+        return verdicts
+    for item in results:
+        try:
+            index = int(item.get("id"))
+        except (AttributeError, TypeError, ValueError):
+            continue
+        if 0 <= index < len(pack) and verdicts[index] is None:
+            verdicts[index] = _verdict(item)
+    return verdicts
@@ -0,0 +1,237 @@
+import os
+import re
+import time
+import hashlib
+from urllib.parse import urlparse
+from collections import OrderedDict
+
+VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", 20000))
+VERDICT_CACHE_TTL = float(os.getenv("VERDICT_CACHE_TTL", 6 * 3600))
+# Max differing SimHash bits for two messages to count as the same campaign
+# (negative disables near-duplicate matching; at most SIMHASH_BANDS - 1).
+# Only Scam verdicts are reused for near duplicates, see VerdictCache.
+VERDICT_SIMHASH_DISTANCE = int(os.getenv("VERDICT_SIMHASH_DISTANCE", 3))
+# Shorter messages only match exactly; SimHash is too coarse on a few words
+VERDICT_MIN_NEAR_TOKENS = int(os.getenv("VERDICT_MIN_NEAR_TOKENS", 8))
+
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 8
+_BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+
+# Second-level public suffixes common enough to matter when finding the registrable domain
+TWO_LEVEL_SUFFIXES = {
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "com.au", "net.au", "co.nz", "co.jp", "co.kr",
+    "com.br", "com.cn", "com.mx", "co.in", "co.za", "com.sg", "gov.sg", "edu.sg", "com.my", "com.tr", "com.vn",
+}
+
+_URL = re.compile(r"(?:https?://|www\.)\S+|\b[a-z0-9-]+(?:\.[a-z0-9-]+)*\.(?:com|net|org|info|biz|co|io|ly|me|xyz|top|link|click|app)(?:\.[a-z]{2})?\b(?:/\S*)?", re.I)
+_EMAIL = re.compile(r"\b[\w.+-]+@([\w-]+(?:\.[\w-]+)+)\b")
+# Digit runs with the separators used in phone numbers, amounts, dates and codes
+_NUMBER = re.compile(r"\+?\d[\d\s,.:/-]*\d|\d")
+_AMOUNT = re.compile(r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+\.\d{1,2}")
+_CURRENCY = re.compile(r"(?:[$€£¥₹]|\b(?:usd|sgd|eur|gbp|inr|rm|rs|s\$))\s*$", re.I)
+# The name right after a greeting ("Hi Sarah,", "Dear Mr. Tan")
+_GREETING_NAME = re.compile(r"\b((?i:hi|hello|hey|dear|greetings))\s+(?:(?i:mr|mrs|ms|dr)\.?\s+)?[A-Z][\w'-]*")
+_TAG = re.compile(r"(<[^<>\s]+>)")
+_WORD = re.compile(r"<[^<>\s]+>|\w+")
+
+
+def registrable_domain(host: str) -> str:
+    """Last two labels of the host (three under a known two-level suffix); IP literals as-is."""
+    labels = [label for label in host.lower().strip(".").split(".") if label]
+    if not labels or all(label.isdigit() for label in labels):
+        return ".".join(labels)
+    if len(labels) >= 3 and ".".join(labels[-2:]) in TWO_LEVEL_SUFFIXES:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def _mask_url(match) -> str:
+    url = match.group(0)
+    if "://" not in url:
+        url = "http://" + url
+    try:
+        host = urlparse(url).hostname or ""
+    except ValueError:
+        host = ""
+    domain = registrable_domain(host)
+    return f" <url:{domain}> " if domain else " <url> "
+
+
+def _mask_number(match) -> str:
+    text = match.group(0)
+    digits = re.sub(r"\D", "", text)
+    amount = _AMOUNT.fullmatch(text) or _CURRENCY.search(match.string, 0, match.start())
+    dated = "/" in text or ":" in text
+    # Phone numbers decide the verdict as much as links do, so they stay in the key;
+    # OTP-style codes, amounts, dates and times don't and are masked
+    if not amount and not dated and (text.startswith("+") or 7 <= len(digits) <= 15):
+        return f" <tel:{digits}> "
+    return " <num> "
+
+
+def _outside_tags(pattern, replace, text: str) -> str:
+    # Leaves earlier masks alone, so "<email:dbs.com>" isn't re-read as a URL
+    # and "<url:123pay.com>" keeps its digits
+    parts = _TAG.split(text)
+    return "".join(part if i % 2 else pattern.sub(replace, part) for i, part in enumerate(parts))
+
+
+def normalize_message(message: str) -> str:
+    """
+    Campaign-invariant form of a message: e-mail addresses and URLs are
+    reduced to their registrable domain (<email:dbs.com>, <url:dhl-pay.xyz>),
+    phone numbers to their digits (<tel:61234567>), OTP-style codes, amounts,
+    dates and greeted names are masked, then the text is case-folded and
+    whitespace collapsed. Names elsewhere in the text are kept, since
+    without NER they can't be told apart from brand names, which matter for
+    the verdict. Long digit runs are kept too: they can't be told apart
+    from phone numbers.
+    """
+    text = _EMAIL.sub(lambda m: f" <email:{registrable_domain(m.group(1))}> ", message)
+    text = _outside_tags(_URL, _mask_url, text)
+    text = _GREETING_NAME.sub(lambda m: f"{m.group(1)} <name>", text)
+    text = _outside_tags(_NUMBER, _mask_number, text)
+    return " ".join(text.casefold().split())
+
+
+def _digest(normalized: str) -> str:
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def message_key(message: str) -> str:
+    """SHA-256 of the normalized message; copies of one campaign share it."""
+    return _digest(normalize_message(message))
+
+
+def simhash(tokens: list[str]) -> int:
+    """
+    64-bit SimHash over words and word bigrams. On SMS-length text a one-word
+    edit moves it by roughly 3-7 bits; unrelated messages differ by 12+.
+    """
+    features = tokens + [" ".join(tokens[i:i + 2]) for i in range(len(tokens) - 1)]
+    # Per-bit majority vote, counted column-wise over the hashes' bit strings
+    rows = [format(int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "big"), "064b")
+            for f in features]
+    half = len(rows) / 2
+    return int("".join("1" if column.count("1") > half else "0" for column in map("".join, zip(*rows))), 2)
+
+
+def _bands(fingerprint: int) -> list[tuple[int, int]]:
+    mask = (1 << _BAND_BITS) - 1
+    return [(i, fingerprint >> (i * _BAND_BITS) & mask) for i in range(SIMHASH_BANDS)]
+
+
+class VerdictCache:
+    """
+    Classification results for recently analysed messages, so repeat copies
+    of a scam campaign skip the LLM.
+
+    Exact hits are keyed on the SHA-256 of the normalized text. Near
+    duplicates (a few words changed) of Scam verdicts are found by SimHash;
+    Safe verdicts are only reused for exact hits, since a small rewrite of a
+    legitimate notice is how credential phishing usually reads. Fingerprints are
+    split into SIMHASH_BANDS bands and indexed per band, and since two
+    fingerprints within VERDICT_SIMHASH_DISTANCE bits must agree on at least
+    one band, only entries sharing a band are compared. Entries expire after
+    `ttl` seconds and the least recently used are evicted beyond
+    `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = VERDICT_CACHE_SIZE, ttl: float = VERDICT_CACHE_TTL,
+                 max_distance: int = VERDICT_SIMHASH_DISTANCE, min_near_tokens: int = VERDICT_MIN_NEAR_TOKENS):
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl
+        self.max_distance = min(max_distance, SIMHASH_BANDS - 1)
+        self.min_near_tokens = min_near_tokens
+        self._entries = OrderedDict()  # key -> (expires_at, fingerprint | None, verdict)
+        self._bands = {}  # (band, value) -> set of keys
+        self.stats = {"exact_hits": 0, "near_hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+
+    def _fingerprint(self, normalized: str) -> int | None:
+        tokens = _WORD.findall(normalized)
+        if self.max_distance < 0 or len(tokens) < self.min_near_tokens:
+            return None
+        return simhash(tokens)
+
+    def get(self, message: str) -> dict | None:
+        normalized = normalize_message(message)
+        key = _digest(normalized)
+        now = time.time()
+
+        verdict = self._live(key, now)
+        if verdict is not None:
+            self.stats["exact_hits"] += 1
+            return dict(verdict)
+
+        fingerprint = self._fingerprint(normalized)
+        if fingerprint is not None:
+            candidates = set()
+            for band in _bands(fingerprint):
+                candidates |= self._bands.get(band, set())
+            best = None
+            for candidate in candidates:
+                entry = self._entries.get(candidate)
+                if entry is None or entry[1] is None:
+                    continue
+                distance = (entry[1] ^ fingerprint).bit_count()
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, candidate)
+            if best is not None:
+                verdict = self._live(best[1], now)
+                if verdict is not None:
+                    self.stats["near_hits"] += 1
+                    return dict(verdict)
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, message: str, verdict: dict):
+        if self.max_entries == 0:
+            return
+        normalized = normalize_message(message)
+        key = _digest(normalized)
+        fingerprint = self._fingerprint(normalized) if verdict.get("classification") == "Scam" else None
+        self._remove(key)
+        self._entries[key] = (time.time() + self.ttl, fingerprint, dict(verdict))
+        if fingerprint is not None:
+            for band in _bands(fingerprint):
+                self._bands.setdefault(band, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.stats["evicted"] += 1
+
+    def _live(self, key: str, now: float) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            self._remove(key)
+            self.stats["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None or entry[1] is None:
+            return
+        for band in _bands(entry[1]):
+            keys = self._bands.get(band)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._bands[band]
+
+    def metrics(self) -> dict:
+        hits = self.stats["exact_hits"] + self.stats["near_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+verdict_cache = VerdictCache()
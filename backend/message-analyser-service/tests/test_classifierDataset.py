@@ -0,0 +1,46 @@
+from dataset import split_by_campaign, to_example
+from evaluate import band_report
+
+
+def _record(**fields):
+    return {"originalMessage": "Claim your prize now", "classification": "Scam", "scamProbability": 0.9,
+            "source": "llm", **fields}
+
+
+def test_only_llm_verdicts_are_examples():
+    assert to_example(_record()) == ("Claim your prize now", 1)
+    assert to_example(_record(source="cache")) is None
+    assert to_example(_record(source="local")) is None
+
+
+def test_records_without_source_need_opt_in():
+    record = _record()
+    del record["source"]
+    assert to_example(record) is None
+    assert to_example(record, allow_missing_source=True) == ("Claim your prize now", 1)
+
+
+def test_min_confidence_uses_the_llm_probability():
+    assert to_example(_record(scamProbability=0.6), min_confidence=0.8) is None
+    assert to_example(_record(classification="Safe", scamProbability=0.1), min_confidence=0.8) == \
+        ("Claim your prize now", 0)
+
+
+def test_split_keeps_campaign_copies_together():
+    # Copies differ only in the masked parts (greeted name, code)
+    campaigns = ["parcel", "prize", "bank", "lunch", "invoice", "tax", "crypto", "dentist", "job", "refund"]
+    examples = [(f"Hi {name}, your {c} code is {code}", i % 2)
+                for i, c in enumerate(campaigns) for name, code in (("Ann", 1234), ("Bob", 9876))]
+    train, holdout = split_by_campaign(examples, holdout=0.3)
+    assert len(train) + len(holdout) == len(campaigns)
+    assert not {m for m, _ in train} & {m for m, _ in holdout}
+
+
+def test_band_report_counts_local_decisions():
+    scored = [(0.99, 1), (0.98, 0), (0.5, 1), (0.01, 0), (0.02, 1)]
+    report = band_report(scored, 0.97, 0.03)
+    assert report["decided_locally"] == 4
+    assert report["llm_calls_avoided"] == 0.8
+    assert report["agreement"] == 0.5
+    assert report["scams_passed_as_safe"] == 1
+    assert report["safe_flagged_as_scam"] == 1
@@ -0,0 +1,78 @@
+import pytest
+
+from services.classifierService import HashedNgramClassifier, LocalClassifier
+
+SCAMS = [
+    "Your account is suspended, verify your password now at http://secure-bank.xyz/login",
+    "Congratulations you won a prize, claim your reward at http://win-prize.top today",
+    "Your parcel is held, pay the customs fee at http://parcel-fee.click to release it",
+    "Urgent: confirm your card details at http://card-check.xyz or your account will be closed",
+]
+SAFE = [
+    "Hi, are we still meeting for lunch tomorrow at noon?",
+    "Your dentist appointment is confirmed for Monday at 3pm",
+    "Thanks for the photos from the weekend, they look great",
+    "The team meeting has moved to the small conference room",
+]
+
+
+@pytest.fixture(scope="module")
+def model():
+    return HashedNgramClassifier(bits=12).fit(SCAMS + SAFE, [1] * len(SCAMS) + [0] * len(SAFE), epochs=30)
+
+
+def test_features_use_normalized_text():
+    features = HashedNgramClassifier.features("Hi John, visit http://x.xyz/a")
+    assert "w:<name>" in features
+    assert "w:<url:x.xyz>" in features
+    # No character n-grams for masks
+    assert not any(f.startswith("c:") and "<" in f for f in features)
+
+
+def test_untrained_model_is_undecided():
+    assert HashedNgramClassifier().predict_proba("anything at all") == 0.5
+
+
+def test_fit_separates_training_data(model):
+    assert all(model.predict_proba(m) > 0.5 for m in SCAMS)
+    assert all(model.predict_proba(m) < 0.5 for m in SAFE)
+    assert model.predict_proba("Verify your password at http://secure-bank.xyz/login") > \
+        model.predict_proba("Are we still meeting for lunch?")
+
+
+def test_indicators_point_at_scam_wording(model):
+    indicators = model.indicators(SCAMS[0], scam=True)
+    assert 0 < len(indicators) <= 3
+    assert not set(indicators) & set(model.indicators(SCAMS[0], scam=False))
+
+
+def test_save_and_load_round_trip(model, tmp_path):
+    path = str(tmp_path / "model.json.gz")
+    model.save(path, metadata={"note": "test"})
+    loaded = HashedNgramClassifier.load(path)
+    assert loaded.bits == model.bits
+    for message in SCAMS + SAFE:
+        assert loaded.predict_proba(message) == pytest.approx(model.predict_proba(message), abs=1e-4)
+
+
+def test_local_classifier_decides_only_outside_the_band(model, tmp_path):
+    path = str(tmp_path / "model.json.gz")
+    model.save(path)
+    # Probabilities of the exported (rounded) weights
+    loaded = HashedNgramClassifier.load(path)
+    scam_p = loaded.predict_proba(SCAMS[0])
+    safe_p = loaded.predict_proba(SAFE[0])
+
+    confident = LocalClassifier(path, scam_threshold=scam_p, safe_threshold=safe_p)
+    assert confident.classify(SCAMS[0])["classification"] == "Scam"
+    assert confident.classify(SAFE[0])["classification"] == "Safe"
+
+    strict = LocalClassifier(path, scam_threshold=1.01, safe_threshold=-0.01)
+    assert strict.classify(SCAMS[0]) is None
+    assert strict.metrics()["uncertain"] == 1
+
+
+def test_missing_model_disables_local_stage(tmp_path):
+    local = LocalClassifier(str(tmp_path / "missing.json.gz"))
+    assert local.classify(SCAMS[0]) is None
+    assert local.metrics()["loaded"] is False
@@ -0,0 +1,72 @@
+import json
+
+from services.packService import build_pack_prompt, estimate_tokens, pack_messages, parse_pack_response
+
+
+def test_pack_respects_item_limit():
+    packs = pack_messages([f"message {i}" for i in range(12)], token_budget=10_000, max_items=5)
+    assert [len(p) for p in packs] == [5, 5, 2]
+    assert [m for p in packs for m in p] == [f"message {i}" for i in range(12)]
+
+
+def test_pack_respects_token_budget():
+    messages = ["x" * 400] * 6  # ~112 tokens each
+    budget = estimate_tokens(messages[0]) * 2
+    packs = pack_messages(messages, token_budget=budget, max_items=20)
+    assert [len(p) for p in packs] == [2, 2, 2]
+
+
+def test_oversized_message_gets_its_own_pack():
+    packs = pack_messages(["short", "y" * 10_000, "short too"], token_budget=100, max_items=20)
+    assert packs == [["short"], ["y" * 10_000], ["short too"]]
+
+
+def test_empty_input_has_no_packs():
+    assert pack_messages([]) == []
+
+
+def test_prompt_numbers_messages_by_position():
+    prompt = json.loads(build_pack_prompt(["a", "b"]))
+    assert prompt == {"messages": [{"id": "0", "text": "a"}, {"id": "1", "text": "b"}]}
+
+
+def _reply(*results):
+    return json.dumps({"results": list(results)})
+
+
+def test_results_are_mapped_back_by_id():
+    verdicts = parse_pack_response(["a", "b"], _reply(
+        {"id": "1", "classification": "Safe", "summary": "fine", "scam_probability": "0.1"},
+        {"id": 0, "classification": "Scam", "summary": "phish", "scam_probability": 1.7},
+    ))
+    assert verdicts == [
+        {"classification": "Scam", "summary": "phish", "scam_probability": 1.0},
+        {"classification": "Safe", "summary": "fine", "scam_probability": 0.1},
+    ]
+
+
+def test_malformed_items_are_none():
+    pack = ["a", "b", "c", "d", "e"]
+    verdicts = parse_pack_response(pack, _reply(
+        {"id": "0", "classification": "Maybe", "summary": "?", "scam_probability": 0.5},
+        {"id": "1", "classification": "Scam", "summary": "no probability"},
+        {"id": "2", "classification": "Scam", "summary": "bad", "scam_probability": "high"},
+        {"id": "3", "classification": "Safe", "scam_probability": 0.0},
+        {"id": "9", "classification": "Safe", "summary": "unknown id", "scam_probability": 0.0},
+        "not an object",
+    ))
+    assert verdicts == [None] * 5
+
+
+def test_first_result_for_an_id_wins():
+    verdicts = parse_pack_response(["a"], _reply(
+        {"id": "0", "classification": "Scam", "summary": "first", "scam_probability": 0.9},
+        {"id": "0", "classification": "Safe", "summary": "second", "scam_probability": 0.1},
+    ))
+    assert verdicts[0]["summary"] == "first"
+
+
+def test_unparseable_reply_is_all_none():
+    assert parse_pack_response(["a", "b"], "not json") == [None, None]
+    assert parse_pack_response(["a", "b"], "[]") == [None, None]
+    assert parse_pack_response(["a", "b"], '{"results": {}}') == [None, None]
@@ -0,0 +1,72 @@
+from services.verdictCacheService import VerdictCache, message_key, normalize_message, registrable_domain
+
+SCAM = {"classification": "Scam", "summary": "phishing", "scam_probability": 0.95}
+SAFE = {"classification": "Safe", "summary": "notice", "scam_probability": 0.05}
+
+PHISHING = ("URGENT your bank account has been suspended due to unusual activity please verify "
+            "your details immediately at http://dbs-verify.xyz/login to avoid permanent closure")
+
+
+def test_campaign_copies_share_a_key():
+    assert message_key("Hi John, your OTP is 482913. Do not share it.") == \
+        message_key("Hi Mary,  your OTP is 100200. do not share it.")
+    assert message_key("Pay $1,250.00 now at https://dhl.com/track/123") == \
+        message_key("Pay $90.50 now at http://www.dhl.com/track/999?x=1")
+
+
+def test_link_domain_is_part_of_the_key():
+    real = "Hi John, your parcel is held. Track it at https://dhl.com/track/123"
+    fake = "Hi Mary, your parcel is held. Track it at https://dhl-pay.xyz/a"
+    assert message_key(real) != message_key(fake)
+    assert "<url:dhl-pay.xyz>" in normalize_message(fake)
+
+
+def test_phone_numbers_are_part_of_the_key():
+    assert message_key("Call 6123 4567 to reach DBS support") != message_key("Call 9999 0000 to reach DBS support")
+    assert message_key("Call 6123 4567 to reach DBS support") == message_key("Call 6123-4567 to reach DBS support")
+    assert "<tel:6561234567>" in normalize_message("Call +65 6123 4567")
+
+
+def test_email_domain_is_part_of_the_key():
+    assert normalize_message("Write to help@secure.dbs.com.sg") == "write to <email:dbs.com.sg>"
+    assert message_key("Write to help@dbs.com") != message_key("Write to help@dbs-help.xyz")
+
+
+def test_codes_amounts_and_dates_are_masked():
+    assert normalize_message("OTP 482913, pay SGD 2500 by 12/05/2024 10:30") == \
+        "otp <num> , pay sgd <num> by <num>"
+    # Digits inside a domain are left alone
+    assert normalize_message("see 123pay.com") == "see <url:123pay.com>"
+
+
+def test_registrable_domain():
+    assert registrable_domain("secure.login.paypal.com") == "paypal.com"
+    assert registrable_domain("shop.example.co.uk") == "example.co.uk"
+    assert registrable_domain("192.168.0.1") == "192.168.0.1"
+
+
+def test_exact_hit_for_campaign_copy():
+    cache = VerdictCache()
+    cache.put("Hi John, your OTP is 482913", SAFE)
+    assert cache.get("Hi Mary, your OTP is 100200") == SAFE
+    assert cache.get("Hi Mary, your OTP is 100200, call 9999 0000") is None
+
+
+def test_near_hit_reuses_scam_verdicts():
+    cache = VerdictCache()
+    cache.put(PHISHING, SCAM)
+    assert cache.get(PHISHING + " asap") == SCAM
+    assert cache.metrics()["near_hits"] == 1
+
+
+def test_near_hit_never_reuses_safe_verdicts():
+    cache = VerdictCache()
+    cache.put(PHISHING + " asap", SAFE)
+    assert cache.get(PHISHING) is None
+
+    cache.put("Please visit your nearest branch with your identity card to unlock it", SAFE)
+    assert cache.get("Please reply with your identity card number to unlock it right now") is None
+
+
+def test_default_distance_is_tight():
+    assert VerdictCache().max_distance <= 3
@@ -1,43 +1,27 @@
+import asyncio
 from fastapi import HTTPException, status
 from telegram_client import client
-from services.joinService import join_channel
+from services.joinService import join_channel, extract_join_info
 from services.scrapingService import scrape_messages
 from services.llmService import tele_analyse
 from services.leaveService import leave_group
 from services.savehistoryService import save_to_history
-
-async def analyze_group(request_data: dict, decoded_token: dict):
-    """
-    Analyzes a Telegram group by joining, scraping messages, summarizing, and saving history.
-
-    Args:
-        request_data (dict): Payload from the frontend. Must include:
-            - group_link (str): Public Telegram group link
-            - rawAuthHeader (str, optional): Authorization header for Firebase
-        decoded_token (dict): Decoded Firebase token containing at least 'uid'
-
-    Returns:
-        dict: {
-            "status": "success",
-            "summary": str  # Summary of the group's purpose from LLM
-        }
-
-    Raises:
-        HTTPException:
-            - 400 if group_link is missing or invalid
-            - 403 if group is private, Telegram denies access, or flood wait occurs
-            - 422 if no usable messages were found for analysis
-            - 401 if token is missing or invalid
-            - 502 if summarization or history service fails
-            - 500 for all other unexpected internal errors
-    """
-    
-    # 1. Getting the group link from the frontend payload
-    group_link = request_data.get("group_link")
-    if not group_link or not isinstance(group_link, str):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
-                            detail="Field 'Telegram group link' (string) is required")
-
+from common.singleflight import SingleFlight
+
+# Concurrent requests for the same group share one join/scrape/LLM run
+group_flight = SingleFlight("group_analysis")
+
+def group_key(group_link: str) -> str:
+    """Group username (or invite hash) from the link, so different spellings of one link coalesce."""
+    kind, identifier = extract_join_info(group_link)
+    if kind == "public":
+        return f"public:{identifier.lower()}"
+    if kind == "private":
+        return f"private:{identifier}"
+    return group_link.strip()
+
+async def _analyze_group(group_link: str) -> dict:
+    """Steps 2-4 of analyze_group; returns the LLM result."""
     # 2. Joining the specific group for scraping
     join_result = await join_channel(client, group_link)
 
@@ -69,7 +53,7 @@ async def analyze_group(request_data: dict, decoded_token: dict):
                                 detail=scrape_result["message"])
 
     # 4. Pass the results from scraping into llm for summarising and leave group after completion
-    llm_result = tele_analyse(scrape_result["formatted_text"])
+    llm_result = await asyncio.to_thread(tele_analyse, scrape_result["formatted_text"])
 
     # Handling errors that may surface from tele_analyse
     if llm_result["status"] != "success":
@@ -79,6 +63,43 @@ async def analyze_group(request_data: dict, decoded_token: dict):
 
     await leave_group(client, group_name)
 
+    return llm_result
+
+async def analyze_group(request_data: dict, decoded_token: dict):
+    """
+    Analyzes a Telegram group by joining, scraping messages, summarizing, and saving history.
+
+    Args:
+        request_data (dict): Payload from the frontend. Must include:
+            - group_link (str): Public Telegram group link
+            - rawAuthHeader (str, optional): Authorization header for Firebase
+        decoded_token (dict): Decoded Firebase token containing at least 'uid'
+
+    Returns:
+        dict: {
+            "status": "success",
+            "summary": str  # Summary of the group's purpose from LLM
+        }
+
+    Raises:
+        HTTPException:
+            - 400 if group_link is missing or invalid
+            - 403 if group is private, Telegram denies access, or flood wait occurs
+            - 422 if no usable messages were found for analysis
+            - 401 if token is missing or invalid
+            - 502 if summarization or history service fails
+            - 500 for all other unexpected internal errors
+    """
+    
+    # 1. Getting the group link from the frontend payload
+    group_link = request_data.get("group_link")
+    if not group_link or not isinstance(group_link, str):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Field 'Telegram group link' (string) is required")
+
+    # 2-4. Join, scrape and summarise (shared by concurrent requests for the same group)
+    llm_result = await group_flight.do(group_key(group_link), lambda: _analyze_group(group_link))
+
     # 5. Save the results to history
     uid = decoded_token.get("uid")
     if not uid:
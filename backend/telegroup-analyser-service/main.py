@@ -1,21 +1,33 @@
 import os
+import sys
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
+# Shared code in backend/common (copied to /common in the Docker image)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 # Import the Telegram client (no circular imports)
 from telegram_client import client
 from routes.teleRoutes import router as tele_router
+from controllers.teleController import group_flight
+from common.historyWriter import history_writer
+from common.httpClient import http_client
+from middleware.authMiddleware import prefetch_public_keys, token_cache
 
 # Load .env (for PORT, etc.)
 load_dotenv()
 
 PORT = int(os.getenv("PORT", 8007))  # your default port
 
-# Lifespan context to start/stop Telegram client
+# Lifespan context to start/stop Telegram client and history writer
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Warm the Firebase key cache without delaying startup
+    prefetch_task = asyncio.create_task(prefetch_public_keys())
+    await history_writer.start(await http_client.start())
     print("Starting Telegram client…")
     await client.start()
     me = await client.get_me()
@@ -23,6 +35,9 @@ async def lifespan(app: FastAPI):
     yield
     print("Shutting down Telegram client…")
     await client.disconnect()
+    await history_writer.stop()
+    await http_client.stop()
+    prefetch_task.cancel()
 
 # Create the FastAPI app with our lifespan
 app = FastAPI(
@@ -46,6 +61,15 @@ app.include_router(tele_router, prefix="/telegram")
 async def health_check():
     return {"status": "telegram-group-analyser-service up"}
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "history_writer": history_writer.metrics(),
+        "http_client": http_client.metrics(),
+        "auth_cache": token_cache.metrics(),
+        "single_flight": group_flight.metrics()
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1,5 +1,4 @@
-import os 
-import requests
+from common.historyWriter import history_writer
 
 def save_to_history(
     uid: str,
@@ -11,32 +10,17 @@ def save_to_history(
     ):
 
     """
-    Save the telegram group summary result to the History Service.
-    POST /history/TeleAnalyser
-    Body: { "data": { ... } }
+    Queue the telegram group summary result for the History Service.
+    Written behind the response in batches (POST /history/TeleAnalyser/batch);
+    see common/historyWriter.py.
     """
 
-    HISTORY_SERVICE_URL = os.getenv("HISTORY_SERVICE_URL")
-    if not HISTORY_SERVICE_URL.endswith("/"):
-        HISTORY_SERVICE_URL = HISTORY_SERVICE_URL.rstrip("/")
-
-    url = f"{HISTORY_SERVICE_URL}/history/TeleAnalyser"
-
-    payload = {
-        "data": {
-            "group_name": group_name,
-            "summary": summary,
-            "scam_classification":scam_classification,
-            "scam_probability":scam_probability
-        }
-    }
-
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {id_token}"
+    data = {
+        "group_name": group_name,
+        "summary": summary,
+        "scam_classification":scam_classification,
+        "scam_probability":scam_probability
     }
 
-    resp = requests.post(url, json=payload, headers=headers, timeout=20)
-    if resp.status_code != 201:
-        return {"status":"error", "message":f"Failed to save to history: {resp.status_code} {resp.text}"}
-    return {"status":"success", "message":"Saved successfully"}
\ No newline at end of file
+    record_id = history_writer.enqueue("TeleAnalyser", id_token, data)
+    return {"status":"success", "message":"Queued for saving.", "id": record_id}